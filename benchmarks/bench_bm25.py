@@ -0,0 +1,106 @@
+"""
+BM25 benchmark: native inverted index (BM25Index) vs a rank_bm25 rebuild-per-batch index.
+
+    python benchmarks/bench_bm25.py --sizes 10000,100000,1000000
+
+The rank_bm25 baseline rebuilds BM25Okapi on every add_docs batch, as the index did
+before. Its ingest cost grows quadratically, so it is skipped above --baseline-max.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from rag_support.services.bm25_index import BM25Index
+
+
+class RankBM25Index:
+    """Previous implementation, kept here as the comparison baseline."""
+
+    def __init__(self) -> None:
+        self._tokenized: List[List[str]] = []
+        self._doc_ids: List[str] = []
+        self._bm25 = None
+
+    def add_docs(self, doc_ids: List[str], docs: List[str]) -> None:
+        from rank_bm25 import BM25Okapi
+
+        self._tokenized.extend(BM25Index._tokenize(d) for d in docs)
+        self._doc_ids.extend(doc_ids)
+        self._bm25 = BM25Okapi(self._tokenized)
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        if not self._bm25:
+            return []
+        scores = self._bm25.get_scores(BM25Index._tokenize(query))
+        pairs = sorted(zip(self._doc_ids, scores), key=lambda x: x[1], reverse=True)
+        return pairs[:top_k]
+
+
+def synthetic_corpus(n_docs: int, vocab: int, doc_len: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocab)])
+    # Zipf-like term distribution, as in natural text
+    ranks = np.arange(1, vocab + 1)
+    p = 1.0 / ranks
+    p /= p.sum()
+    lens = rng.integers(doc_len // 2, doc_len * 3 // 2, size=n_docs)
+    return [" ".join(words[rng.choice(vocab, size=int(n), p=p)]) for n in lens]
+
+
+def synthetic_queries(n: int, vocab: int, seed: int) -> List[str]:
+    rnd = random.Random(seed)
+    return [" ".join(f"w{rnd.randrange(vocab)}" for _ in range(rnd.randint(2, 6))) for _ in range(n)]
+
+
+def run(index, corpus: List[str], queries: List[str], batch: int, top_k: int) -> dict:
+    t0 = time.perf_counter()
+    for start in range(0, len(corpus), batch):
+        part = corpus[start : start + batch]
+        index.add_docs([f"d{start + i}" for i in range(len(part))], part)
+    ingest_s = time.perf_counter() - t0
+
+    lat = []
+    for q in queries:
+        t = time.perf_counter()
+        index.search(q, top_k)
+        lat.append((time.perf_counter() - t) * 1000)
+    lat.sort()
+    return {
+        "ingest_s": ingest_s,
+        "p50_ms": statistics.median(lat),
+        "p95_ms": lat[int(len(lat) * 0.95) - 1],
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--batch", type=int, default=1000, help="docs per add_docs call")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=12)
+    ap.add_argument("--vocab", type=int, default=50_000)
+    ap.add_argument("--doc-len", type=int, default=120, help="mean tokens per chunk")
+    ap.add_argument("--baseline-max", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    queries = synthetic_queries(args.queries, args.vocab, args.seed)
+    print(f"{'size':>9} {'impl':<10} {'ingest_s':>10} {'p50_ms':>9} {'p95_ms':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        corpus = synthetic_corpus(size, args.vocab, args.doc_len, args.seed)
+        impls = [("native", BM25Index())]
+        if size <= args.baseline_max:
+            impls.append(("rank_bm25", RankBM25Index()))
+        for name, index in impls:
+            r = run(index, corpus, queries, args.batch, args.top_k)
+            print(f"{size:>9} {name:<10} {r['ingest_s']:>10.2f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Component micro-benchmarks for the retrieval and scoring hot paths, on synthetic data and
+with no network access (Vertex and Pinecone are never called).
+
+    python benchmarks/bench_components.py                          # print results
+    python benchmarks/bench_components.py --save benchmarks/baseline.json
+    python benchmarks/bench_components.py --compare benchmarks/baseline.json
+
+Each case is timed --repeats times and reports throughput (items/s), per-call latency
+percentiles (median over the repeats), the fastest repeat's p50 and the spread between
+repeats (noise), plus the peak Python heap (tracemalloc, numpy buffers included) over a
+separate, untimed pass. --compare exits with status 1 when a case's fastest p50 exceeds the
+baseline's by more than --tolerance plus the noise either run saw, or its peak memory grows
+by more than --tolerance; baselines are machine-specific, so record them on the box you
+compare on.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from bench_bm25 import synthetic_corpus, synthetic_queries
+from rag_support.config import Settings
+from rag_support.rag_graph import RagGraph
+from rag_support.services.bm25_index import BM25Index
+from rag_support.services.chunk_store import ChunkStore
+from rag_support.services.chunker import Chunker
+from rag_support.services.fusion import ScoreFusion
+from rag_support.services.retrieval import RetrievalService, RetrievedDoc
+from rag_support.utils import normalize_list, rrf_merge
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], Any]  # fresh state for one pass
+    call: Callable[[Any, int], Any]  # one timed call
+    calls: int
+    items_per_call: int  # what throughput counts (docs, queries, candidates, ...)
+
+
+class _Offline:
+    """Stands in for Vertex and the vector store; the benchmarked paths must not reach them."""
+
+    def __getattr__(self, name: str) -> Any:
+        raise RuntimeError(f"benchmark reached the network client ({name})")
+
+
+def _candidates(n: int, dim: int, rng: np.random.Generator, corpus: List[str]):
+    docs = [
+        RetrievedDoc(
+            id=f"d{i}",
+            text=corpus[i % len(corpus)],
+            title=f"Doc {i}",
+            url=f"https://kb/{i}" if i % 2 else "",
+            source_id=f"kb/{i}.md",
+            chunk_id=f"d{i}",
+            semantic_score=float(rng.random()),
+            keyword_score=float(rng.random() * 20),
+        )
+        for i in range(n)
+    ]
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return docs, vectors
+
+
+def _markdown(corpus: List[str], seed: int, sections: int) -> str:
+    parts = []
+    for s in range(sections):
+        paragraphs = []
+        for p in range(6):
+            words = corpus[(seed * 131 + s * 7 + p) % len(corpus)].split(" ")
+            paragraphs.append(". ".join(" ".join(words[k : k + 12]) for k in range(0, len(words), 12)) + ".")
+        parts.append(f"# Section {s}\n\n" + "\n\n".join(paragraphs) + "\n- item one\n- item two")
+    return "\n\n".join(parts)
+
+
+def build_cases(args: argparse.Namespace) -> List[Case]:
+    rng = np.random.default_rng(args.seed)
+    corpus = synthetic_corpus(args.docs, args.vocab, args.doc_len, args.seed)
+    queries = synthetic_queries(args.queries, args.vocab, args.seed)
+    batches = [corpus[i : i + args.batch] for i in range(0, len(corpus), args.batch)]
+
+    @functools.cache
+    def built() -> BM25Index:
+        index = BM25Index()
+        for i, part in enumerate(batches):
+            index.add_docs([f"d{i * args.batch + j}" for j in range(len(part))], part)
+        return index
+
+    ranked = [
+        ([f"d{j}" for j in rng.permutation(args.docs)[: args.candidates]],
+         [f"d{j}" for j in rng.permutation(args.docs)[: args.candidates]])
+        for _ in range(args.queries)
+    ]
+    score_lists = [rng.random(args.candidates).tolist() for _ in range(args.queries)]
+
+    cfg = Settings()
+    cfg.bm25_index_dir = ""
+    chunks = ChunkStore()
+    docs, vectors = _candidates(args.candidates, args.dim, rng, corpus)
+    chunks.put_vectors(zip((d.id for d in docs), vectors))
+    svc = RetrievalService(cfg, chunk_store=chunks, vertex=_Offline(), store=_Offline())
+    query_vecs = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    sem = [
+        {"id": d.id, "score": d.semantic_score, "metadata": {"text": d.text, "chunk_id": d.id}}
+        for d in docs
+    ]
+    kw = [(d.id, d.keyword_score) for d in reversed(docs)]
+    loop = asyncio.new_event_loop()
+    fuse_sem = rng.random((args.queries, args.candidates))
+    fuse_kw = np.where(rng.random(fuse_sem.shape) < 0.5, rng.random(fuse_sem.shape) * 20, np.nan)
+    fuse_alpha = rng.random(args.queries)
+
+    # long, structured documents for the chunker: headings, paragraphs, list items
+    long_docs = [_markdown(corpus, i, sections=20) for i in range(max(1, args.docs // 200))]
+    chunker = Chunker(max_tokens=800, overlap_tokens=80)
+
+    validated = [
+        {"source_id": d.source_id, "chunk_id": d.chunk_id, "title": d.title, "url": d.url, "text": d.text}
+        for d in docs[:12]
+    ]
+    answers = [
+        " ".join(f"{q} [#{1 + (i + k) % 12}]." for k in range(4)) for i, q in enumerate(queries)
+    ]
+
+    def cite(_: Any, i: int) -> Any:
+        answer = answers[i % len(answers)]
+        return [RagGraph._citation(validated[j - 1]) for j in RagGraph._cited_indices(answer, validated)]
+
+    nq = len(queries)
+    return [
+        Case(
+            "bm25_add_docs",
+            BM25Index,
+            lambda ix, i: ix.add_docs(
+                [f"d{i * args.batch + j}" for j in range(len(batches[i]))], batches[i]
+            ),
+            len(batches),
+            args.batch,
+        ),
+        Case("bm25_search", built, lambda ix, i: ix.search(queries[i], args.top_k), nq, 1),
+        Case(
+            "bm25_search_many",
+            built,
+            lambda ix, i: ix.search_many(queries, args.top_k),
+            max(1, nq // 20),
+            nq,
+        ),
+        Case("rrf_merge", lambda: None, lambda _, i: rrf_merge(*ranked[i]), nq, args.candidates),
+        Case(
+            "normalize_list", lambda: None, lambda _, i: normalize_list(score_lists[i]), nq,
+            args.candidates,
+        ),
+        Case(
+            "validator",
+            lambda: svc,
+            lambda s, i: loop.run_until_complete(s.validator(query_vecs[i], docs)),
+            nq,
+            args.candidates,
+        ),
+        Case(
+            "hybrid_fuse",
+            lambda: svc,
+            lambda s, i: loop.run_until_complete(s._fuse(0.6, args.top_k, sem, kw)),
+            nq,
+            args.candidates,
+        ),
+        Case(
+            "fuse_many",
+            lambda: ScoreFusion(),
+            lambda f, i: f.fuse_many(fuse_sem, fuse_kw, fuse_alpha),
+            max(1, nq // 20),
+            nq * args.candidates,
+        ),
+        Case(
+            "chunker_split",
+            lambda: chunker,
+            lambda c, i: list(c.split(long_docs[i % len(long_docs)])),
+            max(1, min(nq, len(long_docs))),
+            1,
+        ),
+        Case("citations", lambda: None, cite, nq, 1),
+    ]
+
+
+def _timed_pass(case: Case) -> Dict[str, float]:
+    state = case.setup()
+    lat: List[float] = []
+    t0 = time.perf_counter()
+    for i in range(case.calls):
+        t = time.perf_counter()
+        case.call(state, i)
+        lat.append((time.perf_counter() - t) * 1000)
+    total = time.perf_counter() - t0
+    lat.sort()
+    pct = lambda p: lat[min(len(lat) - 1, int(len(lat) * p))]
+    return {
+        "items_per_s": case.calls * case.items_per_call / total if total else 0.0,
+        "p50_ms": statistics.median(lat),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def measure(case: Case, repeats: int) -> Dict[str, float]:
+    passes = [_timed_pass(case) for _ in range(max(1, repeats))]
+    p50s = [p["p50_ms"] for p in passes]
+
+    # memory on a separate pass: tracemalloc slows allocation-heavy code too much to time
+    state = case.setup()
+    tracemalloc.start()
+    for i in range(case.calls):
+        case.call(state, i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    out: Dict[str, float] = {"calls": case.calls}
+    for key in ("items_per_s", "p50_ms", "p95_ms", "p99_ms"):
+        out[key] = statistics.median(p[key] for p in passes)
+    out["p50_min_ms"] = min(p50s)
+    out["noise"] = max(p50s) / min(p50s) - 1 if min(p50s) else 0.0
+    out["peak_kb"] = peak / 1024
+    return out
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    regressions = []
+    print(f"\n{'case':<18} {'p50 vs base':>12} {'allowed':>8} {'peak vs base':>13}")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<18} {'(new)':>12}")
+            continue
+        # fastest repeat against fastest repeat, allowing for the noise either run saw
+        cur, ref = r["p50_min_ms"], base.get("p50_min_ms", base["p50_ms"])
+        allowed = tolerance + max(r["noise"], base.get("noise", 0.0))
+        ratio = cur / ref if ref else 1.0
+        # ignore sub-10µs differences
+        if ratio > 1 + allowed and cur - ref > 0.01:
+            regressions.append(f"{name}.p50_ms: {ref:.3f} -> {cur:.3f} (min of repeats)")
+        peak_ratio = r["peak_kb"] / base["peak_kb"] if base["peak_kb"] else 1.0
+        # heaps are deterministic; ignore sub-64KB growth
+        if peak_ratio > 1 + tolerance and r["peak_kb"] - base["peak_kb"] > 64:
+            regressions.append(f"{name}.peak_kb: {base['peak_kb']:.0f} -> {r['peak_kb']:.0f}")
+        print(
+            f"{name:<18} {(ratio - 1) * 100:>+11.0f}% {allowed * 100:>7.0f}%"
+            f" {(peak_ratio - 1) * 100:>+12.0f}%"
+        )
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--docs", type=int, default=20_000, help="synthetic corpus size")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--batch", type=int, default=1000, help="docs per add_docs call")
+    ap.add_argument("--candidates", type=int, default=48, help="ranked ids per fusion/validator call")
+    ap.add_argument("--top-k", type=int, default=12)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--vocab", type=int, default=50_000)
+    ap.add_argument("--doc-len", type=int, default=120, help="mean tokens per chunk")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--only", default="", help="comma-separated case names")
+    ap.add_argument("--save", metavar="PATH", help="write results as a baseline file")
+    ap.add_argument("--compare", metavar="PATH", help="compare against a baseline file")
+    ap.add_argument("--repeats", type=int, default=5, help="timed passes per case")
+    ap.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed slowdown/growth ratio, on top of noise"
+    )
+    args = ap.parse_args()
+    logging.getLogger("rag_support").setLevel(logging.WARNING)  # per-call info logs skew timings
+
+    params = {k: getattr(args, k) for k in ("docs", "queries", "batch", "candidates", "top_k", "dim", "vocab", "doc_len", "seed")}
+    only = {s for s in args.only.split(",") if s}
+    cases = [c for c in build_cases(args) if not only or c.name in only]
+
+    print(
+        f"{'case':<18} {'calls':>6} {'items/s':>12} {'p50_ms':>9} {'min_p50':>9} {'noise':>6}"
+        f" {'p95_ms':>9} {'p99_ms':>9} {'peak_kb':>10}"
+    )
+    results: Dict[str, Dict[str, float]] = {}
+    for case in cases:
+        r = results[case.name] = measure(case, args.repeats)
+        print(
+            f"{case.name:<18} {r['calls']:>6} {r['items_per_s']:>12.0f} {r['p50_ms']:>9.3f}"
+            f" {r['p50_min_ms']:>9.3f} {r['noise'] * 100:>5.0f}% {r['p95_ms']:>9.3f}"
+            f" {r['p99_ms']:>9.3f} {r['peak_kb']:>10.0f}"
+        )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {"params": params, "machine": platform.platform(), "python": platform.python_version(), "results": results},
+                f,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"warning: baseline params differ: {baseline.get('params')}", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
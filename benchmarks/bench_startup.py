@@ -0,0 +1,218 @@
+"""
+Cold-start benchmark: each run is a fresh interpreter that imports the app, runs the
+lifespan (container build and warm-up) and serves two queries over ASGI.
+
+    python benchmarks/bench_startup.py                              # print results
+    python benchmarks/bench_startup.py --save benchmarks/startup_baseline.json
+    python benchmarks/bench_startup.py --compare benchmarks/startup_baseline.json
+    python benchmarks/bench_startup.py --live                       # real Vertex / Pinecone
+
+Phases: import_main (import rag_support.main), startup (lifespan until ready),
+first_query and second_query (POST /v1/rag/query, different queries so the answer cache
+does not hit). Offline runs (the default) ingest a synthetic corpus once into a temporary
+BM25 directory and local vector store that every run reopens, and replace Vertex with a
+deterministic fake that still imports the Vertex SDK modules during warm-up, so SDK
+import cost is counted. --compare exits with status 1 when a phase's p50 exceeds the
+baseline by more than --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+PHASES = ("import_main", "startup", "first_query", "second_query")
+QUERIES = ("How do I deploy the assistant on GKE?", "Why did my ingest job fail?")
+
+
+class _FakeVertexClient:
+    """Deterministic embeddings and canned answers; imports the SDK like the real client."""
+
+    dim = 64
+
+    def __init__(self) -> None:
+        from google.cloud import aiplatform  # noqa: F401
+
+    def warmup(self) -> None:
+        from vertexai.generative_models import GenerativeModel  # noqa: F401
+        from vertexai.language_models import TextEmbeddingModel  # noqa: F401
+
+    def embed(self, texts: List[str]) -> Any:
+        import numpy as np
+
+        rows = []
+        for t in texts:
+            seed = int.from_bytes(hashlib.sha256(t.encode()).digest()[:8], "little")
+            rows.append(np.random.default_rng(seed).standard_normal(self.dim))
+        return np.vstack(rows)
+
+    def generate(self, prompt: str, temperature: float, max_tokens: int) -> Any:
+        from rag_support.services.vertex import VertexTextResult
+
+        return VertexTextResult(text="Use the deployment manifest [#1].", usage={})
+
+    def judge(self, system_prompt: str, message_json: Dict[str, Any], temperature: float = 0.0):
+        return {
+            "verdict": "pass",
+            "scores": {"groundedness": 5, "relevance": 5, "completeness": 5, "clarity": 5},
+            "flags": {"leakage_risk": False, "toxicity": False, "policy_violation": False},
+            "reasons": [],
+            "suggested_fixes": [],
+        }
+
+
+def _corpus(n: int) -> List[Dict[str, str]]:
+    topics = ["deploy", "gke", "ingest", "billing", "autoscaling", "pinecone", "vertex", "logs"]
+    return [
+        {
+            "source": f"kb/{i}.md",
+            "title": f"Doc {i}",
+            "text": " ".join(
+                f"{topics[(i + k) % len(topics)]} step {k} of the {topics[i % len(topics)]} guide."
+                for k in range(40)
+            ),
+        }
+        for i in range(n)
+    ]
+
+
+def _install_fake() -> None:
+    from rag_support.services import vertex as vertex_mod
+
+    vertex_mod.VertexClient = _FakeVertexClient  # resolved through the module at build time
+
+
+async def _child_setup(docs: int) -> None:
+    _install_fake()
+    from rag_support.api.v1.models import IngestItem
+    from rag_support.services.container import build_container
+
+    services = build_container()
+    await services.ingestion.ingest_items([IngestItem(**d) for d in _corpus(docs)])
+    await services.stop()
+
+
+async def _child_run(live: bool) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    t = time.perf_counter()
+    from rag_support.main import app
+
+    out["import_main"] = time.perf_counter() - t
+    if not live:
+        _install_fake()
+
+    import httpx
+
+    t = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        out["startup"] = time.perf_counter() - t
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if (await client.get("/v1/readyz")).status_code != 200:
+                raise RuntimeError("app not ready after lifespan startup")
+            for phase, query in zip(("first_query", "second_query"), QUERIES):
+                t = time.perf_counter()
+                r = await client.post("/v1/rag/query", json={"query": query})
+                out[phase] = time.perf_counter() - t
+                r.raise_for_status()
+    return {k: v * 1000 for k, v in out.items()}
+
+
+def _spawn(args: List[str], env: Dict[str, str]) -> str:
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args], env=env, capture_output=True, text=True
+    )
+    if proc.returncode:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"child {' '.join(args)} failed with status {proc.returncode}")
+    return proc.stdout
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    print(f"\n{'phase':<14} {'p50 vs base':>12}")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<14} {'(new)':>12}")
+            continue
+        ratio = r["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        print(f"{name:<14} {(ratio - 1) * 100:>+11.0f}%")
+        # ignore sub-5ms noise (scheduler, page cache)
+        if ratio > 1 + tolerance and r["p50_ms"] - base["p50_ms"] > 5:
+            regressions.append(f"{name}.p50_ms: {base['p50_ms']:.1f} -> {r['p50_ms']:.1f}")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    ap.add_argument("--docs", type=int, default=500, help="synthetic documents (offline only)")
+    ap.add_argument("--live", action="store_true", help="use the configured Vertex AI and Pinecone")
+    ap.add_argument("--save", metavar="PATH", help="write results as a baseline file")
+    ap.add_argument("--compare", metavar="PATH", help="compare against a baseline file")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio")
+    ap.add_argument("--child", choices=("setup", "run"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child == "setup":
+        asyncio.run(_child_setup(args.docs))
+        return
+    if args.child == "run":
+        print(json.dumps(asyncio.run(_child_run(args.live))))
+        return
+
+    env = {**os.environ, "LOG_LEVEL": "WARNING"}  # per-request info logs skew timings
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.live:
+            env.update(
+                VECTOR_BACKEND="local",
+                LOCAL_VECTOR_DIR=os.path.join(tmp, "vectors"),
+                BM25_INDEX_DIR=os.path.join(tmp, "bm25"),
+                INGEST_JOBS_IN_PROCESS="true",
+            )
+            _spawn(["--child", "setup", "--docs", str(args.docs)], env)
+        child = ["--child", "run"] + (["--live"] if args.live else [])
+        runs = [json.loads(_spawn(child, env)) for _ in range(args.runs)]
+
+    print(f"{'phase':<14} {'p50_ms':>9} {'min_ms':>9} {'max_ms':>9}")
+    results: Dict[str, Dict[str, float]] = {}
+    for phase in PHASES:
+        values = [r[phase] for r in runs]
+        r = results[phase] = {
+            "p50_ms": statistics.median(values),
+            "min_ms": min(values),
+            "max_ms": max(values),
+        }
+        print(f"{phase:<14} {r['p50_ms']:>9.1f} {r['min_ms']:>9.1f} {r['max_ms']:>9.1f}")
+
+    params = {"docs": args.docs, "live": args.live}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {"params": params, "machine": platform.platform(), "python": platform.python_version(), "results": results},
+                f,
+                indent=2,
+            )
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"warning: baseline params differ: {baseline.get('params')}", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
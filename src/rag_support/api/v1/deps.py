@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 from fastapi import Depends
-from .models import QueryRequest 
+from .models import QueryRequest
 
 from ...config import settings
+from ...rag_graph import RagGraph
+from ...services.container import ServiceContainer, get_container
+from ...services.ingest_jobs import IngestJobManager
+from ...services.ingestion import IngestionService
+from ...services.retrieval import RetrievalService
 
 
 def get_settings():
@@ -14,3 +19,22 @@ def get_query_defaults(req: QueryRequest = Depends()):
     # Could enrich defaults or validate alpha/top_k further
     return req
 
+
+def get_services() -> ServiceContainer:
+    return get_container()
+
+
+def get_retrieval(services: ServiceContainer = Depends(get_services)) -> RetrievalService:
+    return services.retrieval
+
+
+def get_graph(services: ServiceContainer = Depends(get_services)) -> RagGraph:
+    return services.graph
+
+
+def get_ingestion(services: ServiceContainer = Depends(get_services)) -> IngestionService:
+    return services.ingestion
+
+
+def get_ingest_jobs(services: ServiceContainer = Depends(get_services)) -> IngestJobManager:
+    return services.jobs
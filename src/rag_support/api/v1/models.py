@@ -62,6 +62,10 @@ class QueryRequest(BaseModel):
     metadata_filters: Optional[Dict[str, str]] = None
 
 
+class QueryBatchRequest(BaseModel):
+    queries: List[QueryRequest] = Field(min_length=1)
+
+
 class QueryDebug(BaseModel):
     retrieved_ids: List[str]
     validated: List[ValidatedChunk]
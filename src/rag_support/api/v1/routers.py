@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from .models import IngestRequest, QueryRequest, QueryResponse
-from .deps import get_settings
+import json
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from .models import IngestRequest, QueryBatchRequest, QueryRequest, QueryResponse
+from .deps import get_graph, get_ingest_jobs
 from ...logging import logger
-from ...services.ingestion import IngestionService
-from ...services.retrieval import RetrievalService
+from ...services.ingest_jobs import IngestJobManager
 from ...rag_graph import RagGraph
-from ...config import Settings
+from ...services.retrieval import SearchRequest
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 
@@ -17,22 +20,48 @@ async def healthz():
     return {"status": "ok"}
 
 
-@router.post("/rag/ingest")
-async def ingest(req: IngestRequest, cfg: Settings = Depends(get_settings)):
-    ing = IngestionService(cfg)
-    try:
-        await ing.ingest_items(req.items)
-    except Exception as e:
-        logger.exception("ingest_failed")
-        raise HTTPException(status_code=500, detail=f"ingest_failed: {e}")
-    return {"status": "ingested", "count": len(req.items)}
+@router.get("/readyz")
+async def readyz(request: Request):
+    # 503 until the lifespan has built and warmed the services
+    services = getattr(request.app.state, "services", None)
+    if services is None or not services.ready:
+        return JSONResponse({"status": "warming"}, status_code=503)
+    return {"status": "ok"}
 
 
-@router.post("/rag/query", response_model=QueryResponse)
-async def rag_query(req: QueryRequest, cfg: Settings = Depends(get_settings)):
-    retrieval = RetrievalService(cfg)
-    graph = RagGraph(cfg, retrieval=retrieval)
+@router.post("/rag/ingest", status_code=202)
+async def ingest(
+    req: IngestRequest,
+    wait: bool = False,
+    jobs: IngestJobManager = Depends(get_ingest_jobs),
+):
+    job = jobs.submit(req.items)
+    if not wait:
+        return job.as_dict()
+    job = await jobs.wait(job.job_id) or job
+    if job.status != "succeeded":
+        raise HTTPException(status_code=500, detail=job.error or f"ingest_{job.status}")
+    return JSONResponse(job.as_dict(), status_code=200)
+
+
+@router.get("/rag/ingest/{job_id}")
+async def ingest_status(job_id: str, jobs: IngestJobManager = Depends(get_ingest_jobs)):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job.as_dict()
+
+
+@router.delete("/rag/ingest/{job_id}")
+async def ingest_cancel(job_id: str, jobs: IngestJobManager = Depends(get_ingest_jobs)):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return job.as_dict()
+
 
+@router.post("/rag/query", response_model=QueryResponse)
+async def rag_query(req: QueryRequest, graph: RagGraph = Depends(get_graph)):
     try:
         answer, citations, debug, usage = await graph.run_query(
             query=req.query,
@@ -45,3 +74,56 @@ async def rag_query(req: QueryRequest, cfg: Settings = Depends(get_settings)):
         raise HTTPException(status_code=500, detail=f"query_failed: {e}")
 
     return QueryResponse(answer=answer, citations=citations, debug=debug, usage=usage)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/rag/query:stream")
+async def rag_query_stream(req: QueryRequest, graph: RagGraph = Depends(get_graph)):
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in graph.stream_query(
+                query=req.query,
+                top_k=req.top_k,
+                alpha=req.alpha,
+                metadata_filters=req.metadata_filters or {},
+            ):
+                yield _sse(event, data)
+        except Exception as e:
+            # headers are already sent; report the failure in-band
+            logger.exception("query_stream_failed")
+            yield _sse("error", {"detail": f"query_failed: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/rag/query:batch")
+async def rag_query_batch(req: QueryBatchRequest, graph: RagGraph = Depends(get_graph)):
+    """
+    One NDJSON line per query, in input order: {"index", ...QueryResponse} or
+    {"index", "error"}. A failing query does not fail the batch.
+    """
+    max_size = graph.cfg.query_batch_max_size
+    if len(req.queries) > max_size:
+        raise HTTPException(status_code=413, detail=f"at most {max_size} queries per batch")
+    requests = [
+        SearchRequest(q.query, q.alpha, q.top_k, q.metadata_filters or {}) for q in req.queries
+    ]
+
+    async def lines() -> AsyncIterator[str]:
+        async for index, result in graph.run_batch(requests):
+            if isinstance(result, Exception):
+                row: Dict[str, Any] = {"index": index, "error": f"query_failed: {result}"}
+            else:
+                answer, citations, debug, usage = result
+                response = QueryResponse(answer=answer, citations=citations, debug=debug, usage=usage)
+                row = {"index": index, **response.model_dump(mode="json")}
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -12,23 +12,169 @@ class Settings(BaseModel):
         default_factory=lambda: os.getenv("VERTEX_EMBED_MODEL_ID", "text-embedding-004")
     )
 
+    vertex_max_threads: int = Field(default_factory=lambda: int(os.getenv("VERTEX_MAX_THREADS", "32")))
+    vertex_embed_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("VERTEX_EMBED_CONCURRENCY", "16"))
+    )
+    vertex_generate_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("VERTEX_GENERATE_CONCURRENCY", "32"))
+    )
+    vertex_judge_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("VERTEX_JUDGE_CONCURRENCY", "32"))
+    )
+    vertex_embed_timeout_s: float = Field(
+        default_factory=lambda: float(os.getenv("VERTEX_EMBED_TIMEOUT_S", "10"))
+    )
+    vertex_generate_timeout_s: float = Field(
+        default_factory=lambda: float(os.getenv("VERTEX_GENERATE_TIMEOUT_S", "60"))
+    )
+    vertex_judge_timeout_s: float = Field(
+        default_factory=lambda: float(os.getenv("VERTEX_JUDGE_TIMEOUT_S", "30"))
+    )
+
     pinecone_api_key: str = Field(default_factory=lambda: os.getenv("PINECONE_API_KEY", ""))
     pinecone_env: str = Field(default_factory=lambda: os.getenv("PINECONE_ENV", "us-east-1"))
     pinecone_index: str = Field(default_factory=lambda: os.getenv("PINECONE_INDEX", "rag-support-assistant"))
     pinecone_dim: int = Field(default_factory=lambda: int(os.getenv("PINECONE_DIM", "3072")))
 
+    # "pinecone", "local" (in-process store) or "pinecone_cached" (local read-through cache)
+    vector_backend: str = Field(default_factory=lambda: os.getenv("VECTOR_BACKEND", "pinecone"))
+    local_vector_dir: str = Field(default_factory=lambda: os.getenv("LOCAL_VECTOR_DIR", ""))
+    local_vector_index: str = Field(default_factory=lambda: os.getenv("LOCAL_VECTOR_INDEX", "exact"))
+    local_vector_ivf_min_rows: int = Field(
+        default_factory=lambda: int(os.getenv("LOCAL_VECTOR_IVF_MIN_ROWS", "10000"))
+    )
+    local_vector_nprobe: int = Field(default_factory=lambda: int(os.getenv("LOCAL_VECTOR_NPROBE", "8")))
+    local_vector_cache_size: int = Field(
+        default_factory=lambda: int(os.getenv("LOCAL_VECTOR_CACHE_SIZE", "100000"))
+    )
+
     rag_top_k: int = Field(default_factory=lambda: int(os.getenv("RAG_TOP_K", "8")))
     hybrid_alpha: float = Field(default_factory=lambda: float(os.getenv("HYBRID_ALPHA", "0.7")))
     bm25_top_k: int = Field(default_factory=lambda: int(os.getenv("BM25_TOP_K", "12")))
     semantic_top_k: int = Field(default_factory=lambda: int(os.getenv("SEMANTIC_TOP_K", "12")))
+    semantic_timeout_s: float = Field(default_factory=lambda: float(os.getenv("SEMANTIC_TIMEOUT_S", "5")))
+    bm25_timeout_s: float = Field(default_factory=lambda: float(os.getenv("BM25_TIMEOUT_S", "2")))
+    bm25_index_dir: str = Field(default_factory=lambda: os.getenv("BM25_INDEX_DIR", ""))
+    bm25_refresh_s: float = Field(default_factory=lambda: float(os.getenv("BM25_REFRESH_S", "5")))
+    bm25_max_segments: int = Field(default_factory=lambda: int(os.getenv("BM25_MAX_SEGMENTS", "8")))
+    bm25_merge_interval_s: float = Field(
+        default_factory=lambda: float(os.getenv("BM25_MERGE_INTERVAL_S", "60"))
+    )
+    # "weighted": alpha-weighted normalized scores; "rrf": alpha-weighted reciprocal ranks
+    fusion_strategy: str = Field(default_factory=lambda: os.getenv("FUSION_STRATEGY", "weighted"))
+    # "minmax" or "zscore" score normalization for the weighted strategy
+    fusion_normalization: str = Field(default_factory=lambda: os.getenv("FUSION_NORMALIZATION", "minmax"))
+    fusion_rrf_k: int = Field(default_factory=lambda: int(os.getenv("FUSION_RRF_K", "60")))
+    # validator confidence weights: cosine, reciprocal rank, source prior
+    validator_weights: str = Field(default_factory=lambda: os.getenv("VALIDATOR_WEIGHTS", "0.6,0.25,0.15"))
     similarity_threshold: float = Field(default_factory=lambda: float(os.getenv("SIMILARITY_THRESHOLD", "0.25")))
+    embed_cache_size: int = Field(default_factory=lambda: int(os.getenv("EMBED_CACHE_SIZE", "10000")))
+    embed_cache_ttl_s: float = Field(default_factory=lambda: float(os.getenv("EMBED_CACHE_TTL_S", "3600")))
+    # per-process LRU bound on cached chunk metadata and chunk embeddings
+    vector_cache_size: int = Field(default_factory=lambda: int(os.getenv("VECTOR_CACHE_SIZE", "50000")))
+
+    # chunk size in approximate tokens; overlap is whole sentences up to this many tokens
+    chunk_max_tokens: int = Field(default_factory=lambda: int(os.getenv("CHUNK_MAX_TOKENS", "800")))
+    chunk_overlap_tokens: int = Field(default_factory=lambda: int(os.getenv("CHUNK_OVERLAP_TOKENS", "80")))
+    # per-source chunk hashes for incremental re-ingestion; defaults to BM25_INDEX_DIR/sources
+    ingest_manifest_dir: str = Field(default_factory=lambda: os.getenv("INGEST_MANIFEST_DIR", ""))
+    # ingestion pipeline: Vertex takes <=250 texts and ~20k tokens per embed call,
+    # Pinecone recommends <=100 vectors per upsert
+    ingest_embed_batch_size: int = Field(
+        default_factory=lambda: int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+    )
+    ingest_embed_batch_chars: int = Field(
+        default_factory=lambda: int(os.getenv("INGEST_EMBED_BATCH_CHARS", "60000"))
+    )
+    ingest_upsert_batch_size: int = Field(
+        default_factory=lambda: int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "100"))
+    )
+    ingest_embed_workers: int = Field(default_factory=lambda: int(os.getenv("INGEST_EMBED_WORKERS", "4")))
+    ingest_queue_size: int = Field(default_factory=lambda: int(os.getenv("INGEST_QUEUE_SIZE", "8")))
+    ingest_max_retries: int = Field(default_factory=lambda: int(os.getenv("INGEST_MAX_RETRIES", "3")))
+    ingest_retry_backoff_s: float = Field(
+        default_factory=lambda: float(os.getenv("INGEST_RETRY_BACKOFF_S", "0.5"))
+    )
+    # background ingest jobs; with INGEST_JOBS_DIR set, jobs are spooled there and can be
+    # served by `python -m rag_support.ingest_worker` (INGEST_JOBS_IN_PROCESS=false)
+    ingest_max_concurrent_jobs: int = Field(
+        default_factory=lambda: int(os.getenv("INGEST_MAX_CONCURRENT_JOBS", "1"))
+    )
+    ingest_jobs_dir: str = Field(default_factory=lambda: os.getenv("INGEST_JOBS_DIR", ""))
+    ingest_jobs_in_process: bool = Field(
+        default_factory=lambda: os.getenv("INGEST_JOBS_IN_PROCESS", "true").lower() == "true"
+    )
+    ingest_job_history: int = Field(default_factory=lambda: int(os.getenv("INGEST_JOB_HISTORY", "1000")))
+    ingest_job_poll_s: float = Field(default_factory=lambda: float(os.getenv("INGEST_JOB_POLL_S", "1.0")))
+
+    # file holding the corpus version that invalidates the answer and chunk caches; share it
+    # between every API process and the ingest worker. Defaults to BM25_INDEX_DIR/index_version
+    index_version_path: str = Field(default_factory=lambda: os.getenv("INDEX_VERSION_PATH", ""))
+    answer_cache_enabled: bool = Field(
+        default_factory=lambda: os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    )
+    answer_cache_threshold: float = Field(
+        default_factory=lambda: float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    )
+    answer_cache_size: int = Field(default_factory=lambda: int(os.getenv("ANSWER_CACHE_SIZE", "1000")))
+    answer_cache_ttl_s: float = Field(default_factory=lambda: float(os.getenv("ANSWER_CACHE_TTL_S", "900")))
+
+    # /v1/rag/query:batch: max queries per request, and how many generate concurrently
+    query_batch_max_size: int = Field(default_factory=lambda: int(os.getenv("QUERY_BATCH_MAX_SIZE", "1000")))
+    query_batch_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("QUERY_BATCH_CONCURRENCY", "8"))
+    )
+    # semantic queries of one batch in flight, and the keyword budget for the whole batch
+    query_batch_search_concurrency: int = Field(
+        default_factory=lambda: int(os.getenv("QUERY_BATCH_SEARCH_CONCURRENCY", "8"))
+    )
+    bm25_batch_timeout_s: float = Field(
+        default_factory=lambda: float(os.getenv("BM25_BATCH_TIMEOUT_S", "10"))
+    )
+
+    # prompt budget for validated context (approximate tokens); neighbouring chunks of one
+    # source are merged with their shared overlap removed before packing
+    context_max_tokens: int = Field(default_factory=lambda: int(os.getenv("CONTEXT_MAX_TOKENS", "6000")))
 
     gen_temperature: float = Field(default_factory=lambda: float(os.getenv("GEN_TEMPERATURE", "0.2")))
     max_tokens: int = Field(default_factory=lambda: int(os.getenv("MAX_TOKENS", "1024")))
 
+    # "inline": judge before responding; "async": respond first, judge a sample in the background
+    eval_mode: str = Field(default_factory=lambda: os.getenv("EVAL_MODE", "inline"))
+    eval_sample_rate: float = Field(default_factory=lambda: float(os.getenv("EVAL_SAMPLE_RATE", "1.0")))
+    # "on_fail": re-run generation when an inline verdict fails; "never": report only.
+    # Inline only: with EVAL_MODE=async the verdict comes after the response, so no repair
+    eval_repair: str = Field(default_factory=lambda: os.getenv("EVAL_REPAIR", "on_fail"))
+    # repair passes after a failed inline verdict; each raises the confidence cutoff by the step
+    repair_max_attempts: int = Field(default_factory=lambda: int(os.getenv("REPAIR_MAX_ATTEMPTS", "1")))
+    repair_confidence_step: float = Field(default_factory=lambda: float(os.getenv("REPAIR_CONFIDENCE_STEP", "0.1")))
+    eval_workers: int = Field(default_factory=lambda: int(os.getenv("EVAL_WORKERS", "4")))
+    eval_queue_size: int = Field(default_factory=lambda: int(os.getenv("EVAL_QUEUE_SIZE", "1000")))
+    eval_results_path: str = Field(default_factory=lambda: os.getenv("EVAL_RESULTS_PATH", ""))
+
+    # retrieval run once at startup (embed, vector query, BM25) so connections are open
+    # before readiness reports OK; empty skips it
+    warmup_query: str = Field(default_factory=lambda: os.getenv("WARMUP_QUERY", ""))
+
     host: str = Field(default_factory=lambda: os.getenv("HOST", "0.0.0.0"))
     port: int = Field(default_factory=lambda: int(os.getenv("PORT", "8080")))
     log_level: str = Field(default_factory=lambda: os.getenv("LOG_LEVEL", "INFO"))
+    # "json" (one object per line, extra= fields included) or "text"
+    log_format: str = Field(default_factory=lambda: os.getenv("LOG_FORMAT", "json"))
+    # extra= keys masked in JSON logs, at any nesting depth
+    log_redact_keys: str = Field(
+        default_factory=lambda: os.getenv(
+            "LOG_REDACT_KEYS", "api_key,authorization,password,secret,token,pinecone_api_key"
+        )
+    )
+    # per-event fraction of records kept below WARNING, e.g. "hybrid_search=0.01,ingest_progress=0.1"
+    log_sample_rates: str = Field(default_factory=lambda: os.getenv("LOG_SAMPLE_RATES", ""))
+    log_queue_size: int = Field(default_factory=lambda: int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    # add per-stage timings (time_<stage>_ms) and call counts (calls_<service>) to debug.scores
+    debug_timings: bool = Field(
+        default_factory=lambda: os.getenv("DEBUG_TIMINGS", "false").lower() == "true"
+    )
 
     google_application_credentials: str = Field(
         default_factory=lambda: os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
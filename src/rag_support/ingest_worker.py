@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import asyncio
+
+from .logging import logger
+from .services.container import build_container
+
+
+async def main() -> None:
+    """
+    Serve ingest jobs spooled in INGEST_JOBS_DIR by API processes running with
+    INGEST_JOBS_IN_PROCESS=false.
+    """
+    services = build_container()
+    if not services.cfg.ingest_jobs_dir:
+        raise SystemExit("INGEST_JOBS_DIR must be set to run a standalone ingest worker")
+    await services.warmup()
+    logger.info("ingest_worker_started", extra={"jobs_dir": services.cfg.ingest_jobs_dir})
+    try:
+        await services.jobs.run_forever()
+    finally:
+        await services.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
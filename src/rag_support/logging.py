@@ -1,26 +1,152 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import json
 import logging
-import os
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any, Dict
 
-LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+from rag_support import metrics
+from rag_support.config import settings
 
-_handler = logging.StreamHandler()
-_formatter = logging.Formatter(
-    fmt="%(asctime)s %(levelname)s %(name)s %(message)s",
-    datefmt="%Y-%m-%dT%H:%M:%S%z",
-)
-_handler.setFormatter(_formatter)
+LEVEL = settings.log_level.upper()
 
-logger = logging.getLogger("rag_support")
-logger.setLevel(LEVEL)
-if not logger.handlers:
-    logger.addHandler(_handler)
+REDACTED = "***REDACTED***"
+
+# attributes every LogRecord has; anything else on a record came from `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "taskName",
+    "request_id",
+}
+
+# set per HTTP request by the middleware in main.py
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+LOG_DROPPED = metrics.REGISTRY.counter(
+    "rag_log_records_dropped_total", "Log records dropped because the log queue was full."
+)
 
 
 def redact(d: Dict[str, Any], keys: set[str]) -> Dict[str, Any]:
     out = {}
     for k, v in d.items():
-        out[k] = "***REDACTED***" if k in keys else v
+        if k in keys:
+            out[k] = REDACTED
+        elif isinstance(v, dict):
+            out[k] = redact(v, keys)
+        else:
+            out[k] = v
     return out
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, event (the message), request_id, every
+    `extra=` field (with `redact_keys` masked at any depth), and exc for tracebacks.
+    """
+
+    def __init__(self, redact_keys: set[str] | None = None) -> None:
+        super().__init__()
+        self.redact_keys = redact_keys or set()
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        rid = getattr(record, "request_id", None)
+        if rid:
+            out["request_id"] = rid
+        extra = {k: v for k, v in vars(record).items() if k not in _RESERVED}
+        out.update(redact(extra, self.redact_keys) if self.redact_keys else extra)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _ContextFilter(logging.Filter):
+    """
+    Captures the request id while still on the logging thread, and samples noisy events:
+    `rates` maps event names to the fraction kept. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(str(record.msg))
+        if rate is not None and record.levelno < logging.WARNING and random.random() >= rate:
+            return False
+        record.request_id = request_id.get()
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread; drops (and counts) them when the queue is full
+    rather than blocking the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # resolve the message and traceback now; serialization and I/O happen on the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+def _sample_rates(spec: str) -> Dict[str, float]:
+    # "hybrid_search=0.01,ingest_progress=0.1"
+    rates = {}
+    for part in spec.split(","):
+        if "=" in part:
+            event, rate = part.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+logger = logging.getLogger("rag_support")
+logger.setLevel(LEVEL)
+
+if not logger.handlers:
+    _stream = logging.StreamHandler(sys.stderr)
+    if settings.log_format == "json":
+        _stream.setFormatter(
+            JsonFormatter({k.strip() for k in settings.log_redact_keys.split(",") if k.strip()})
+        )
+    else:
+        _stream.setFormatter(
+            logging.Formatter(
+                fmt="%(asctime)s %(levelname)s %(name)s %(message)s",
+                datefmt="%Y-%m-%dT%H:%M:%S%z",
+            )
+        )
+    _queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.log_queue_size)
+    _listener = QueueListener(_queue, _stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # drains what is still queued
+    logger.addHandler(_NonBlockingQueueHandler(_queue))
+    logger.addFilter(_ContextFilter(_sample_rates(settings.log_sample_rates)))
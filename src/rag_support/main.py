@@ -1,12 +1,67 @@
 from __future__ import annotations
 
-import os
-from fastapi import FastAPI
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
+from . import logging as rag_logging
+from . import metrics
 from .api.v1.routers import router as v1_router
+from .services.container import build_container, set_container
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # build clients once and warm them before serving traffic; the heavy SDKs are
+    # first imported here, not when this module loads
+    services = build_container()
+    set_container(services)
+    app.state.services = services
+    await services.warmup()
+    services.start()
+    yield
+    await services.stop()
+    set_container(None)
 
-app = FastAPI(title="RAG Support Assistant", version="0.1.0")
+
+app = FastAPI(title="RAG Support Assistant", version="0.1.0", lifespan=lifespan)
 app.include_router(v1_router)
 
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # label by route template, not raw path, to keep series bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - t0, method=request.method, route=route, status=status
+        )
+
+
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    # every log line written while serving this request carries its id
+    rid = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = rag_logging.request_id.set(rid)
+    try:
+        response = await call_next(request)
+    finally:
+        rag_logging.request_id.reset(token)
+    response.headers["X-Request-ID"] = rid
+    return response
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     return {"message": "RAG Support Assistant is running"}
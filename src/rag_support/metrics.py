@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; spans from sub-millisecond BM25 lookups up to slow Gemini generations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _fmt(self, key: Labels, extra: Dict[str, str] | None = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{self._fmt(key)} {v:g}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for le, n in zip([*(f"{b:g}" for b in self.buckets), "+Inf"], counts):
+                cumulative += n
+                yield f"{self.name}_bucket{self._fmt(key, {'le': le})} {cumulative}"
+            yield f"{self.name}_sum{self._fmt(key)} {total:g}"
+            yield f"{self.name}_count{self._fmt(key)} {cumulative}"
+
+
+class Registry:
+    """
+    Process-local metrics in the Prometheus text exposition format. Each worker process
+    keeps its own; scrape every pod/worker and aggregate in Prometheus.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, doc, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, doc, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds", "Time spent in each query pipeline stage.", ("stage",)
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "rag_http_request_duration_seconds",
+    "HTTP request latency until the response starts.",
+    ("method", "route", "status"),
+)
+EXTERNAL_CALLS = REGISTRY.counter(
+    "rag_external_calls_total", "Calls made to Vertex AI and Pinecone.", ("service", "op")
+)
+QUERY_CALLS = REGISTRY.histogram(
+    "rag_query_external_calls",
+    "Vertex AI / Pinecone calls made while answering one query.",
+    ("service",),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "Gemini tokens reported in usage metadata.", ("kind",)
+)
+JUDGE_JOBS = REGISTRY.counter(
+    "rag_judge_jobs_total",
+    "Background judge jobs by outcome (submitted, dropped, completed, failed).",
+    ("outcome",),
+)
+JUDGE_VERDICTS = REGISTRY.counter(
+    "rag_judge_verdicts_total", "Verdicts returned by the background judge.", ("verdict",)
+)
+
+_SERVICES = ("vertex", "pinecone")
+
+
+@dataclass
+class RequestMetrics:
+    """
+    Stage timings and external call counts collected for one query.
+    """
+
+    stages: Dict[str, float] = field(default_factory=dict)  # seconds, summed over repeats
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    def scores(self) -> Dict[str, float]:
+        out = {f"time_{stage}_ms": round(s * 1000, 3) for stage, s in self.stages.items()}
+        out.update({f"calls_{svc}": float(n) for svc, n in self.calls.items()})
+        return out
+
+
+# set per query by track_request; copied into tasks and to_thread workers it spawns
+_CURRENT: ContextVar[RequestMetrics | None] = ContextVar("rag_request_metrics", default=None)
+
+
+@contextlib.contextmanager
+def track_request() -> Iterator[RequestMetrics]:
+    rm = RequestMetrics()
+    token = _CURRENT.set(rm)
+    try:
+        yield rm
+    finally:
+        _CURRENT.reset(token)
+        for svc in _SERVICES:
+            QUERY_CALLS.observe(rm.calls.get(svc, 0), service=svc)
+
+
+@contextlib.contextmanager
+def span(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        rm = _CURRENT.get()
+        if rm is not None:
+            rm.stages[stage] = rm.stages.get(stage, 0.0) + elapsed
+
+
+async def timed(stage: str, aw: Awaitable[T]) -> T:
+    with span(stage):
+        return await aw
+
+
+def count_call(service: str, op: str) -> None:
+    EXTERNAL_CALLS.inc(service=service, op=op)
+    rm = _CURRENT.get()
+    if rm is not None:
+        rm.calls[service] = rm.calls.get(service, 0) + 1
+
+
+def record_tokens(usage: Dict[str, int]) -> None:
+    for kind in ("prompt_tokens", "candidates_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], kind=kind.removesuffix("_tokens"))
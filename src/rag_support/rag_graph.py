@@ -1,16 +1,35 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple
+import asyncio
+import contextlib
+import random
+import re
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Tuple,
+    TypedDict,
+)
 
 import numpy as np
-from langgraph.graph import StateGraph, END
 
-from rag_support.config import settings
+from rag_support import metrics
+from rag_support.config import Settings, settings
 from rag_support.logging import logger
-from rag_support.api.v1.models import Citation, QueryDebug
-from rag_support.services.retrieval import RetrievalService
-from rag_support.services.vertex import VertexClient
+from rag_support.api.v1.models import Citation, JudgeReport, QueryDebug
+from rag_support.services.answer_cache import _GLOBAL_ANSWER_CACHE, AnswerCache
+from rag_support.services.context_packer import ContextPacker
+from rag_support.services.judge_queue import JudgeQueue
+from rag_support.services.retrieval import RetrievalService, SearchRequest
+from rag_support.services.vertex import AsyncVertexClient, VertexClient
 
+# id-like tokens in judge feedback: word characters joined by . / : - (trailing punctuation dropped)
+_ID_TOKEN_RE = re.compile(r"\w+(?:[./:-]+\w+)*")
 
 GENERATOR_SYSTEM_PROMPT = """You are a Support Assistant. Follow STRICT grounding rules:
 - Only answer using the provided VALIDATED CONTEXTS.
@@ -30,150 +49,503 @@ EVALUATOR_SYSTEM_PROMPT = """You are a strict JSON-only judge. Output ONLY a JSO
 Evaluate whether the answer is grounded in the provided validated chunks and free of hallucinations, secrets, PII/PHI.
 """
 
+QueryResult = Tuple[str, List[Citation], QueryDebug, Dict[str, int]]  # answer, citations, debug, usage
+
+
+class RagState(TypedDict, total=False):
+    cfg: Settings
+    query: str
+    query_vec: np.ndarray
+    retrieved: List[Any]
+    validated: List[Dict[str, Any]]
+    answer: str
+    citations: List[Citation]
+    usage: Dict[str, int]
+    judge_report: Dict[str, Any]
+    context_stats: Dict[str, float]
+    evaluate: bool
+    repair_hints: List[str]
+
+
+def _unjudged_report(verdict: str, reason: str) -> Dict[str, Any]:
+    return {
+        "verdict": verdict,
+        "scores": {},
+        "flags": {},
+        "reasons": [reason],
+        "suggested_fixes": [],
+    }
 
 
 class RagGraph:
     """
     LangGraph RAG pipeline: retriever -> validator -> generator -> evaluator -> (optional repair)
-    "
-    def __init__(self, cfg=settings, retrieval: RetrievalService | None = None):
+    The graph is compiled once per instance; per-request settings travel in the state.
+    """
+
+    def __init__(
+        self,
+        cfg=settings,
+        retrieval: RetrievalService | None = None,
+        vertex: AsyncVertexClient | None = None,
+        answer_cache: AnswerCache | None = None,
+        judge_queue: JudgeQueue | None = None,
+    ):
         self.cfg = cfg
-        self.vertex = VertexClient()
-        self.retrieval = retrieval or RetrievalService(cfg)
-    def run_query(
-        self, query: str, top_k: int, alpha: float, metadata_filters: Dict[str, Any]
-    ) ->         # Build graph on-demand (small graph, OK to compile per request)
-
-        def node_retriever(state: Dict[str, Any]) -> Dict[str, Any]:
-            # docs are already retrieved asynchronously outside the graph
-            docs = state["retrieved"]
-            return {"retrieved": docs}
-
-        def node_validator(state: Dict[str, Any]) -> Dict[str, Any]:
-            qv = state["query_vec"]
-            docs = state["retrieved"]
-            validated = self.retrieval.validator(qv, docs)
-            validated = [
-                v for v in validated if v["confidence"] >= self.cfg.similarity_threshold
-            ]
-            return {"validated": validated}
-
-        def node_generator(state: Dict[str, Any]) -> Dict[str, Any]:
-            validated = state.get("validated", [])
-            if not validated:
-                answer = "I don't have enough information to answer."
-                usage = {"prompt_tokens": 0, "candidates_tokens": 0}
-                return {"answer": answer, "citations": [], "usage": usage}
-
-            # Build context and citation map
-            ctx_lines = [f"[{i}] {v['text']}" for i, v in enumerate(validated, start=1)]
-            cite_map = {str(i): v for i, v in enumerate(validated, start=1)}
-            user_prompt = state["query"]
-
-            prompt = (
-                GENERATOR_SYSTEM_PROMPT
-                + "\n\nCONTEXT:\n"
-                + "\n".join(ctx_lines)
-                + "\n\nUSER:\n"
-                + user_prompt
-                + "\n\nRemember to cite using [#source-id]."
-            )
+        if vertex is None:
+            vertex = retrieval.vertex if retrieval else AsyncVertexClient(VertexClient(), cfg)
+        self.vertex = vertex
+        self.retrieval = retrieval or RetrievalService(cfg, vertex=self.vertex)
+        if answer_cache is None and cfg.answer_cache_enabled:
+            if cfg.ingest_jobs_in_process or _GLOBAL_ANSWER_CACHE.version.shared:
+                answer_cache = _GLOBAL_ANSWER_CACHE
+            else:
+                # an out-of-process ingest could never invalidate this process's cache
+                logger.warning(
+                    "answer_cache_disabled",
+                    extra={"reason": "ingest runs out of process and INDEX_VERSION_PATH is unset"},
+                )
+        self.answer_cache = answer_cache
+        if cfg.eval_mode == "async" and cfg.eval_repair == "on_fail":
+            # the verdict arrives after the response was sent: nothing left to repair
+            logger.warning("eval_repair_disabled", extra={"reason": "EVAL_MODE=async"})
+        if judge_queue is None and cfg.eval_mode == "async":
+            judge_queue = JudgeQueue(self.vertex, EVALUATOR_SYSTEM_PROMPT, cfg)
+        self.judge_queue = judge_queue
+        self.app = self._build_graph()
 
-            result = self.vertex.generate(
-                prompt,
-                temperature=self.cfg.gen_temperature,
-                max_tokens=self.cfg.max_tokens,
-            )
-            answer = (result.text or "").strip()
-            usage = result.usage
-
-            # Build citations list from markers like [#1], [#2], ...
-            citations: List[Citation] = []
-            for i, doc in cite_map.items():
-                if f"[#{i}]" in answer:
-                    citations.append(
-                        Citation(
-                            source_id=doc.get("source_id"),
-                            title=doc.get("title"),
-                            url=doc.get("url"),
-                            chunk_id=doc.get("chunk_id"),
-                        )
-                    )
-
-            return {"answer": answer, "citations": citations, "usage": usage}
-
-        def node_evaluator(state: Dict[str, Any]) -> Dict[str, Any]:
-            # Prepare payload for LLM-as-judge
-            citations: List[Citation] = state.get("citations", [])
-            payload = {
-            
-                "query": state.get("query", ""),
-                "answer": state.get("answer", ""),
-         
-              "citations": [
-                    {
-                        "source_id": c.source_id,
-                        "title": c.title,
-                        "url": c.url,
-                        "chunk_id": c.chunk_id,
-                    }
-                    for c in citations
-                ],
-                "validated": state.get("validated", []),
-            }
-
-            report = self.vertex.judge(
-                EVALUATOR_SYSTEM_PROMPT,
-                payload,
-                temperature=0.0,
-            )
-            return {"judge_report": report}
+    def _build_graph(self):
+        from langgraph.graph import END, StateGraph
 
-        # Build the LangGraph
-        graph = StateGraph(dict)
-        graph.add_node("retriever", node_retriever)
-        graph.add_node("validator", node_validator)
-        graph.add_node("generator", node_generator)
-        graph.add_node("evaluator", node_evaluator)
+        graph = StateGraph(RagState)
+        graph.add_node("retriever", self._timed_node("retriever", self.node_retriever))
+        graph.add_node("validator", self._timed_node("validator", self.node_validator))
+        graph.add_node("generator", self._timed_node("generator", self.node_generator))
+        graph.add_node("evaluator", self._timed_node("evaluator", self.node_evaluator))
 
         graph.set_entry_point("retriever")
         graph.add_edge("retriever", "validator")
         graph.add_edge("validator", "generator")
-        graph.add_edge("generator", "evaluator")
+        graph.add_conditional_edges(
+            "generator",
+            lambda state: "evaluator" if state.get("evaluate", True) else END,
+            {"evaluator": "evaluator", END: END},
+        )
         graph.add_edge("evaluator", END)
-        app = graph.compile()
+        return graph.compile()
+
+    @staticmethod
+    def _timed_node(name: str, node: Callable[[RagState], Awaitable[Dict[str, Any]]]):
+        async def run(state: RagState) -> Dict[str, Any]:
+            with metrics.span(f"node_{name}"):
+                return await node(state)
+
+        return run
+
+    async def node_retriever(self, state: RagState) -> Dict[str, Any]:
+        # docs are already retrieved asynchronously outside the graph
+        return {"retrieved": state["retrieved"]}
 
-        # Run retrieval outside the graph (async)
-        qv = self.vertex.embed([query])[0]
-        retrieved = await self.retrieval.hybrid_search(
-            query=query, alpha=alpha, top_k=top_k, metadata_filters=metadata_filters
+    async def node_validator(self, state: RagState) -> Dict[str, Any]:
+        cfg = state.get("cfg", self.cfg)
+        validated = await self.retrieval.validator(state["query_vec"], state["retrieved"])
+        validated = [v for v in validated if v["confidence"] >= cfg.similarity_threshold]
+        return {"validated": validated}
+
+    async def node_generator(self, state: RagState) -> Dict[str, Any]:
+        cfg = state.get("cfg", self.cfg)
+        validated = state.get("validated", [])
+        if not validated:
+            answer = "I don't have enough information to answer."
+            usage = {"prompt_tokens": 0, "candidates_tokens": 0}
+            return {"answer": answer, "citations": [], "usage": usage}
+
+        context = ContextPacker(cfg.context_max_tokens).pack(validated)
+        result = await self.vertex.generate(
+            self._build_prompt(state["query"], context.entries, state.get("repair_hints")),
+            temperature=cfg.gen_temperature,
+            max_tokens=cfg.max_tokens,
         )
+        answer = (result.text or "").strip()
+        cited = self._cited_indices(answer, context.entries)
+        citations = [self._citation(context.entries[i - 1]) for i in cited]
+        return {
+            "answer": answer,
+            "citations": citations,
+            "usage": result.usage,
+            "context_stats": context.stats(),
+        }
 
-        # Invoke graph
-        result = app.invoke({"query": query, "query_vec": qv, "retrieved": retrieved})
-        answer: str = result.get("answer", "")
-        citations: List[Citation] = result.get("citations", [])
-        report = result.get("judge_report", {"verdict": "pass"})
+    @staticmethod
+    def _build_prompt(
+        query: str, context: List[Dict[str, Any]], repair_hints: List[str] | None = None
+    ) -> str:
+        # Build context; the [i] positions double as the citation map
+        ctx_lines = [f"[{i}] {v['text']}" for i, v in enumerate(context, start=1)]
+        feedback = ""
+        if repair_hints:
+            feedback = "\n\nREVIEWER FEEDBACK ON A PREVIOUS ANSWER:\n" + "\n".join(
+                f"- {h}" for h in repair_hints
+            )
+        return (
+            GENERATOR_SYSTEM_PROMPT
+            + "\n\nCONTEXT:\n"
+            + "\n".join(ctx_lines)
+            + feedback
+            + "\n\nUSER:\n"
+            + query
+            + "\n\nRemember to cite using [#source-id]."
+        )
+
+    @staticmethod
+    def _cited_indices(answer: str, context: List[Dict[str, Any]]) -> List[int]:
+        # markers like [#1], [#2], ... in context order
+        return [i for i in range(1, len(context) + 1) if f"[#{i}]" in answer]
+
+    @staticmethod
+    def _citation(doc: Dict[str, Any]) -> Citation:
+        return Citation(
+            source_id=doc.get("source_id"),
+            title=doc.get("title"),
+            url=doc.get("url"),
+            chunk_id=doc.get("chunk_id"),
+        )
+
+    async def node_evaluator(self, state: RagState) -> Dict[str, Any]:
+        report = await self.vertex.judge(
+            EVALUATOR_SYSTEM_PROMPT,
+            self._judge_payload(state),
+            temperature=0.0,
+        )
+        return {"judge_report": report}
+
+    def _defer_evaluation(
+        self,
+        state: RagState,
+        on_verdict: Callable[[Dict[str, Any]], None] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Async eval mode: hand a sampled share of answers to the background judge and
+        return a placeholder report right away.
+        """
+        cfg = state.get("cfg", self.cfg)
+        if self.judge_queue is None or random.random() >= cfg.eval_sample_rate:
+            return _unjudged_report("skipped", "not_sampled")
+        if not self.judge_queue.submit(self._judge_payload(state), on_verdict=on_verdict):
+            return _unjudged_report("skipped", "judge_queue_full")
+        return _unjudged_report("pending", "evaluated_async")
+
+    async def _evaluate(self, state: RagState) -> Dict[str, Any]:
+        if state.get("evaluate", True):
+            return (await self.node_evaluator(state))["judge_report"]
+        return self._defer_evaluation(state)
+
+    @staticmethod
+    def _judge_payload(state: RagState) -> Dict[str, Any]:
+        # Prepare payload for LLM-as-judge
+        citations: List[Citation] = state.get("citations", [])
+        return {
+            "query": state.get("query", ""),
+            "answer": state.get("answer", ""),
+            "citations": [
+                {
+                    "source_id": c.source_id,
+                    "title": c.title,
+                    "url": c.url,
+                    "chunk_id": c.chunk_id,
+                }
+                for c in citations
+            ],
+            "validated": state.get("validated", []),
+        }
+
+    async def run_query(
+        self, query: str, top_k: int, alpha: float, metadata_filters: Dict[str, Any]
+    ) -> QueryResult:
+        with metrics.track_request() as timings:
+            answer, citations, debug, usage = await self._run_query(
+                query, top_k, alpha, metadata_filters
+            )
+        if self.cfg.debug_timings:
+            # a shallow copy: the cached debug must not carry this request's timings
+            debug = debug.model_copy(update={"scores": {**debug.scores, **timings.scores()}})
+        return answer, citations, debug, usage
 
-        # Optional repair pass if judge fails
-        if report.get("verdict") == "fail":
-            tightened = await self.retrieval.hybrid_search(
+    async def _run_query(
+        self, query: str, top_k: int, alpha: float, metadata_filters: Dict[str, Any]
+    ) -> QueryResult:
+        # Run retrieval outside the graph (async); it overlaps the answer-cache lookup
+        cache = self.answer_cache
+        version = cache.version.value if cache is not None else 0
+        partition = AnswerCache.partition(metadata_filters, alpha, top_k)
+        retrieval = asyncio.create_task(
+            self.retrieval.hybrid_search(
                 query=query, alpha=alpha, top_k=top_k, metadata_filters=metadata_filters
             )
-            result2 = app.invoke({"query": query, "query_vec": qv, "retrieved": tightened})
-            answer = result2.get("answer", answer)
-            citations = result2.get("citations", citations)
-            report = result2.get("judge_report", report)
+        )
+        # coalesces with the embed inside hybrid_search, so this costs no extra call
+        try:
+            qv = await self.retrieval.embed_query(query)
+        except BaseException:
+            await self._discard(retrieval)
+            raise
+        hit = cache.get(partition, qv) if cache is not None else None
+        if hit is not None:
+            await self._discard(retrieval)
+            return self._cached_response(*hit)
+        retrieved = await retrieval
+        return await self._answer(query, qv, retrieved, partition, version)
+
+    @staticmethod
+    async def _discard(task: asyncio.Task[Any]) -> None:
+        # cancel and reap, so its work stops and its outcome is never reported as unretrieved
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await task
+
+    async def run_batch(
+        self, requests: List[SearchRequest]
+    ) -> AsyncIterator[Tuple[int, QueryResult | Exception]]:
+        """
+        Answers many queries, yielding (index, result or exception) in input order.
+        Queries are embedded in batched calls and retrieved together (concurrent vector
+        queries, one BM25 pass); at most `query_batch_concurrency` generate at once.
+        """
+        cache = self.answer_cache
+        version = cache.version.value if cache is not None else 0
+        partitions = [
+            AnswerCache.partition(r.metadata_filters, r.alpha, r.top_k) for r in requests
+        ]
+        hits: List[Tuple[Any, float] | None] = [None] * len(requests)
+        misses: List[int] = []
+        retrieved: List[List[Any]] = []
+        failure: Exception | None = None
+        try:
+            qvs = await self.retrieval.embed_queries([r.query for r in requests])
+            hits = [
+                cache.get(p, qv) if cache is not None else None for p, qv in zip(partitions, qvs)
+            ]
+            misses = [i for i, hit in enumerate(hits) if hit is None]
+            retrieved = await self.retrieval.hybrid_search_many(
+                [requests[i] for i in misses], qvs[misses] if misses else qvs[:0]
+            )
+        except Exception as e:
+            # reported per query below, like a failing generate; cache hits are still served
+            logger.exception("batch_setup_failed", extra={"queries": len(requests)})
+            failure = e
+        gate = asyncio.Semaphore(max(1, self.cfg.query_batch_concurrency))
+
+        async def answer(i: int, docs: List[Any]) -> QueryResult:
+            async with gate:
+                return await self._answer(requests[i].query, qvs[i], docs, partitions[i], version)
+
+        tasks = {i: asyncio.create_task(answer(i, docs)) for i, docs in zip(misses, retrieved)}
+        try:
+            for i, hit in enumerate(hits):
+                if hit is not None:
+                    yield i, self._cached_response(*hit)
+                    continue
+                if i not in tasks:
+                    yield i, failure or RuntimeError("query was not retrieved")
+                    continue
+                try:
+                    yield i, await tasks[i]
+                except Exception as e:
+                    logger.exception("batch_query_failed", extra={"index": i})
+                    yield i, e
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def _answer(
+        self,
+        query: str,
+        qv: np.ndarray,
+        retrieved: List[Any],
+        partition: Hashable,
+        version: int,
+    ) -> QueryResult:
+        """
+        Everything after retrieval: graph, optional repair, debug, answer-cache write.
+        """
+        cache = self.answer_cache
+        state: RagState = {
+            "cfg": self.cfg,
+            "query": query,
+            "query_vec": qv,
+            "retrieved": retrieved,
+            "evaluate": self.cfg.eval_mode != "async",
+        }
+        result = await self.app.ainvoke(state)
+        answer: str = result.get("answer", "")
+        citations: List[Citation] = result.get("citations", [])
+        response: List[QueryResult] = []  # set below, before the background judge can run
+
+        def cache_if_passed(judged: Dict[str, Any]) -> None:
+            if cache is not None and response and judged.get("verdict") == "pass":
+                a, c, d, u = response[0]
+                d = d.model_copy(update={"judge_report": JudgeReport.model_validate(judged)})
+                cache.put(partition, qv, (a, c, d, u), version)
+
+        report = result.get("judge_report") or self._defer_evaluation(result, cache_if_passed)
+
+        usage = result.get("usage", {"prompt_tokens": 0, "candidates_tokens": 0})
+        attempts = 0
+        # Optional repair passes if an inline verdict fails
+        if report.get("verdict") == "fail" and self.cfg.eval_repair == "on_fail":
+            with metrics.span("repair"):
+                result, attempts = await self._repair({**state, **result})
+            answer = result["answer"]
+            citations = result["citations"]
+            report = result["judge_report"]
+            usage = result["usage"]
 
+        scores = dict(result.get("context_stats") or {})
+        if attempts:
+            scores["repair_attempts"] = float(attempts)
         debug = QueryDebug(
             retrieved_ids=[d.id for d in retrieved],
             validated=result.get("validated", []),
-            scores={},
+            scores=scores,
             judge_report=report,
         )
-        usage = result.get("usage", {"prompt_tokens": 0, "candidates_tokens": 0})
 
+        # only answers the judge passed are reused; pending ones wait for the background verdict
+        response.append((answer, citations, debug, usage))
+        if cache is not None and report.get("verdict") == "pass":
+            cache.put(partition, qv, response[0], version)
         return answer, citations, debug, usage
 
+    async def _repair(self, state: RagState) -> Tuple[RagState, int]:
+        """
+        Repair a failed answer starting from the existing state: retrieval is not redone,
+        the validated set is tightened in place (higher confidence cutoff, chunks the judge
+        named dropped) and the judge's suggested fixes are fed back into generation. Stops
+        once the verdict passes, `repair_max_attempts` is spent, or nothing would change.
+        Usage is summed over every pass.
+        """
+        cfg = state.get("cfg", self.cfg)
+        usage = dict(state.get("usage") or {})
+        cutoff = cfg.similarity_threshold
+        attempts = 0
+        while attempts < cfg.repair_max_attempts:
+            report = state["judge_report"]
+            cutoff += cfg.repair_confidence_step
+            validated = self._tighten(state.get("validated", []), report, cutoff)
+            hints = [str(h) for h in report.get("suggested_fixes") or []]
+            if validated == state.get("validated", []) and hints == state.get("repair_hints", []):
+                break  # same inputs would reproduce the same answer
+            attempts += 1
+            state = {**state, "validated": validated, "repair_hints": hints}
+            state.update(await self.node_generator(state))
+            for k, v in (state.get("usage") or {}).items():
+                usage[k] = usage.get(k, 0) + v
+            state.update(await self.node_evaluator(state))
+            logger.info(
+                "repair_attempt",
+                extra={
+                    "attempt": attempts,
+                    "validated": len(validated),
+                    "verdict": state["judge_report"].get("verdict"),
+                },
+            )
+            if state["judge_report"].get("verdict") != "fail":
+                break
+        return {**state, "usage": usage}, attempts
+
+    @staticmethod
+    def _tighten(
+        validated: List[Dict[str, Any]], report: Dict[str, Any], cutoff: float
+    ) -> List[Dict[str, Any]]:
+        # chunks whose chunk_id / source_id the judge names, as a whole token, in its reasons
+        # or fixes (so "kb/a-0001" does not also name "kb/a", nor "c1" name "c10")
+        feedback = " ".join(
+            str(x) for x in [*(report.get("reasons") or []), *(report.get("suggested_fixes") or [])]
+        )
+        # a short all-letter id reads like an ordinary word in the judge's prose; never match it
+        mentioned = {t for t in _ID_TOKEN_RE.findall(feedback) if len(t) >= 8 or not t.isalpha()}
+        kept = []
+        for v in validated:
+            named = any(
+                v.get(key) and str(v[key]) in mentioned for key in ("chunk_id", "source_id")
+            )
+            if not named and v["confidence"] >= cutoff:
+                kept.append(v)
+        return kept
+
+    @staticmethod
+    def _cached_response(value: QueryResult, similarity: float) -> QueryResult:
+        answer, citations, debug, _ = value
+        debug = debug.model_copy(deep=True)
+        debug.scores["answer_cache_similarity"] = similarity
+        usage = {"prompt_tokens": 0, "candidates_tokens": 0}
+        return answer, [c.model_copy() for c in citations], debug, usage
+
+    async def stream_query(
+        self, query: str, top_k: int, alpha: float, metadata_filters: Dict[str, Any]
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of run_query yielding (event, data) pairs:
+        `token` deltas as Gemini produces them, `citation` as each [#n] marker first
+        appears, then `judge` with the evaluator report and `done` with usage.
+        Tokens already sent cannot be retracted, so no repair pass is attempted.
+        """
+        with metrics.track_request():
+            async for event in self._stream_query(query, top_k, alpha, metadata_filters):
+                yield event
+
+    async def _stream_query(
+        self, query: str, top_k: int, alpha: float, metadata_filters: Dict[str, Any]
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        # as in _run_query: retrieval runs as a task and shares the query embedding
+        retrieval = asyncio.create_task(
+            self.retrieval.hybrid_search(
+                query=query, alpha=alpha, top_k=top_k, metadata_filters=metadata_filters
+            )
+        )
+        try:
+            qv = await self.retrieval.embed_query(query)
+            retrieved = await retrieval
+        except BaseException:
+            await self._discard(retrieval)
+            raise
+        state: RagState = {
+            "cfg": self.cfg,
+            "query": query,
+            "query_vec": qv,
+            "retrieved": retrieved,
+            "evaluate": self.cfg.eval_mode != "async",
+        }
+        state.update(await self.node_validator(state))
+        validated = state["validated"]
+
+        answer = ""
+        citations: List[Citation] = []
+        usage = {"prompt_tokens": 0, "candidates_tokens": 0}
+        if not validated:
+            answer = "I don't have enough information to answer."
+            yield "token", {"text": answer}
+        else:
+            seen: set[int] = set()
+            context = ContextPacker(self.cfg.context_max_tokens).pack(validated).entries
+            async for chunk in self.vertex.generate_stream(
+                self._build_prompt(query, context),
+                temperature=self.cfg.gen_temperature,
+                max_tokens=self.cfg.max_tokens,
+            ):
+                usage = chunk.usage or usage
+                if not chunk.text:
+                    continue
+                answer += chunk.text
+                yield "token", {"text": chunk.text}
+                for i in self._cited_indices(answer, context):
+                    if i not in seen:
+                        seen.add(i)
+                        citation = self._citation(context[i - 1])
+                        citations.append(citation)
+                        yield "citation", {"marker": f"[#{i}]", **citation.model_dump()}
 
-    
+        state.update({"answer": answer.strip(), "citations": citations, "usage": usage})
+        yield "judge", await self._evaluate(state)
+        yield "done", {"usage": usage, "retrieved_ids": [d.id for d in retrieved]}
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import fcntl
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Tuple
+
+import numpy as np
+
+from rag_support.config import settings
+
+
+class IndexVersion:
+    """
+    Monotonic counter bumped whenever the searchable corpus changes. Caches that hold
+    results derived from the index compare against it to invalidate themselves.
+
+    With a `path` the counter lives in that file, so a bump by any process sharing it
+    (other API workers, the standalone ingest worker, replicas on a shared volume) is
+    seen on the next read; readers only re-read the file when it was replaced.
+    Without one it is process-local.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self._value = 0
+        self._stamp: Tuple[int, int] | None = None
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @property
+    def shared(self) -> bool:
+        return self.path is not None
+
+    @property
+    def value(self) -> int:
+        if self.path is None:
+            return self._value
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp != self._stamp:
+            with self._lock:
+                self._value = self._read()
+                self._stamp = stamp
+        return self._value
+
+    def bump(self) -> int:
+        if self.path is None:
+            with self._lock:
+                self._value += 1
+                return self._value
+        with self._lock, open(f"{self.path}.lock", "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                value = self._read() + 1
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(str(value))
+                os.replace(tmp, self.path)
+                return value
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _read(self) -> int:
+        try:
+            with open(self.path or "", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+
+@dataclass
+class _Entry:
+    partition: Hashable
+    value: Any
+
+
+class _Partition:
+    """
+    Unit query vectors of one partition as rows of a float32 matrix, so a lookup scores
+    every entry with one matrix-vector product; removal moves the last row into the gap.
+    """
+
+    def __init__(self, dim: int) -> None:
+        self.mat = np.zeros((8, dim), dtype=np.float32)
+        self.expires = np.zeros(8)
+        self.ids: List[int] = []
+        self.rows: Dict[int, int] = {}
+
+    @property
+    def dim(self) -> int:
+        return self.mat.shape[1]
+
+    def add(self, entry_id: int, vec: np.ndarray, expires: float) -> None:
+        n = len(self.ids)
+        if n == self.mat.shape[0]:
+            self.mat = np.vstack([self.mat, np.zeros_like(self.mat)])
+            self.expires = np.concatenate([self.expires, np.zeros_like(self.expires)])
+        self.mat[n] = vec
+        self.expires[n] = expires
+        self.ids.append(entry_id)
+        self.rows[entry_id] = n
+
+    def remove(self, entry_id: int) -> None:
+        row = self.rows.pop(entry_id)
+        last = self.ids.pop()
+        if last != entry_id:
+            n = len(self.ids)
+            self.mat[row] = self.mat[n]
+            self.expires[row] = self.expires[n]
+            self.ids[row] = last
+            self.rows[last] = row
+
+    def expired(self, now: float) -> List[int]:
+        return [self.ids[r] for r in np.flatnonzero(self.expires[: len(self.ids)] <= now).tolist()]
+
+    def scores(self, vec: np.ndarray) -> np.ndarray:
+        return self.mat[: len(self.ids)] @ vec.astype(np.float32)
+
+
+class AnswerCache:
+    """
+    Semantic answer cache: returns a stored response when a new query's embedding is
+    within `threshold` cosine of a cached one in the same partition (filters, alpha, top_k).
+
+    A lookup scores every entry of its partition exactly with one matrix-vector product
+    (well under a millisecond at 1000 x 768), so no near-duplicate is missed. Entries
+    expire after `ttl_s`, are evicted LRU beyond `max_entries`, and are all dropped when
+    the IndexVersion changes.
+    """
+
+    def __init__(
+        self,
+        version: IndexVersion,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_s: float = 900.0,
+    ) -> None:
+        self.version = version
+        self.threshold = threshold
+        self._max_entries = max_entries
+        self._ttl_s = ttl_s
+        self._seen_version = version.value
+        self._ids = itertools.count()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._partitions: Dict[Hashable, _Partition] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def partition(metadata_filters: Dict[str, Any], alpha: float, top_k: int) -> Hashable:
+        return (json.dumps(metadata_filters or {}, sort_keys=True, default=str), alpha, top_k)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._partitions.clear()
+            self.hits = self.misses = 0
+
+    def _sync_version(self) -> None:
+        if self.version.value != self._seen_version:
+            self._entries.clear()
+            self._partitions.clear()
+            self._seen_version = self.version.value
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        part = self._partitions[entry.partition]
+        part.remove(entry_id)
+        if not part.ids:
+            del self._partitions[entry.partition]
+
+    def get(self, partition: Hashable, query_vec: np.ndarray) -> Tuple[Any, float] | None:
+        """
+        Returns (value, cosine) for the best match at or above the threshold.
+        """
+        vec = self._normalize(query_vec)
+        if vec is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version()
+            part = self._partitions.get(partition)
+            if part is not None:
+                for entry_id in part.expired(now):
+                    self._remove(entry_id)
+            if part is not None and part.ids and part.dim == vec.shape[0]:
+                sims = part.scores(vec)
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    entry_id = part.ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id].value, float(sims[best])
+            self.misses += 1
+            return None
+
+    def put(self, partition: Hashable, query_vec: np.ndarray, value: Any, version: int) -> None:
+        """
+        Store `value`, computed against index `version`; dropped if the index moved on since.
+        """
+        vec = self._normalize(query_vec)
+        if vec is None:
+            return
+        with self._lock:
+            self._sync_version()
+            if version != self._seen_version:
+                return
+            part = self._partitions.get(partition)
+            if part is not None and part.dim != vec.shape[0]:  # embedding model changed
+                for entry_id in list(part.ids):
+                    self._remove(entry_id)
+                part = None
+            if part is None:
+                part = self._partitions[partition] = _Partition(vec.shape[0])
+            entry_id = next(self._ids)
+            expires = time.monotonic() + self._ttl_s
+            self._entries[entry_id] = _Entry(partition, value)
+            part.add(entry_id, vec, expires)
+            while len(self._entries) > self._max_entries:
+                self._remove(next(iter(self._entries)))
+
+    @staticmethod
+    def _normalize(vec: np.ndarray) -> np.ndarray | None:
+        vec = np.asarray(vec, dtype=np.float64)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else None
+
+
+# Bumped by IngestionService on every ingest; shared through a file when one is configured
+_GLOBAL_INDEX_VERSION = IndexVersion(
+    settings.index_version_path
+    or (os.path.join(settings.bm25_index_dir, "index_version") if settings.bm25_index_dir else None)
+)
+
+_GLOBAL_ANSWER_CACHE = AnswerCache(
+    _GLOBAL_INDEX_VERSION,
+    threshold=settings.answer_cache_threshold,
+    max_entries=settings.answer_cache_size,
+    ttl_s=settings.answer_cache_ttl_s,
+)
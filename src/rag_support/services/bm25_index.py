@@ -1,35 +1,405 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+import math
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
 
-from rank_bm25 import BM25Okapi
+import numpy as np
+
+from rag_support.logging import logger
+from .bm25_segments import (
+    Postings,
+    Segment,
+    SegmentDirectory,
+    live_postings,
+    merge_segments,
+    write_segment,
+)
+
+
+class _MemorySegment:
+    """
+    Mutable in-memory postings for documents not yet flushed to disk.
+    """
+
+    def __init__(self) -> None:
+        self.doc_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.deleted: Set[int] = set()
+        self._doc_len = array("I")
+        self.total_len = 0
+        # term -> (doc indices, term frequencies), appended in doc order
+        self._postings: Dict[str, Tuple[array, array]] = {}
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def doc_len(self) -> np.ndarray:
+        # zero-copy view; callers hold the index lock so the array cannot grow meanwhile
+        return np.frombuffer(self._doc_len, dtype=np.uint32)
+
+    def add(self, doc_id: str, toks: List[str]) -> None:
+        idx = len(self.doc_ids)
+        tfs: Dict[str, int] = {}
+        for t in toks:
+            tfs[t] = tfs.get(t, 0) + 1
+        for term, tf in tfs.items():
+            plist = self._postings.get(term)
+            if plist is None:
+                plist = (array("I"), array("I"))
+                self._postings[term] = plist
+            plist[0].append(idx)
+            plist[1].append(tf)
+        self.positions[doc_id] = idx
+        self.doc_ids.append(doc_id)
+        self._doc_len.append(len(toks))
+        self.total_len += len(toks)
+
+    def doc_id(self, i: int) -> str:
+        return self.doc_ids[i]
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        n = 0
+        for d in doc_ids:
+            i = self.positions.pop(d, None)
+            if i is not None:
+                self.deleted.add(i)
+                n += 1
+        return n
+
+    def keep_mask(self) -> np.ndarray:
+        keep = np.ones(self.n_docs, dtype=bool)
+        keep[list(self.deleted)] = False
+        return keep
+
+    def postings(self, term: str) -> Postings | None:
+        plist = self._postings.get(term)
+        if plist is None:
+            return None
+        return np.array(plist[0], dtype=np.uint32), np.array(plist[1], dtype=np.uint32)
+
+    def all_postings(self) -> Dict[str, Postings]:
+        return {
+            t: (np.array(i, dtype=np.uint32), np.array(f, dtype=np.uint32))
+            for t, (i, f) in self._postings.items()
+        }
 
 
 class BM25Index:
     """
-    In-memory BM25 index (OK for demos and unit tests).
+    BM25 index backed by an incrementally maintained inverted index.
     Keep doc_id alignment with Pinecone doc ids.
+
+    `add_docs` only touches the postings of the new documents' terms, and `search`
+    only scores documents that appear in the postings of the query terms. Adding an
+    existing doc id replaces it; `delete` tombstones docs until the next merge.
+
+    With a `directory`, `flush()` writes buffered documents as an immutable,
+    memory-mapped segment listed in the directory manifest. Every worker opening the
+    same directory sees the same segments (picked up within `refresh_s`), restarts
+    reopen them without re-tokenizing, and `merge()` compacts them in the background.
     """
 
-    def __init__(self) -> None:
-        self._tokenized: List[List[str]] = []
-        self._doc_ids: List[str] = []
-        self._bm25: BM25Okapi | None = None
+    def __init__(
+        self,
+        k1: float = 1.5,
+        b: float = 0.75,
+        directory: str | None = None,
+        refresh_s: float = 5.0,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self._mem = _MemorySegment()
+        self._segments: List[Segment] = []
+        # segment name -> deleted local indices as of the manifest, plus the ids deleted
+        # here since the last flush (resolved per segment at flush, surviving merges)
+        self._manifest_deleted: Dict[str, List[int]] = {}
+        self._pending_deleted: Set[str] = set()
+        self._dead: Dict[str, np.ndarray] = {}
+        self._dir = SegmentDirectory(directory) if directory else None
+        self._refresh_s = refresh_s
+        self._manifest_mtime = 0
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+        if self._dir is not None:
+            self.refresh(force=True)
+
+    def __len__(self) -> int:
+        n = self._mem.n_docs - len(self._mem.deleted)
+        for seg in self._segments:
+            dead = self._dead.get(seg.name)
+            n += seg.n_docs - (int(dead.sum()) if dead is not None else 0)
+        return n
+
+    @property
+    def persistent(self) -> bool:
+        return self._dir is not None
 
     def add_docs(self, doc_ids: List[str], docs: List[str]) -> None:
-        toks = [self._tokenize(d) for d in docs]
-        self._tokenized.extend(toks)
-        self._doc_ids.extend(doc_ids)
-        self._bm25 = BM25Okapi(self._tokenized)
+        with self._lock:
+            self.delete(doc_ids)
+            for doc_id, doc in zip(doc_ids, docs):
+                self._mem.add(doc_id, self._tokenize(doc))
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        """
+        Remove docs from search results; returns how many were live. Segment deletes
+        reach other workers with the next `flush()`.
+        """
+        doc_ids = list(doc_ids)
+        with self._lock:
+            n = self._mem.delete(doc_ids)
+            if self._segments:
+                self._pending_deleted.update(doc_ids)
+                n += self._mark_dead(doc_ids)
+            return n
+
+    def _mark_dead(self, doc_ids: Iterable[str]) -> int:
+        doc_ids = list(doc_ids)
+        n = 0
+        for seg in self._segments:
+            dead = self._dead.get(seg.name)
+            idxs = [i for i in seg.find(doc_ids) if dead is None or not dead[i]]
+            if not idxs:
+                continue
+            if dead is None:
+                dead = self._dead[seg.name] = np.zeros(seg.n_docs, dtype=bool)
+            dead[idxs] = True
+            n += len(idxs)
+        return n
 
     def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
-        if not self._bm25 or not self._doc_ids:
-            return []
-        toks = self._tokenize(query)
-        scores = self._bm25.get_scores(toks)
-        pairs = list(zip(self._doc_ids, scores))
-        pairs.sort(key=lambda x: x[1], reverse=True)
-        return pairs[:top_k]
+        return self.search_many([query], top_k)[0]
+
+    def search_many(self, queries: Sequence[str], top_k: int) -> List[List[Tuple[str, float]]]:
+        """
+        Score several queries in one pass: each distinct term's postings are read once and
+        all of them weighted in one vectorised step, then every (query, doc) pair is summed
+        after a single sort and each query's slice is ranked.
+        """
+        out: List[List[Tuple[str, float]]] = [[] for _ in queries]
+        if top_k <= 0 or not queries:
+            return out
+        query_terms = [set(self._tokenize(q)) for q in queries]
+        terms = set().union(*query_terms)
+        if not terms:
+            return out
+        self._maybe_refresh()
+        with self._lock:
+            sources: Sequence[Segment | _MemorySegment] = [*self._segments, self._mem]
+            dead: List[np.ndarray | None] = [self._dead.get(seg.name) for seg in self._segments]
+            dead.append(~self._mem.keep_mask() if self._mem.deleted else None)
+            n_docs = len(self)
+            if not n_docs:
+                return out
+            avgdl = sum(s.total_len for s in sources) / sum(s.n_docs for s in sources)
+            bases = np.cumsum([0] + [s.n_docs for s in sources])
+            n_total = int(bases[-1])
+
+            # every live postings list of the batch's distinct terms, weighted in one pass
+            term_span: Dict[str, Tuple[int, int]] = {}
+            idx_parts: List[np.ndarray] = []
+            tf_parts: List[np.ndarray] = []
+            dl_parts: List[np.ndarray] = []
+            idf_parts: List[float] = []
+            n = 0
+            for term in terms:
+                first = len(idx_parts)
+                for base, src, src_dead in zip(bases, sources, dead):
+                    p = src.postings(term)
+                    if p is None:
+                        continue
+                    idx, tf = p
+                    if src_dead is not None:
+                        live = ~src_dead[idx]
+                        idx, tf = idx[live], tf[live]
+                    if idx.shape[0]:
+                        idx_parts.append(idx.astype(np.int64) + int(base))
+                        tf_parts.append(tf)
+                        dl_parts.append(src.doc_len[idx])
+                if len(idx_parts) == first:
+                    continue
+                lo, df = n, sum(x.shape[0] for x in idx_parts[first:])
+                n += df
+                term_span[term] = (lo, n)
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                idf_parts.extend([idf] * (len(idx_parts) - first))
+            if not idx_parts:
+                return out
+            doc = np.concatenate(idx_parts)
+            tf = np.concatenate(tf_parts).astype(np.float64)
+            norm = self.k1 * (1.0 - self.b + self.b * np.concatenate(dl_parts) / avgdl)
+            idf = np.repeat(idf_parts, [x.shape[0] for x in idx_parts])
+            weight = idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+            # key = query * n_total + doc; one sort groups every (query, doc) pair, and
+            # reduceat sums its terms' contributions
+            picks = [
+                (qi, term_span[t])
+                for qi, qterms in enumerate(query_terms)
+                for t in qterms
+                if t in term_span
+            ]
+            if not picks:
+                return out
+            rows = np.concatenate([np.arange(lo, hi) for _, (lo, hi) in picks])
+            keys = doc[rows] + np.repeat(
+                [qi * n_total for qi, _ in picks], [hi - lo for _, (lo, hi) in picks]
+            )
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            keys = keys[starts]
+            scores = np.add.reduceat(weight[rows][order], starts)
+            bounds = np.searchsorted(keys, np.arange(len(queries) + 1) * n_total).tolist()
+            # best first; ties keep ascending doc order (stable sort over sorted keys)
+            top = [
+                np.argsort(-scores[lo:hi], kind="stable")[:top_k] + lo
+                for lo, hi in zip(bounds, bounds[1:])
+            ]
+            hits = np.concatenate(top)
+            g = keys[hits] % n_total
+            src_of = np.searchsorted(bases, g, side="right") - 1
+            ranked = [
+                (sources[s].doc_id(i), score)
+                for s, i, score in zip(
+                    src_of.tolist(), (g - bases[src_of]).tolist(), scores[hits].tolist()
+                )
+            ]
+            ends = np.cumsum([t.shape[0] for t in top]).tolist()
+            return [ranked[end - t.shape[0] : end] for t, end in zip(top, ends)]
+
+    def flush(self) -> None:
+        """
+        Persist buffered documents as a new segment, together with pending deletes.
+        No-op for in-memory indexes.
+        """
+        if self._dir is None:
+            return
+        with self._lock:
+            mem = self._mem
+            live = mem.n_docs - len(mem.deleted)
+            if not live and not self._pending_deleted:
+                return
+            name = None
+            if live:
+                name = self._dir.new_name()
+                keep = mem.keep_mask()
+                postings = {}
+                for term, p in mem.all_postings().items():
+                    lp = live_postings(p, keep)
+                    if lp is not None:
+                        postings[term] = lp
+                doc_ids = [d for d, k in zip(mem.doc_ids, keep) if k]
+                write_segment(self._dir.path(name), doc_ids, np.array(mem.doc_len)[keep], postings)
+            # tombstones go in with the new segment; retry if a merge moved the docs meanwhile
+            while not self._dir.add(name, self._resolve_pending()):
+                self.refresh(force=True)
+            self._mem = _MemorySegment()
+            self._pending_deleted = set()
+            self.refresh(force=True)
+        logger.info(
+            "bm25_segment_flushed", extra={"segment": name, "docs": live}
+        )
+
+    def _resolve_pending(self) -> Dict[str, List[int]]:
+        if not self._pending_deleted:
+            return {}
+        return {
+            seg.name: idxs
+            for seg in self._segments
+            if (idxs := seg.find(self._pending_deleted))
+        }
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Re-read the manifest and open/close segments to match it.
+        """
+        if self._dir is None:
+            return
+        mtime = self._dir.manifest_mtime()
+        if not force and mtime == self._manifest_mtime:
+            return
+        names, deleted = self._dir.load_state()
+        with self._lock:
+            current = {s.name: s for s in self._segments}
+            segments = []
+            for name in names:
+                seg = current.pop(name, None)
+                if seg is None:
+                    try:
+                        seg = Segment(self._dir.path(name))
+                    except FileNotFoundError:
+                        # merged away between load() and open; next refresh catches up
+                        continue
+                segments.append(seg)
+            self._segments = segments
+            self._manifest_deleted = deleted
+            self._dead = {}
+            for seg in segments:
+                if deleted.get(seg.name):
+                    self._dead[seg.name] = np.zeros(seg.n_docs, dtype=bool)
+                    self._dead[seg.name][deleted[seg.name]] = True
+            self._mark_dead(self._pending_deleted)
+            self._manifest_mtime = mtime
+        for seg in current.values():
+            seg.close()
+
+    def warmup(self) -> None:
+        """
+        Open the current segments and pull them into the page cache.
+        """
+        self.refresh(force=True)
+        with self._lock:
+            segments = list(self._segments)
+        for seg in segments:
+            seg.preload()
+
+    def _maybe_refresh(self) -> None:
+        if self._dir is None:
+            return
+        now = time.monotonic()
+        if now - self._last_refresh >= self._refresh_s:
+            self._last_refresh = now
+            self.refresh()
+
+    def merge(self, max_segments: int = 8) -> bool:
+        """
+        Merge all live segments into one once there are more than `max_segments`.
+        Safe to run from several workers: only one manifest swap wins.
+        """
+        if self._dir is None:
+            return False
+        self.refresh(force=True)
+        with self._lock:
+            segments = list(self._segments)
+            deleted = {s.name: self._manifest_deleted.get(s.name, []) for s in segments}
+        if len(segments) <= max_segments:
+            return False
+        name = self._dir.new_name()
+        path = self._dir.path(name)
+        merge_segments(path, segments, deleted)
+        if not self._dir.replace([s.name for s in segments], name, deleted):
+            os.remove(path)
+            return False
+        self.refresh(force=True)
+        logger.info("bm25_segments_merged", extra={"merged": len(segments), "segment": name})
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem = _MemorySegment()
+            for seg in self._segments:
+                seg.close()
+            self._segments = []
+            self._manifest_deleted = {}
+            self._pending_deleted = set()
+            self._dead = {}
 
     @staticmethod
     def _tokenize(text: str) -> List[str]:
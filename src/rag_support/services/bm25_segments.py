@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from typing import Collection, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+Postings = Tuple[np.ndarray, np.ndarray]  # (local doc indices uint32, term frequencies uint32)
+
+MAGIC = b"BM25SEG1"
+# magic, n_docs, n_terms, total_len, then 8 section offsets:
+# doc_len, docid_offsets, docid_blob, term_offsets, term_blob, post_offsets, post_docs, post_tfs
+_HEADER = struct.Struct("<8sQQQ8Q")
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def write_segment(
+    path: str,
+    doc_ids: Sequence[str],
+    doc_len: np.ndarray,
+    postings: Dict[str, Postings],
+) -> None:
+    """
+    Write an immutable segment file. The write goes to a temp file that is fsynced and
+    renamed into place, so readers never observe a partial segment.
+    """
+    terms = sorted(postings)
+    docid_bytes = [d.encode("utf-8") for d in doc_ids]
+    term_bytes = [t.encode("utf-8") for t in terms]
+
+    docid_offsets = np.zeros(len(docid_bytes) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in docid_bytes], out=docid_offsets[1:])
+    term_offsets = np.zeros(len(term_bytes) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in term_bytes], out=term_offsets[1:])
+    post_offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+    np.cumsum([postings[t][0].shape[0] for t in terms], out=post_offsets[1:])
+
+    empty = np.zeros(0, dtype=np.uint32)
+    post_docs = np.concatenate([postings[t][0] for t in terms]).astype(np.uint32) if terms else empty
+    post_tfs = np.concatenate([postings[t][1] for t in terms]).astype(np.uint32) if terms else empty
+
+    sections = [
+        np.asarray(doc_len, dtype=np.uint32).tobytes(),
+        docid_offsets.tobytes(),
+        b"".join(docid_bytes),
+        term_offsets.tobytes(),
+        b"".join(term_bytes),
+        post_offsets.tobytes(),
+        post_docs.tobytes(),
+        post_tfs.tobytes(),
+    ]
+    offsets = []
+    pos = _HEADER.size
+    for sec in sections:
+        pos = _align(pos)
+        offsets.append(pos)
+        pos += len(sec)
+
+    total_len = int(np.asarray(doc_len, dtype=np.uint64).sum())
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(doc_ids), len(terms), total_len, *offsets))
+        for off, sec in zip(offsets, sections):
+            f.write(b"\0" * (off - f.tell()))
+            f.write(sec)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Segment:
+    """
+    Read-only, memory-mapped view of one segment file. All arrays are zero-copy views
+    into the mapping, so workers on the same node share one page-cache copy.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_docs, n_terms, total_len, *off = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"not a BM25 segment: {path}")
+        self.n_docs = int(n_docs)
+        self.n_terms = int(n_terms)
+        self.total_len = int(total_len)
+        buf = self._mm
+        self.doc_len = np.frombuffer(buf, np.uint32, self.n_docs, off[0])
+        self._docid_offsets = np.frombuffer(buf, np.uint64, self.n_docs + 1, off[1])
+        self._docid_base = off[2]
+        self._term_offsets = np.frombuffer(buf, np.uint64, self.n_terms + 1, off[3])
+        self._term_base = off[4]
+        self._post_offsets = np.frombuffer(buf, np.uint64, self.n_terms + 1, off[5])
+        n_post = int(self._post_offsets[-1]) if self.n_terms else 0
+        self._post_docs = np.frombuffer(buf, np.uint32, n_post, off[6])
+        self._post_tfs = np.frombuffer(buf, np.uint32, n_post, off[7])
+        self._positions: Dict[str, List[int]] | None = None
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def preload(self) -> None:
+        """
+        Fault the mapping into the page cache so the first query does not read from disk.
+        """
+        self._mm.madvise(mmap.MADV_WILLNEED)
+
+    def doc_id(self, i: int) -> str:
+        lo = self._docid_base + int(self._docid_offsets[i])
+        hi = self._docid_base + int(self._docid_offsets[i + 1])
+        return self._mm[lo:hi].decode("utf-8")
+
+    def doc_ids(self) -> List[str]:
+        return [self.doc_id(i) for i in range(self.n_docs)]
+
+    def find(self, doc_ids: Iterable[str]) -> List[int]:
+        """
+        Local indices of the given doc ids (all occurrences). The id map is built on
+        first use, so segments that never see a delete never decode their ids.
+        """
+        if self._positions is None:
+            positions: Dict[str, List[int]] = {}
+            for i, d in enumerate(self.doc_ids()):
+                positions.setdefault(d, []).append(i)
+            self._positions = positions
+        return [i for d in doc_ids for i in self._positions.get(d, ())]
+
+    def _term(self, i: int) -> bytes:
+        lo = self._term_base + int(self._term_offsets[i])
+        hi = self._term_base + int(self._term_offsets[i + 1])
+        return self._mm[lo:hi]
+
+    def _find(self, term: bytes) -> int:
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.n_terms and self._term(lo) == term else -1
+
+    def _postings_at(self, i: int) -> Postings:
+        lo, hi = int(self._post_offsets[i]), int(self._post_offsets[i + 1])
+        return self._post_docs[lo:hi], self._post_tfs[lo:hi]
+
+    def postings(self, term: str) -> Postings | None:
+        i = self._find(term.encode("utf-8"))
+        return None if i < 0 else self._postings_at(i)
+
+    def iter_postings(self) -> Iterator[Tuple[str, Postings]]:
+        for i in range(self.n_terms):
+            yield self._term(i).decode("utf-8"), self._postings_at(i)
+
+    def close(self) -> None:
+        # numpy views keep the buffer exported; drop them before unmapping
+        for attr in (
+            "doc_len",
+            "_docid_offsets",
+            "_term_offsets",
+            "_post_offsets",
+            "_post_docs",
+            "_post_tfs",
+        ):
+            setattr(self, attr, None)
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping is released with it
+
+
+def live_postings(postings: Postings, keep: np.ndarray) -> Postings | None:
+    """
+    Drop postings of deleted docs (`keep[i]` False) and renumber the survivors densely.
+    """
+    idx, tf = postings
+    live = keep[idx]
+    if not live.any():
+        return None
+    remap = np.cumsum(keep, dtype=np.int64) - 1
+    return remap[idx[live]].astype(np.uint32), tf[live]
+
+
+def merge_segments(
+    path: str,
+    segments: Sequence[Segment],
+    deleted: Dict[str, Collection[int]] | None = None,
+) -> None:
+    """
+    Merge segments (in order) into one new segment file at `path`, dropping the docs
+    listed in `deleted` (segment name -> local indices).
+    """
+    deleted = deleted or {}
+    doc_ids: List[str] = []
+    doc_lens: List[np.ndarray] = []
+    parts: Dict[str, Tuple[List[np.ndarray], List[np.ndarray]]] = {}
+    base = 0
+    for seg in segments:
+        keep = np.ones(seg.n_docs, dtype=bool)
+        keep[list(deleted.get(seg.name, ()))] = False
+        ids = seg.doc_ids()
+        doc_ids.extend(d for d, k in zip(ids, keep) if k)
+        doc_lens.append(np.array(seg.doc_len)[keep])
+        for term, p in seg.iter_postings():
+            live = live_postings(p, keep)
+            if live is None:
+                continue
+            parts_t = parts.setdefault(term, ([], []))
+            parts_t[0].append(live[0] + np.uint32(base))
+            parts_t[1].append(live[1])
+        base += int(keep.sum())
+    postings = {t: (np.concatenate(i), np.concatenate(f)) for t, (i, f) in parts.items()}
+    doc_len = np.concatenate(doc_lens) if doc_lens else np.zeros(0, dtype=np.uint32)
+    write_segment(path, doc_ids, doc_len, postings)
+
+
+class SegmentDirectory:
+    """
+    A directory of segment files plus a `segments.json` manifest listing the live ones
+    in order, and per segment the local indices of deleted docs (tombstones). Manifest
+    updates are serialized across processes with an flock.
+    """
+
+    MANIFEST = "segments.json"
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._manifest = os.path.join(directory, self.MANIFEST)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def new_name(self) -> str:
+        return f"seg-{time.time_ns():020d}-{os.getpid()}.bm25"
+
+    def manifest_mtime(self) -> float:
+        try:
+            return os.stat(self._manifest).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def load(self) -> List[str]:
+        return self.load_state()[0]
+
+    def load_state(self) -> Tuple[List[str], Dict[str, List[int]]]:
+        """
+        Returns (live segment names, segment name -> deleted local indices).
+        """
+        try:
+            with open(self._manifest, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return [], {}
+        return list(data["segments"]), dict(data.get("deleted", {}))
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(os.path.join(self.directory, ".lock"), "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _store(self, names: List[str], deleted: Dict[str, List[int]]) -> None:
+        deleted = {n: sorted(deleted[n]) for n in names if deleted.get(n)}
+        tmp = f"{self._manifest}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segments": names, "deleted": deleted}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._manifest)
+
+    def add(
+        self, name: str | None, deleted: Dict[str, Collection[int]] | None = None
+    ) -> bool:
+        """
+        Append segment `name` (if any) and record tombstones, in one manifest update.
+        Returns False, changing nothing, if a tombstoned segment is no longer live.
+        """
+        with self._locked():
+            names, current = self.load_state()
+            deleted = deleted or {}
+            if any(seg not in names for seg in deleted):
+                return False
+            for seg, idxs in deleted.items():
+                current[seg] = sorted(set(current.get(seg, ())) | set(idxs))
+            self._store(names + ([name] if name else []), current)
+        return True
+
+    def replace(
+        self,
+        old: Sequence[str],
+        new: str,
+        merged_deletes: Dict[str, Collection[int]] | None = None,
+    ) -> bool:
+        """
+        Swap `old` (a contiguous run of live segments) for `new`. Returns False if the
+        manifest changed underneath: `old` is no longer live, or docs were deleted from
+        it beyond `merged_deletes` (the tombstones `new` was built without).
+        """
+        merged_deletes = merged_deletes or {}
+        with self._locked():
+            names, current = self.load_state()
+            if not old or any(n not in names for n in old):
+                return False
+            if any(set(current.get(n, ())) != set(merged_deletes.get(n, ())) for n in old):
+                return False
+            pos = names.index(old[0])
+            names = [n for n in names if n not in old]
+            names.insert(pos, new)
+            self._store(names, current)
+        for name in old:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+        return True
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .answer_cache import IndexVersion
+
+
+class ChunkStore:
+    """
+    Process-local chunk_id -> metadata map (including chunk text), filled at ingest time
+    and by hydration misses. Lets retrieval resolve keyword-only hits without a Pinecone call.
+    Also keeps chunk embeddings so the validator can skip re-embedding.
+
+    Both maps are LRUs bounded by `max_vectors`. Chunk ids are positional, so a re-ingest
+    can put new text under an existing id: with a `version`, entries are dropped when the
+    corpus version moves, and puts computed against an older version are ignored. Entries
+    the ingest itself wrote (`written=True`) are current and survive the version bump
+    that ingest makes; reads that raced the ingest do not overwrite them.
+    """
+
+    def __init__(self, max_vectors: int = 50_000, version: IndexVersion | None = None) -> None:
+        self._meta: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._vecs: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._max_vectors = max_vectors
+        self.version = version
+        self._seen_version = version.value if version is not None else 0
+        # ids written by ingest since the last version change
+        self._written: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return chunk_id in self._meta
+
+    def current_version(self) -> int:
+        return self.version.value if self.version is not None else 0
+
+    def _sync_version(self) -> None:
+        # call with the lock held
+        if self.version is None:
+            return
+        value = self.version.value
+        if value != self._seen_version:
+            for entries in (self._meta, self._vecs):
+                for chunk_id in [cid for cid in entries if cid not in self._written]:
+                    del entries[chunk_id]
+            self._written.clear()
+            self._seen_version = value
+
+    def _stale(self, version: int | None) -> bool:
+        self._sync_version()
+        return version is not None and version != self._seen_version
+
+    def _keep(self, chunk_id: str, version: int | None, written: bool) -> bool:
+        # call with the lock held
+        if written:
+            self._written.add(chunk_id)
+            return True
+        return version is None or chunk_id not in self._written
+
+    def _evicted(self, chunk_id: str, other: Dict[str, Any]) -> None:
+        if chunk_id not in other:
+            self._written.discard(chunk_id)
+
+    def put_many(
+        self,
+        records: Iterable[Tuple[str, Dict[str, Any]]],
+        version: int | None = None,
+        written: bool = False,
+    ) -> None:
+        """
+        `version`: the corpus version the records were read at (see current_version).
+        `written`: the records were just written to the index by ingest.
+        """
+        if self._max_vectors <= 0:
+            return
+        with self._lock:
+            if self._stale(version):
+                return
+            for chunk_id, meta in records:
+                if not self._keep(chunk_id, version, written):
+                    continue
+                self._meta[chunk_id] = dict(meta)
+                self._meta.move_to_end(chunk_id)
+            while len(self._meta) > self._max_vectors:
+                self._evicted(self._meta.popitem(last=False)[0], self._vecs)
+
+    def get_many(self, chunk_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Returns (found, missing) where found maps chunk_id -> metadata.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        with self._lock:
+            self._sync_version()
+            for chunk_id in chunk_ids:
+                meta = self._meta.get(chunk_id)
+                if meta is None:
+                    missing.append(chunk_id)
+                else:
+                    self._meta.move_to_end(chunk_id)
+                    found[chunk_id] = meta
+        return found, missing
+
+    def put_vectors(
+        self,
+        items: Iterable[Tuple[str, Sequence[float]]],
+        version: int | None = None,
+        written: bool = False,
+    ) -> None:
+        if self._max_vectors <= 0:
+            return
+        with self._lock:
+            if self._stale(version):
+                return
+            for chunk_id, vec in items:
+                if not self._keep(chunk_id, version, written):
+                    continue
+                self._vecs[chunk_id] = np.asarray(vec, dtype=np.float32)
+                self._vecs.move_to_end(chunk_id)
+            while len(self._vecs) > self._max_vectors:
+                self._evicted(self._vecs.popitem(last=False)[0], self._meta)
+
+    def get_vectors(self, chunk_ids: List[str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        with self._lock:
+            self._sync_version()
+            for chunk_id in chunk_ids:
+                vec = self._vecs.get(chunk_id)
+                if vec is None:
+                    missing.append(chunk_id)
+                else:
+                    self._vecs.move_to_end(chunk_id)
+                    found[chunk_id] = vec
+        return found, missing
+
+    def delete(self, chunk_ids: Iterable[str]) -> None:
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._meta.pop(chunk_id, None)
+                self._vecs.pop(chunk_id, None)
+                self._written.discard(chunk_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._meta.clear()
+            self._vecs.clear()
+            self._written.clear()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, List
+
+# words and single punctuation marks; a word is charged one token per ~4 characters,
+# which tracks SentencePiece/BPE counts on English prose closely enough for budgeting
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# boundaries: blank line, line break before a heading or list item, sentence end
+_BOUNDARY_RE = re.compile(
+    r"(?P<paragraph>\n[ \t]*\n\s*)"
+    r"|(?P<line>\n(?=[ \t]*(?:#{1,6}|[-*+]|\d+[.)])[ \t]))"
+    r"|(?P<sentence>(?<=[.!?])[\"')\]]*[ \t]+(?=\S))"
+)
+_HEADING_RE = re.compile(r"[ \t]*#{1,6}[ \t]")
+
+HEADING, PARAGRAPH, LINE, SENTENCE = 3, 2, 1, 0
+
+
+def approx_tokens(text: str, start: int = 0, end: int | None = None) -> int:
+    n = 0
+    for m in _TOKEN_RE.finditer(text, start, len(text) if end is None else end):
+        n += 1 + (m.end() - m.start() - 1) // 4
+    return n
+
+
+@dataclass
+class _Unit:
+    start: int
+    end: int
+    tokens: int
+    boundary: int  # strength of the boundary this unit starts after
+
+
+class Chunker:
+    """
+    Splits text into chunks of at most `max_tokens` approximate tokens, cutting at the
+    strongest structural boundary available (heading > paragraph > line > sentence).
+    Consecutive chunks share up to `overlap_tokens` of whole trailing sentences, except
+    across headings.
+
+    One linear pass: boundaries and token counts are found with regexes over offsets
+    into the original string, and each chunk is sliced out exactly once.
+    """
+
+    def __init__(self, max_tokens: int = 800, overlap_tokens: int = 80) -> None:
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        # a chunk at least this full is closed at a heading rather than run across it
+        self._min_tokens = max_tokens // 4
+
+    def split(self, text: str) -> Iterator[str]:
+        units = list(self._units(text))
+        if not units:
+            return
+        chunk: List[_Unit] = []
+        tokens = 0
+        for unit in units:
+            if chunk and (
+                tokens + unit.tokens > self.max_tokens
+                or (unit.boundary == HEADING and tokens >= self._min_tokens)
+            ):
+                yield text[chunk[0].start : chunk[-1].end].strip()
+                chunk = [] if unit.boundary == HEADING else self._overlap(chunk, unit.tokens)
+                tokens = sum(u.tokens for u in chunk)
+            chunk.append(unit)
+            tokens += unit.tokens
+        yield text[chunk[0].start : chunk[-1].end].strip()
+
+    def _overlap(self, chunk: List[_Unit], next_tokens: int) -> List[_Unit]:
+        budget = min(self.overlap_tokens, self.max_tokens - next_tokens)
+        carried: List[_Unit] = []
+        used = 0
+        for unit in reversed(chunk):
+            if used + unit.tokens > budget:
+                break
+            carried.append(unit)
+            used += unit.tokens
+            if unit.boundary != SENTENCE:
+                break  # do not reach back past a paragraph or line start
+        carried.reverse()
+        return carried
+
+    def _units(self, text: str) -> Iterator[_Unit]:
+        start, boundary = 0, PARAGRAPH
+        for m in _BOUNDARY_RE.finditer(text):
+            if m.start() > start:
+                yield from self._sized(text, start, m.start(), boundary)
+            start = m.end()
+            if _HEADING_RE.match(text, start):
+                boundary = HEADING
+            elif m.lastgroup == "paragraph":
+                boundary = PARAGRAPH
+            else:
+                boundary = LINE if m.lastgroup == "line" else SENTENCE
+        if start < len(text):
+            yield from self._sized(text, start, len(text), boundary)
+
+    def _sized(self, text: str, start: int, end: int, boundary: int) -> Iterator[_Unit]:
+        tokens = approx_tokens(text, start, end)
+        if not tokens:
+            return
+        if tokens <= self.max_tokens:
+            yield _Unit(start, end, tokens, boundary)
+            return
+        # a single run-on sentence over budget: cut between words, and inside words
+        # (URLs, base64 blobs) that alone exceed the budget
+        piece_start, used = start, 0
+        for m in _TOKEN_RE.finditer(text, start, end):
+            t = 1 + (m.end() - m.start() - 1) // 4
+            if used and used + t > self.max_tokens:
+                yield _Unit(piece_start, m.start(), used, boundary)
+                piece_start, used, boundary = m.start(), 0, SENTENCE
+            while t > self.max_tokens:
+                cut = piece_start + 4 * self.max_tokens
+                yield _Unit(piece_start, cut, self.max_tokens, boundary)
+                piece_start, t, boundary = cut, t - self.max_tokens, SENTENCE
+            used += t
+        yield _Unit(piece_start, end, used, boundary)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List
+
+from rag_support.config import Settings, settings
+from rag_support.logging import logger
+from . import ingest_jobs as ingest_jobs_mod
+from . import ingestion as ingestion_mod
+from . import retrieval as retrieval_mod
+from . import vector_store as vector_store_mod
+from . import vertex as vertex_mod
+
+if TYPE_CHECKING:
+    from rag_support.rag_graph import RagGraph
+
+
+@dataclass
+class ServiceContainer:
+    """
+    Application-lifetime clients and services. Built once (normally in the FastAPI
+    lifespan) so requests never pay for Vertex init or Pinecone control-plane calls.
+    """
+
+    cfg: Settings
+    vertex: vertex_mod.AsyncVertexClient
+    store: vector_store_mod.VectorStore
+    retrieval: retrieval_mod.RetrievalService
+    ingestion: ingestion_mod.IngestionService
+    jobs: ingest_jobs_mod.IngestJobManager
+    graph: RagGraph
+    ready: bool = False
+    _tasks: List[asyncio.Task[None]] = field(default_factory=list)
+
+    async def warmup(self) -> None:
+        """
+        Load model handles, open the vector store connection and page in the BM25
+        segments, then optionally run WARMUP_QUERY through retrieval. Readiness reports
+        OK only after this returns.
+        """
+        t0 = time.perf_counter()
+        await asyncio.to_thread(self._warm_clients)
+        if self.cfg.warmup_query:
+            try:
+                await self.retrieval.hybrid_search(
+                    self.cfg.warmup_query, self.cfg.hybrid_alpha, self.cfg.rag_top_k, {}
+                )
+            except Exception:
+                # a cold first request is better than a pod that never turns ready
+                logger.warning("warmup_query_failed", exc_info=True)
+        self.ready = True
+        logger.info("services_warm", extra={"ms": round((time.perf_counter() - t0) * 1000, 1)})
+
+    def _warm_clients(self) -> None:
+        self.vertex.warmup()
+        self.store.warmup()
+        self.retrieval.bm25.warmup()
+
+    def start(self) -> None:
+        """
+        Start background jobs; call from inside the running event loop.
+        """
+        self.jobs.start()
+        if self.retrieval.bm25.persistent:
+            self._tasks.append(asyncio.create_task(self._merge_loop()))
+
+    async def stop(self) -> None:
+        await self.jobs.stop()
+        if self.graph.judge_queue is not None:
+            await self.graph.judge_queue.stop()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self.vertex.close()
+
+    async def _merge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.cfg.bm25_merge_interval_s)
+            try:
+                await asyncio.to_thread(self.retrieval.bm25.merge, self.cfg.bm25_max_segments)
+            except Exception:
+                logger.exception("bm25_merge_failed")
+
+
+def build_container(cfg: Settings = settings) -> ServiceContainer:
+    from rag_support.rag_graph import RagGraph
+
+    # resolved through the modules so tests can swap the client classes
+    vertex = vertex_mod.AsyncVertexClient(vertex_mod.VertexClient(), cfg)
+    store = vector_store_mod.build_vector_store(cfg)
+    retrieval = retrieval_mod.RetrievalService(cfg, vertex=vertex, store=store)
+    ingestion = ingestion_mod.IngestionService(cfg, vertex=vertex, pinecone=store)
+    jobs = ingest_jobs_mod.IngestJobManager(
+        ingestion,
+        cfg,
+        directory=cfg.ingest_jobs_dir or None,
+        run_workers=cfg.ingest_jobs_in_process,
+    )
+    graph = RagGraph(cfg, retrieval=retrieval, vertex=vertex)
+    return ServiceContainer(
+        cfg=cfg,
+        vertex=vertex,
+        store=store,
+        retrieval=retrieval,
+        ingestion=ingestion,
+        jobs=jobs,
+        graph=graph,
+    )
+
+
+_CONTAINER: ServiceContainer | None = None
+
+
+def get_container() -> ServiceContainer:
+    """
+    Returns the process container, building it lazily if the lifespan did not run
+    (e.g. ASGI test clients that skip startup events).
+    """
+    global _CONTAINER
+    if _CONTAINER is None:
+        _CONTAINER = build_container()
+    return _CONTAINER
+
+
+def set_container(container: ServiceContainer | None) -> None:
+    global _CONTAINER
+    _CONTAINER = container
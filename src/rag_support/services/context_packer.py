@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from .chunker import approx_tokens
+
+# chunk ids are "<source_id>-<index>" (see IngestionService._chunks)
+_CHUNK_INDEX_RE = re.compile(r"-(\d+)$")
+# "[i] " plus the newline around each context entry
+_ENTRY_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class PackedContext:
+    entries: List[Dict[str, Any]] = field(default_factory=list)  # prompt order
+    tokens: int = 0
+    tokens_saved: int = 0  # overlap removed when merging neighbours
+    dropped: int = 0  # chunks left out to stay within the budget
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "context_tokens": float(self.tokens),
+            "context_tokens_saved": float(self.tokens_saved),
+            "context_chunks_dropped": float(self.dropped),
+        }
+
+
+def overlap_chars(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of `left` that is also a prefix of `right` and lies on
+    whitespace boundaries in both (so a coincidental shared letter is never cut).
+    Linear time: prefix function over right + sentinel + tail of left.
+    """
+    n = min(len(left), len(right))
+    if not n:
+        return 0
+    s = right[:n] + "\x00" + left[-n:]
+    pi = [0] * len(s)
+    for i in range(1, len(s)):
+        k = pi[i - 1]
+        while k and s[i] != s[k]:
+            k = pi[k - 1]
+        if s[i] == s[k]:
+            k += 1
+        pi[i] = k
+    k = pi[-1]
+    while k:
+        right_ok = k == len(right) or right[k].isspace()
+        left_ok = k == len(left) or left[-k - 1].isspace()
+        if right_ok and left_ok:
+            return k
+        k = pi[k - 1]
+    return 0
+
+
+class ContextPacker:
+    """
+    Turns validated chunks into prompt context within `max_tokens` (approximate).
+
+    Chunks are taken by descending confidence while their marginal cost fits: a chunk
+    next to one already taken from the same source only costs what it adds beyond the
+    shared overlap. Taken neighbours are then merged into a single entry with the overlap
+    dropped. The best chunk is always kept, even alone over budget.
+    """
+
+    def __init__(self, max_tokens: int = 6000) -> None:
+        self.max_tokens = max_tokens
+
+    def pack(self, validated: List[Dict[str, Any]]) -> PackedContext:
+        if not validated:
+            return PackedContext()
+        tokens = [approx_tokens(v.get("text", "")) for v in validated]
+        position = {self._key(v): i for i, v in enumerate(validated) if self._key(v)}
+        # overlap (in tokens) between each chunk and its successor in the same source
+        overlaps: Dict[Tuple[int, int], int] = {}
+        for i, v in enumerate(validated):
+            key = self._key(v)
+            j = position.get((key[0], key[1] + 1)) if key else None
+            if j is not None:
+                left, right = v.get("text", ""), validated[j].get("text", "")
+                k = overlap_chars(left, right)
+                if k:
+                    overlaps[(i, j)] = approx_tokens(right, 0, k)
+
+        order = sorted(range(len(validated)), key=lambda i: -validated[i]["confidence"])
+        taken: set[int] = set()
+        used = 0
+        for i in order:
+            cost = tokens[i] + _ENTRY_OVERHEAD_TOKENS
+            for (a, b), shared in overlaps.items():
+                if (a == i and b in taken) or (b == i and a in taken):
+                    cost -= shared + _ENTRY_OVERHEAD_TOKENS
+            cost = max(cost, 0)
+            if taken and used + cost > self.max_tokens:
+                continue
+            taken.add(i)
+            used += cost
+
+        packed = PackedContext(dropped=len(validated) - len(taken))
+        for run in self._runs(validated, taken, position):
+            text = validated[run[0]].get("text", "")
+            for prev, i in zip(run, run[1:]):
+                right = validated[i].get("text", "")
+                k = overlap_chars(validated[prev].get("text", ""), right)
+                packed.tokens_saved += approx_tokens(right, 0, k)
+                text += right[k:] if k else "\n" + right
+            entry = {**validated[run[0]], "text": text}
+            entry["confidence"] = max(validated[i]["confidence"] for i in run)
+            entry["chunk_ids"] = [validated[i].get("chunk_id") for i in run]
+            packed.entries.append(entry)
+        packed.entries.sort(key=lambda e: -e["confidence"])
+        packed.tokens = sum(approx_tokens(e["text"]) + _ENTRY_OVERHEAD_TOKENS for e in packed.entries)
+        return packed
+
+    @staticmethod
+    def _key(v: Dict[str, Any]) -> Tuple[str, int] | None:
+        m = _CHUNK_INDEX_RE.search(str(v.get("chunk_id") or ""))
+        if not m or not v.get("source_id"):
+            return None
+        return str(v["source_id"]), int(m.group(1))
+
+    def _runs(
+        self,
+        validated: List[Dict[str, Any]],
+        taken: set[int],
+        position: Dict[Tuple[str, int], int],
+    ) -> List[List[int]]:
+        # maximal chains of taken chunks with consecutive indices in the same source
+        runs = []
+        for i in sorted(taken):
+            key = self._key(validated[i])
+            prev = position.get((key[0], key[1] - 1)) if key else None
+            if prev is not None and prev in taken:
+                continue  # not the start of a run
+            run = [i]
+            while key is not None:
+                key = (key[0], key[1] + 1)
+                nxt = position.get(key)
+                if nxt is None or nxt not in taken:
+                    break
+                run.append(nxt)
+            runs.append(run)
+        return runs
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from rag_support.config import settings
+from rag_support.utils import stable_id
+
+CacheKey = Tuple[str, str]
+
+
+@dataclass
+class _Claim:
+    ready: Dict[CacheKey, np.ndarray] = field(default_factory=dict)
+    waiting: Dict[CacheKey, Future[np.ndarray]] = field(default_factory=dict)
+    owned: Dict[CacheKey, Future[np.ndarray]] = field(default_factory=dict)
+    owned_texts: List[str] = field(default_factory=list)
+
+
+class EmbeddingCache:
+    """
+    Process-wide LRU + TTL cache of embeddings keyed by (embed model id, text hash).
+    Concurrent misses for the same key are coalesced: the first caller computes,
+    later callers wait on its future instead of issuing a duplicate embed call. On the
+    async path the compute runs in a task owned by the cache, so cancelling the first
+    caller (a branch timeout) does not fail the others.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_s: float = 3600.0) -> None:
+        self._max_entries = max_entries
+        self._ttl_s = ttl_s
+        self._entries: "OrderedDict[CacheKey, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, Future[np.ndarray]] = {}
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def _claim(self, keys: List[CacheKey], texts: Sequence[str]) -> _Claim:
+        now = time.monotonic()
+        claim = _Claim()
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in claim.ready or key in claim.waiting or key in claim.owned:
+                    continue
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    claim.ready[key] = entry[1]
+                    self.hits += 1
+                    continue
+                if entry is not None:
+                    del self._entries[key]
+                fut = self._inflight.get(key)
+                if fut is not None:
+                    claim.waiting[key] = fut
+                    self.coalesced += 1
+                    continue
+                fut = Future()
+                self._inflight[key] = fut
+                claim.owned[key] = fut
+                claim.owned_texts.append(text)
+                self.misses += 1
+        return claim
+
+    def _fulfil(self, claim: _Claim, vecs: Sequence[np.ndarray]) -> None:
+        vecs = list(vecs)
+        if len(vecs) != len(claim.owned):
+            exc = ValueError(f"embed returned {len(vecs)} vectors for {len(claim.owned)} texts")
+            self._fail(claim, exc)
+            raise exc
+        expires = time.monotonic() + self._ttl_s
+        with self._lock:
+            for (key, fut), vec in zip(claim.owned.items(), vecs):
+                arr = np.asarray(vec, dtype=float)
+                self._entries[key] = (expires, arr)
+                self._entries.move_to_end(key)
+                self._inflight.pop(key, None)
+                fut.set_result(arr)
+                claim.ready[key] = arr
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _fail(self, claim: _Claim, exc: BaseException) -> None:
+        with self._lock:
+            for key, fut in claim.owned.items():
+                self._inflight.pop(key, None)
+                fut.set_exception(exc)
+
+    def get_or_compute(
+        self,
+        model_id: str,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[np.ndarray]],
+    ) -> np.ndarray:
+        keys = [(model_id, stable_id(t)) for t in texts]
+        claim = self._claim(keys, texts)
+        if claim.owned:
+            try:
+                vecs = compute(claim.owned_texts)
+            except BaseException as e:
+                self._fail(claim, e)
+                raise
+            self._fulfil(claim, vecs)
+        for key, fut in claim.waiting.items():
+            claim.ready[key] = fut.result()
+        return np.vstack([claim.ready[k] for k in keys])
+
+    async def aget_or_compute(
+        self,
+        model_id: str,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Awaitable[Sequence[np.ndarray]]],
+    ) -> np.ndarray:
+        keys = [(model_id, stable_id(t)) for t in texts]
+        claim = self._claim(keys, texts)
+        if claim.owned:
+            task = asyncio.ensure_future(self._acompute(claim, compute))
+            self._tasks.add(task)
+            task.add_done_callback(self._reap)
+            await asyncio.shield(task)
+        for key, fut in claim.waiting.items():
+            claim.ready[key] = await asyncio.wrap_future(fut)
+        return np.vstack([claim.ready[k] for k in keys])
+
+    async def _acompute(
+        self, claim: _Claim, compute: Callable[[List[str]], Awaitable[Sequence[np.ndarray]]]
+    ) -> None:
+        try:
+            vecs = await compute(claim.owned_texts)
+        except Exception as e:
+            self._fail(claim, e)
+            raise
+        except BaseException:
+            # waiters must not inherit a cancellation; they see an ordinary error instead
+            self._fail(claim, RuntimeError("embedding computation was cancelled"))
+            raise
+        self._fulfil(claim, vecs)
+
+    def _reap(self, task: "asyncio.Task[Any]") -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()  # delivered through the futures; keep asyncio from logging it
+
+
+class CachedEmbedder:
+    """
+    Drop-in `await embed(texts)` wrapper around an AsyncVertexClient that goes through
+    an EmbeddingCache.
+    """
+
+    def __init__(self, vertex, cache: EmbeddingCache, model_id: str | None = None) -> None:
+        self.vertex = vertex
+        self.cache = cache
+        self.model_id = model_id or settings.vertex_embed_model_id
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return await self.cache.aget_or_compute(self.model_id, texts, self.vertex.embed)
+
+
+# Process-wide query embedding cache
+_GLOBAL_EMBED_CACHE = EmbeddingCache(
+    max_entries=settings.embed_cache_size, ttl_s=settings.embed_cache_ttl_s
+)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from rag_support.config import settings
+
+STRATEGIES = ("weighted", "rrf")
+NORMALIZATIONS = ("minmax", "zscore")
+
+
+def _valid(x: np.ndarray, valid: np.ndarray | None) -> np.ndarray:
+    return np.ones(x.shape, dtype=bool) if valid is None else valid
+
+
+def minmax(x: np.ndarray, valid: np.ndarray | None = None) -> np.ndarray:
+    """
+    Min-max scale along the last axis over `valid` entries; a constant row maps to 0.5.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    valid = _valid(x, valid)
+    lo = np.where(valid, x, np.inf).min(axis=-1, keepdims=True, initial=np.inf)
+    hi = np.where(valid, x, -np.inf).max(axis=-1, keepdims=True, initial=-np.inf)
+    span = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(span > 0, (x - lo) / np.where(span > 0, span, 1.0), 0.5)
+    return np.where(valid, out, 0.0)
+
+
+def zscore(x: np.ndarray, valid: np.ndarray | None = None) -> np.ndarray:
+    """
+    Standardize along the last axis over `valid` entries; a constant row maps to 0.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    valid = _valid(x, valid)
+    n = np.maximum(valid.sum(axis=-1, keepdims=True), 1)
+    mean = np.where(valid, x, 0.0).sum(axis=-1, keepdims=True) / n
+    var = np.where(valid, (x - mean) ** 2, 0.0).sum(axis=-1, keepdims=True) / n
+    std = np.sqrt(var)
+    out = np.where(std > 0, (x - mean) / np.where(std > 0, std, 1.0), 0.0)
+    return np.where(valid, out, 0.0)
+
+
+def normalize(x: np.ndarray, method: str = "minmax", valid: np.ndarray | None = None) -> np.ndarray:
+    if method == "minmax":
+        return minmax(x, valid)
+    if method == "zscore":
+        return zscore(x, valid)
+    raise ValueError(f"unknown normalization {method!r}")
+
+
+def rrf(ranks: np.ndarray, k: int = 60) -> np.ndarray:
+    """
+    Reciprocal-rank terms 1 / (k + rank + 1) for 0-based `ranks`; negative ranks (absent
+    from that list) contribute 0. Sum over the list axis to get the fused score.
+    """
+    ranks = np.asarray(ranks)
+    return np.where(ranks >= 0, 1.0 / (k + np.maximum(ranks, 0) + 1.0), 0.0)
+
+
+def score_ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    0-based descending rank of each score along the last axis; NaN (absent) ranks -1.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    present = ~np.isnan(scores)
+    order = np.argsort(np.where(present, -scores, np.inf), axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(scores.shape[-1]), axis=-1)
+    return np.where(present, ranks, -1)
+
+
+def rrf_merge(*ranked: Sequence[str], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Reciprocal Rank Fusion of ranked id lists (best first), best fused first; ties keep
+    first-seen order. A plain dict loop beats numpy at these list sizes; the batch path
+    over score arrays is `ScoreFusion.fuse_many`.
+    """
+    ranks: Dict[str, float] = {}
+    for ids in ranked:
+        for rank, doc_id in enumerate(ids):
+            ranks[doc_id] = ranks.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(ranks.items(), key=lambda x: x[1], reverse=True)
+
+
+class ScoreFusion:
+    """
+    Combines per-candidate semantic and keyword scores into one ranking score, for one
+    query (`fuse`) or a padded batch of queries (`fuse_many`) in a single array pass.
+
+    - "weighted": alpha * norm(semantic) + (1 - alpha) * norm(keyword), with norm min-max
+      or z-score over the query's candidates; a missing score counts as 0.
+    - "rrf": alpha-weighted reciprocal rank of each candidate within the semantic and
+      keyword lists (scaled by 2 so equal weights match plain RRF); missing contributes 0.
+
+    Scores are float arrays with NaN where a candidate has no hit in that list.
+    """
+
+    def __init__(
+        self,
+        strategy: str = "weighted",
+        normalization: str = "minmax",
+        rrf_k: int = 60,
+        validator_weights: Sequence[float] = (0.6, 0.25, 0.15),
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown fusion strategy {strategy!r}")
+        if normalization not in NORMALIZATIONS:
+            raise ValueError(f"unknown normalization {normalization!r}")
+        self.strategy = strategy
+        self.normalization = normalization
+        self.rrf_k = rrf_k
+        self.validator_weights = tuple(validator_weights)
+
+    @classmethod
+    def from_settings(cls, cfg=settings) -> "ScoreFusion":
+        return cls(
+            strategy=cfg.fusion_strategy,
+            normalization=cfg.fusion_normalization,
+            rrf_k=cfg.fusion_rrf_k,
+            validator_weights=[float(w) for w in cfg.validator_weights.split(",")],
+        )
+
+    def fuse(self, semantic: np.ndarray, keyword: np.ndarray, alpha: float) -> np.ndarray:
+        return self.fuse_many(
+            np.asarray(semantic, dtype=np.float64)[None],
+            np.asarray(keyword, dtype=np.float64)[None],
+            np.asarray([alpha]),
+        )[0]
+
+    def fuse_many(
+        self,
+        semantic: np.ndarray,
+        keyword: np.ndarray,
+        alpha: np.ndarray,
+        valid: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        (batch, n) score matrices and (batch,) alphas -> (batch, n) fused scores;
+        entries outside `valid` (padding) come back as -inf.
+        """
+        semantic = np.asarray(semantic, dtype=np.float64)
+        keyword = np.asarray(keyword, dtype=np.float64)
+        valid = _valid(semantic, valid)
+        a = np.asarray(alpha, dtype=np.float64).reshape(-1, 1)
+        if self.strategy == "rrf":
+            sem = rrf(score_ranks(np.where(valid, semantic, np.nan)), self.rrf_k)
+            kw = rrf(score_ranks(np.where(valid, keyword, np.nan)), self.rrf_k)
+            fused = 2.0 * (a * sem + (1.0 - a) * kw)
+        else:
+            sem = normalize(np.nan_to_num(semantic), self.normalization, valid)
+            kw = normalize(np.nan_to_num(keyword), self.normalization, valid)
+            fused = a * sem + (1.0 - a) * kw
+        return np.where(valid, fused, -np.inf)
+
+    def confidence(self, cosines: np.ndarray, priors: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Validator confidence for candidates in rank order: weighted sum of normalized
+        cosine, reciprocal rank (1 for the top candidate) and source prior.
+        """
+        w_cos, w_rank, w_prior = self.validator_weights
+        # always min-max: SIMILARITY_THRESHOLD is defined on the [0, 1] confidence scale
+        cos_norm = minmax(cosines)
+        rank_norm = 1.0 / np.arange(1, len(cosines) + 1)
+        conf = w_cos * cos_norm + w_rank * rank_norm + w_prior * np.asarray(priors)
+        return {"cosine": cos_norm, "rank_norm": rank_norm, "confidence": conf}
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import glob
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from rag_support.api.v1.models import IngestItem
+from rag_support.config import settings
+from rag_support.logging import logger
+from .ingestion import IngestionService, IngestProgress
+
+DONE_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    items: int
+    status: str = "queued"  # queued | running | succeeded | failed | cancelled
+    progress: IngestProgress = field(default_factory=IngestProgress)
+    error: str | None = None
+    cancel_requested: bool = False
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in DONE_STATES
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IngestJob":
+        data = dict(data)
+        data["progress"] = IngestProgress(**data.get("progress", {}))
+        return cls(**data)
+
+
+class IngestJobManager:
+    """
+    Runs ingestion as background jobs so `POST /v1/rag/ingest` returns a job id at once.
+
+    At most `ingest_max_concurrent_jobs` jobs run at a time. Without a `directory`, jobs
+    queue in memory and run on in-process workers. With one, each job is spooled as
+    `<id>.items.json` plus a `<id>.job.json` status file: any process with workers (this
+    one unless `run_workers` is False, or `python -m rag_support.ingest_worker`) claims
+    jobs by renaming the payload, reports status and progress through the status file,
+    and stops a running job when a `<id>.cancel.json` marker appears.
+    """
+
+    def __init__(
+        self,
+        ingestion: IngestionService,
+        cfg=settings,
+        directory: str | None = None,
+        run_workers: bool = True,
+    ) -> None:
+        self.ingestion = ingestion
+        self._dir = directory
+        self._run_workers = run_workers or directory is None
+        self._n_workers = max(1, cfg.ingest_max_concurrent_jobs)
+        self._poll_s = cfg.ingest_job_poll_s
+        self._history = cfg.ingest_job_history
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._payloads: Dict[str, List[IngestItem]] = {}
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._queue: asyncio.Queue[str] | None = None
+        self._workers: List[asyncio.Task[None]] = []
+        self._running: Dict[str, asyncio.Task[IngestProgress]] = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # -- lifecycle ---------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._run_workers and not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self._n_workers)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def run_forever(self) -> None:
+        """
+        Worker entry point: serve spooled jobs until cancelled.
+        """
+        self._run_workers = True
+        self.start()
+        try:
+            await asyncio.gather(*self._workers)
+        finally:
+            await self.stop()
+
+    # -- API -----------------------------------------------------------------------------
+
+    def submit(self, items: List[IngestItem]) -> IngestJob:
+        # time-prefixed ids sort in submission order, which keeps the spool FIFO
+        job = IngestJob(job_id=f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}", items=len(items))
+        if self._dir:
+            self._write_json(
+                self._path(job.job_id, "items"), [it.model_dump() for it in items]
+            )
+            self._save(job)
+        else:
+            self._finished[job.job_id] = asyncio.Event()
+            self._payloads[job.job_id] = list(items)
+            self._save(job)
+            self._ensure_queue().put_nowait(job.job_id)
+        logger.info("ingest_job_queued", extra={"job_id": job.job_id, "items": len(items)})
+        self.start()
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        if not self._dir:
+            return self._jobs.get(job_id)
+        job = self._load(job_id)
+        if job is not None and not job.done:
+            job.cancel_requested = os.path.exists(self._path(job_id, "cancel"))
+        return job
+
+    def cancel(self, job_id: str) -> IngestJob | None:
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_requested = True
+        if job.status == "queued" and self._unqueue(job_id):
+            self._finish(job, "cancelled")
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            self._jobs[job_id].cancel_requested = True
+            task.cancel()
+        elif self._dir:
+            # the worker running it (maybe in another process) checks on every batch
+            self._write_json(self._path(job_id, "cancel"), {})
+        return job
+
+    async def wait(self, job_id: str) -> IngestJob | None:
+        event = self._finished.get(job_id)
+        if event is not None:
+            await event.wait()
+            return self.get(job_id)
+        while (job := self.get(job_id)) is not None and not job.done:
+            await asyncio.sleep(self._poll_s)
+        return job
+
+    # -- workers -------------------------------------------------------------------------
+
+    async def _worker(self) -> None:
+        while True:
+            job, items = await self._next()
+            await self._run(job, items)
+
+    async def _next(self) -> Tuple[IngestJob, List[IngestItem]]:
+        if not self._dir:
+            while True:
+                job_id = await self._ensure_queue().get()
+                items = self._payloads.pop(job_id, None)
+                job = self._jobs.get(job_id)
+                if job is not None and items is not None and not job.done:
+                    return job, items
+        while True:
+            for path in sorted(glob.glob(os.path.join(self._dir, "*.items.json"))):
+                claimed = f"{path}.{os.getpid()}-{id(asyncio.current_task())}.claimed"
+                try:
+                    os.rename(path, claimed)
+                except FileNotFoundError:
+                    continue  # another worker got it, or it was cancelled
+                job_id = os.path.basename(path)[: -len(".items.json")]
+                with open(claimed, encoding="utf-8") as f:
+                    items = [IngestItem(**d) for d in json.load(f)]
+                os.remove(claimed)
+                job = self._load(job_id) or IngestJob(job_id=job_id, items=len(items))
+                return job, items
+            await asyncio.sleep(self._poll_s)
+
+    async def _run(self, job: IngestJob, items: List[IngestItem]) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        self._save(job)
+
+        def on_progress(progress: IngestProgress) -> None:
+            job.progress = progress
+            if self._dir and os.path.exists(self._path(job.job_id, "cancel")):
+                job.cancel_requested = True
+            if job.cancel_requested:
+                raise JobCancelled()
+            self._save(job)
+
+        task = asyncio.create_task(self.ingestion.ingest_items(items, progress=on_progress))
+        self._running[job.job_id] = task
+        try:
+            job.progress = await task
+            self._finish(job, "succeeded")
+        except (asyncio.CancelledError, JobCancelled):
+            if not job.cancel_requested:
+                # worker shutdown: put the job back for the next worker
+                self._requeue(job, items)
+                raise
+            self._finish(job, "cancelled")
+        except Exception as e:
+            logger.exception("ingest_job_failed", extra={"job_id": job.job_id})
+            job.error = f"ingest_failed: {e}"
+            self._finish(job, "failed")
+        finally:
+            self._running.pop(job.job_id, None)
+
+    # -- bookkeeping ---------------------------------------------------------------------
+
+    def _ensure_queue(self) -> asyncio.Queue[str]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def _unqueue(self, job_id: str) -> bool:
+        if not self._dir:
+            return self._payloads.pop(job_id, None) is not None
+        try:
+            os.remove(self._path(job_id, "items"))
+            return True
+        except FileNotFoundError:
+            return False  # already claimed by a worker
+
+    def _requeue(self, job: IngestJob, items: List[IngestItem]) -> None:
+        job.status = "queued"
+        job.started_at = None
+        job.progress = IngestProgress()
+        if self._dir:
+            self._write_json(self._path(job.job_id, "items"), [it.model_dump() for it in items])
+            self._save(job)
+        else:
+            job.error = "worker_stopped"
+            self._finish(job, "cancelled")
+
+    def _finish(self, job: IngestJob, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        self._save(job)
+        if self._dir:
+            try:
+                os.remove(self._path(job.job_id, "cancel"))
+            except FileNotFoundError:
+                pass
+        event = self._finished.pop(job.job_id, None)
+        if event is not None:
+            event.set()
+        logger.info(
+            "ingest_job_finished",
+            extra={"job_id": job.job_id, "status": status, **job.progress.as_dict()},
+        )
+        self._prune()
+
+    def _save(self, job: IngestJob) -> None:
+        if self._dir:
+            self._write_json(self._path(job.job_id, "job"), job.as_dict())
+        self._jobs[job.job_id] = job
+
+    def _load(self, job_id: str) -> IngestJob | None:
+        try:
+            with open(self._path(job_id, "job"), encoding="utf-8") as f:
+                return IngestJob.from_dict(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _prune(self) -> None:
+        done = [j for j, job in self._jobs.items() if job.done]
+        for job_id in done[: max(0, len(done) - self._history)]:
+            del self._jobs[job_id]
+            if self._dir:
+                try:
+                    os.remove(self._path(job_id, "job"))
+                except FileNotFoundError:
+                    pass
+
+    def _path(self, job_id: str, kind: str) -> str:
+        return os.path.join(self._dir or "", f"{job_id}.{kind}.json")
+
+    @staticmethod
+    def _write_json(path: str, data: Any) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
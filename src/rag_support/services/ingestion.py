@@ -1,68 +1,296 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Tuple, TypeVar
 
 import numpy as np
 from rag_support.api.v1.models import IngestItem
 from rag_support.config import settings
 from rag_support.logging import logger
 from rag_support.utils import stable_id
-from .vertex import VertexClient
-from .pinecone_store import PineconeStore
+from .vertex import AsyncVertexClient, VertexClient
+from .vector_store import VectorStore, build_vector_store
+from .answer_cache import _GLOBAL_INDEX_VERSION
 from .bm25_index import BM25Index
+from .chunk_store import ChunkStore
+from .chunker import Chunker
+from .source_manifest import SourceManifest
+
+T = TypeVar("T")
+Chunk = Tuple[str, str, Dict[str, Any]]  # (chunk_id, text, metadata)
+
+
+@dataclass
+class IngestProgress:
+    items: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    chunks_unchanged: int = 0
+    chunks_reused: int = 0  # unchanged content at a new chunk id; stored vector reused
+    chunks_deleted: int = 0
+    retries: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
 
 
 class IngestionService:
     """
     Simple ingestion: users provide full text payloads (or URLs they've pre-extracted).
-    We chunk into ~1-2K tokens (here we approximate by chars) with overlap, create embeddings, and upsert.
+    We chunk at structural boundaries into CHUNK_MAX_TOKENS (approximate) tokens with
+    sentence overlap, create embeddings, and upsert.
     """
 
-    def __init__(self, cfg=settings, bm25_index: BM25Index | None = None):
+    def __init__(
+        self,
+        cfg=settings,
+        bm25_index: BM25Index | None = None,
+        chunk_store: ChunkStore | None = None,
+        vertex: AsyncVertexClient | None = None,
+        pinecone: VectorStore | None = None,
+        manifest: SourceManifest | None = None,
+    ):
         self.cfg = cfg
-        self.vertex = VertexClient()
-        self.pinecone = PineconeStore()
-        # For demo simplicity we use a process-wide singleton-like instance.
-        # In production, use a persistent keyword index (e.g., Whoosh or ES).
-        self.bm25 = bm25_index or _GLOBAL_BM25_INDEX
-
-    async def ingest_items(self, items: List[IngestItem]) -> None:
-        chunks: list[tuple[str, str, dict]] = []
+        self.vertex = vertex or AsyncVertexClient(VertexClient(), cfg)
+        self.pinecone = pinecone if pinecone is not None else build_vector_store(cfg)
+        # Process-wide instance; set BM25_INDEX_DIR to persist it as shared on-disk segments.
+        self.bm25 = bm25_index if bm25_index is not None else _GLOBAL_BM25_INDEX
+        self.chunks = chunk_store if chunk_store is not None else _GLOBAL_CHUNK_STORE
+        self.manifest = manifest if manifest is not None else _GLOBAL_SOURCE_MANIFEST
+        self.chunker = Chunker(cfg.chunk_max_tokens, cfg.chunk_overlap_tokens)
+
+    async def ingest_items(
+        self,
+        items: Iterable[IngestItem],
+        progress: Callable[[IngestProgress], None] | None = None,
+    ) -> IngestProgress:
+        """
+        Streaming pipeline: chunk -> embed (batches sized to Vertex limits, several in
+        flight) -> upsert (bounded batches). Stages are joined by bounded queues, so a
+        slow Pinecone backs up embedding instead of buffering the whole request, and a
+        failing batch is retried on its own. `progress` is called after every upsert.
+
+        Chunks whose content hash matches the source manifest are skipped; content that
+        only moved to another chunk id (a chunk added or removed earlier in the document)
+        is re-upserted with its stored vector instead of being embedded again. Chunk ids
+        a source no longer produces are deleted once everything new is written.
+        """
+        cfg = self.cfg
+        stats = IngestProgress()
+        # source_id -> (chunk_id -> hash as of this ingest, stale chunk ids)
+        plans: Dict[str, Tuple[Dict[str, str], List[str]]] = {}
+        n_workers = max(1, cfg.ingest_embed_workers)
+        embed_q: asyncio.Queue[List[Chunk] | None] = asyncio.Queue(cfg.ingest_queue_size)
+        upsert_q: asyncio.Queue[Tuple[List[Chunk], np.ndarray] | None] = asyncio.Queue(
+            cfg.ingest_queue_size
+        )
+
+        async def produce() -> None:
+            for kind, batch in self._embed_batches(items, stats, plans):
+                if kind == "embed":
+                    await embed_q.put(batch)
+                    continue
+                # moved content: every old id is read before the generator goes on or
+                # anything is queued, so no chunk of this source is written over it first
+                size = cfg.ingest_upsert_batch_size
+                stored: Dict[str, np.ndarray] = {}
+                for i in range(0, len(batch), size):
+                    expected = {old_id: h for _, old_id, h in batch[i : i + size]}
+                    stored.update(await self._stored_vectors(expected, stats))
+                reused = [(c, stored[old_id]) for c, old_id, _ in batch if old_id in stored]
+                stats.chunks_reused += len(reused)
+                for i in range(0, len(reused), size):
+                    part = reused[i : i + size]
+                    await upsert_q.put(([c for c, _ in part], [v for _, v in part]))
+                # no stored vector, or the old id no longer holds this content: embed
+                lost = [c for c, old_id, _ in batch if old_id not in stored]
+                for i in range(0, len(lost), cfg.ingest_embed_batch_size):
+                    await embed_q.put(lost[i : i + cfg.ingest_embed_batch_size])
+            for _ in range(n_workers):
+                await embed_q.put(None)
+
+        async def embed_worker() -> None:
+            while (batch := await embed_q.get()) is not None:
+                vecs = await self._retry("embed", stats, self.vertex.embed, [c[1] for c in batch])
+                stats.chunks_embedded += len(batch)
+                await upsert_q.put((batch, vecs))
+
+        async def embed_stage() -> None:
+            await asyncio.gather(*(embed_worker() for _ in range(n_workers)))
+            await upsert_q.put(None)
+
+        async def upsert_stage() -> None:
+            pending: List[Tuple[Chunk, np.ndarray]] = []
+            while (done := await upsert_q.get()) is not None:
+                pending.extend(zip(*done))
+                while len(pending) >= cfg.ingest_upsert_batch_size:
+                    await self._write(pending[: cfg.ingest_upsert_batch_size], stats, progress)
+                    del pending[: cfg.ingest_upsert_batch_size]
+            if pending:
+                await self._write(pending, stats, progress)
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(produce())
+                tg.create_task(embed_stage())
+                tg.create_task(upsert_stage())
+            await self._delete_stale([cid for _, stale in plans.values() for cid in stale], stats)
+            for source_id, (hashes, _) in plans.items():
+                self.manifest.put(source_id, hashes)
+        except ExceptionGroup as eg:
+            # surface the failing batch's own error rather than the task group wrapper
+            raise eg.exceptions[0] from None
+        finally:
+            if stats.chunks_upserted or stats.chunks_deleted:
+                # BM25 keyword index; also on failure, so it matches what reached Pinecone
+                await asyncio.to_thread(self.bm25.flush)
+                # cached answers may no longer reflect the corpus
+                _GLOBAL_INDEX_VERSION.bump()
+        logger.info("ingest_complete", extra=stats.as_dict())
+        return stats
+
+    def _embed_batches(
+        self,
+        items: Iterable[IngestItem],
+        stats: IngestProgress,
+        plans: Dict[str, Tuple[Dict[str, str], List[str]]],
+    ) -> Iterator[Tuple[str, List[Any]]]:
+        """
+        Yields ("embed", chunks) batches, and per source, before any of its chunks,
+        ("moved", [(chunk, old chunk id, content hash)]) for content the manifest has
+        indexed under another id.
+        """
+        cfg = self.cfg
+        batch: List[Chunk] = []
+        chars = 0
         for it in items:
-            for i, chunk in enumerate(self._chunk_text(it.text)):
-                chunk_id = f"{stable_id(it.source)}-{i:04d}"
-                meta = {
-                    "source_id": stable_id(it.source),
-                    "chunk_id": chunk_id,
-                    "title": it.title or "",
-                    "url": it.url or "",
-                    "tags": it.tags or [],
-                }
-                chunks.append((chunk_id, chunk, meta))
-
-        texts = [c[1] for c in chunks]
-        vecs = self.vertex.embed(texts)
-        vectors = []
-        for (chunk_id, _, meta), vec in zip(chunks, vecs):
-            vectors.append((chunk_id, vec.tolist(), meta))
-        self.pinecone.upsert(vectors)
-
-        # BM25 keyword index
-        doc_ids = [c[0] for c in chunks]
-        self.bm25.add_docs(doc_ids, texts)
-        logger.info("ingest_complete", extra={"chunks": len(chunks)})
-
-    @staticmethod
-    def _chunk_text(text: str, max_chars: int = 5500, overlap: int = 500):
-        start = 0
-        n = len(text)
-        while start < n:
-            end = min(n, start + max_chars)
-            yield text[start:end]
-            if end == n:
-                break
-            start = end - overlap
-
-
-# Global in-memory BM25 index instance
-_GLOBAL_BM25_INDEX = BM25Index()
+            stats.items += 1
+            source_id = stable_id(it.source)
+            indexed = self.manifest.get(source_id)
+            indexed_ids = {h: cid for cid, h in indexed.items()}
+            hashes: Dict[str, str] = {}
+            changed: List[Chunk] = []
+            moved: List[Tuple[Chunk, str, str]] = []
+            for chunk in self._chunks(it):
+                h = hashes[chunk[0]] = SourceManifest.chunk_hash(chunk[2])
+                if indexed.get(chunk[0]) == h:
+                    stats.chunks_unchanged += 1
+                elif h in indexed_ids:
+                    moved.append((chunk, indexed_ids[h], h))
+                else:
+                    changed.append(chunk)
+            if moved:
+                yield "moved", moved
+            for chunk in changed:
+                if batch and (
+                    len(batch) >= cfg.ingest_embed_batch_size
+                    or chars + len(chunk[1]) > cfg.ingest_embed_batch_chars
+                ):
+                    yield "embed", batch
+                    batch, chars = [], 0
+                batch.append(chunk)
+                chars += len(chunk[1])
+            plans[source_id] = (hashes, [cid for cid in indexed if cid not in hashes])
+        if batch:
+            yield "embed", batch
+
+    async def _stored_vectors(
+        self, expected: Dict[str, str], stats: IngestProgress
+    ) -> Dict[str, np.ndarray]:
+        """
+        chunk_id -> stored vector, for the ids whose stored metadata still hashes to
+        `expected[chunk_id]`. The manifest is only written after a successful ingest, so
+        after a partial failure an old id may already hold other content.
+        """
+        metas, _ = self.chunks.get_many(list(expected))
+        vecs, _ = self.chunks.get_vectors(list(metas))
+        found = {
+            cid: vec
+            for cid, vec in vecs.items()
+            if SourceManifest.chunk_hash(metas[cid]) == expected[cid]
+        }
+        missing = [cid for cid in expected if cid not in found]
+        if missing:
+            fetched = await self._retry(
+                "fetch", stats, asyncio.to_thread, self.pinecone.fetch, missing
+            )
+            found.update(
+                (vid, np.asarray(v["values"], dtype=np.float32))
+                for vid, v in fetched.items()
+                if v["values"] and SourceManifest.chunk_hash(v["metadata"] or {}) == expected[vid]
+            )
+        return found
+
+    async def _delete_stale(self, chunk_ids: List[str], stats: IngestProgress) -> None:
+        if not chunk_ids:
+            return
+        await self._retry("delete", stats, asyncio.to_thread, self.pinecone.delete, chunk_ids)
+        self.bm25.delete(chunk_ids)
+        self.chunks.delete(chunk_ids)
+        stats.chunks_deleted += len(chunk_ids)
+
+    def _chunks(self, it: IngestItem) -> Iterator[Chunk]:
+        source_id = stable_id(it.source)
+        for i, chunk in enumerate(self.chunker.split(it.text)):
+            chunk_id = f"{source_id}-{i:04d}"
+            meta = {
+                "source_id": source_id,
+                "chunk_id": chunk_id,
+                "title": it.title or "",
+                "url": it.url or "",
+                "tags": it.tags or [],
+                "text": chunk,
+            }
+            yield chunk_id, chunk, meta
+
+    async def _write(
+        self,
+        batch: List[Tuple[Chunk, np.ndarray]],
+        stats: IngestProgress,
+        progress: Callable[[IngestProgress], None] | None,
+    ) -> None:
+        vectors = [(c[0], vec.tolist(), c[2]) for c, vec in batch]
+        await self._retry("upsert", stats, asyncio.to_thread, self.pinecone.upsert, vectors)
+        # local metadata store so retrieval can hydrate keyword hits without a Pinecone call
+        self.chunks.put_many(((c[0], c[2]) for c, _ in batch), written=True)
+        self.chunks.put_vectors(((c[0], vec) for c, vec in batch), written=True)
+        self.bm25.add_docs([c[0] for c, _ in batch], [c[1] for c, _ in batch])
+        stats.chunks_upserted += len(batch)
+        logger.info("ingest_progress", extra=stats.as_dict())
+        if progress is not None:
+            progress(stats)
+
+    async def _retry(
+        self, op: str, stats: IngestProgress, fn: Callable[..., Awaitable[T]], *args: Any
+    ) -> T:
+        attempt = 0
+        while True:
+            try:
+                return await fn(*args)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.cfg.ingest_max_retries:
+                    raise
+                stats.retries += 1
+                logger.warning(
+                    "ingest_batch_retry", extra={"op": op, "attempt": attempt, "error": str(e)}
+                )
+                await asyncio.sleep(self.cfg.ingest_retry_backoff_s * 2 ** (attempt - 1))
+
+
+# Global BM25 index instance (in-memory unless BM25_INDEX_DIR is set)
+_GLOBAL_BM25_INDEX = BM25Index(
+    directory=settings.bm25_index_dir or None, refresh_s=settings.bm25_refresh_s
+)
+# Global chunk metadata store, aligned with the BM25 index and Pinecone ids; dropped
+# whenever any process bumps the corpus version
+_GLOBAL_CHUNK_STORE = ChunkStore(
+    max_vectors=settings.vector_cache_size, version=_GLOBAL_INDEX_VERSION
+)
+# Global per-source chunk hashes (in-memory unless a manifest or BM25 dir is set)
+_GLOBAL_SOURCE_MANIFEST = SourceManifest(
+    settings.ingest_manifest_dir
+    or (os.path.join(settings.bm25_index_dir, "sources") if settings.bm25_index_dir else None)
+)
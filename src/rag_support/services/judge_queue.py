@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+from rag_support import metrics
+from rag_support.config import settings
+from rag_support.logging import logger
+
+
+class LogResultSink:
+    """
+    Default sink: one structured log line per verdict.
+    """
+
+    async def write(self, record: Dict[str, Any]) -> None:
+        logger.info("judge_verdict", extra=record)
+
+
+class JsonlResultSink:
+    """
+    Appends one JSON object per verdict to a file (for offline quality dashboards).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _append(self, line: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    async def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+
+class JudgeQueue:
+    """
+    Background LLM-as-judge: answers are judged after the response has been returned.
+    Jobs go into a bounded queue (dropped, and counted, when full) served by a fixed
+    number of workers, so judge traffic cannot pile up behind a slow Gemini.
+    """
+
+    def __init__(self, vertex, system_prompt: str, cfg=settings, sink: Any = None) -> None:
+        self.vertex = vertex
+        self.system_prompt = system_prompt
+        self.sink = sink or (
+            JsonlResultSink(cfg.eval_results_path) if cfg.eval_results_path else LogResultSink()
+        )
+        self._n_workers = cfg.eval_workers
+        self._queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=cfg.eval_queue_size)
+        self._workers: List[asyncio.Task[None]] = []
+        # this queue's own counts; the process totals are exported on /metrics
+        self.counters: Counter[str] = Counter()
+
+    def _count(self, outcome: str) -> None:
+        self.counters[outcome] += 1
+        metrics.JUDGE_JOBS.inc(outcome=outcome)
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(self._n_workers)
+            ]
+
+    async def stop(self, drain_timeout_s: float = 5.0) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout_s)
+        except asyncio.TimeoutError:
+            logger.warning("judge_queue_not_drained", extra={"pending": self._queue.qsize()})
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(
+        self,
+        payload: Dict[str, Any],
+        meta: Dict[str, Any] | None = None,
+        on_verdict: Callable[[Dict[str, Any]], None] | None = None,
+    ) -> bool:
+        """
+        Queue `payload` for judging; `on_verdict` is called with the report once judged.
+        """
+        self.start()
+        job = {"payload": payload, "meta": meta or {}, "ts": time.time(), "on_verdict": on_verdict}
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._count("dropped")
+            return False
+        self._count("submitted")
+        return True
+
+    async def join(self) -> None:
+        await self._queue.join()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                report = await self.vertex.judge(self.system_prompt, job["payload"], temperature=0.0)
+                verdict = str(report.get("verdict", "fail"))
+                self._count("completed")
+                self.counters[f"verdict_{verdict}"] += 1
+                metrics.JUDGE_VERDICTS.inc(verdict=verdict)
+                await self.sink.write(
+                    {
+                        **job["meta"],
+                        "query": job["payload"].get("query", ""),
+                        "verdict": verdict,
+                        "report": report,
+                        "lag_s": round(time.time() - job["ts"], 3),
+                    }
+                )
+                if job["on_verdict"] is not None:
+                    try:
+                        job["on_verdict"](report)
+                    except Exception:
+                        logger.exception("judge_callback_failed")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._count("failed")
+                logger.exception("judge_job_failed")
+            finally:
+                self._queue.task_done()
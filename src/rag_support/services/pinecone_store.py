@@ -4,13 +4,20 @@ import time
 from typing import Any, Dict, Iterable, List, Tuple
 
 import numpy as np
-from pinecone import Pinecone, ServerlessSpec
+from rag_support import metrics
 from rag_support.config import settings
 from rag_support.logging import logger
 
 
 class PineconeStore:
+    """
+    Thin wrapper over one Pinecone index. The constructor hits the control plane
+    (list/create index), so build it once per process and share it.
+    """
+
     def __init__(self) -> None:
+        from pinecone import Pinecone, ServerlessSpec
+
         self._pc = Pinecone(api_key=settings.pinecone_api_key)
         self._index_name = settings.pinecone_index
         self._dim = settings.pinecone_dim
@@ -24,12 +31,24 @@ class PineconeStore:
             )
         self._index = self._pc.Index(self._index_name)
 
+    def warmup(self) -> None:
+        # opens the data-plane connection pool before the first query
+        self._index.describe_index_stats()
+
     def upsert(self, vectors: List[Tuple[str, List[float], Dict[str, Any]]]) -> None:
+        metrics.count_call("pinecone", "upsert")
         self._index.upsert(vectors=vectors)
 
+    def delete(self, ids: List[str], batch_size: int = 1000) -> None:
+        # Pinecone caps delete-by-id requests at 1000 ids
+        for i in range(0, len(ids), batch_size):
+            metrics.count_call("pinecone", "delete")
+            self._index.delete(ids=list(ids[i : i + batch_size]))
+
     def query(
         self, vector: np.ndarray, top_k: int, metadata_filter: Dict[str, Any] | None = None
     ) -> List[Dict[str, Any]]:
+        metrics.count_call("pinecone", "query")
         res = self._index.query(
             vector=vector.tolist(),
             top_k=top_k,
@@ -46,3 +65,24 @@ class PineconeStore:
                 }
             )
         return out
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Bulk lookup by vector id in a single round-trip. Missing ids are omitted.
+        """
+        if not ids:
+            return {}
+        metrics.count_call("pinecone", "fetch")
+        res = self._index.fetch(ids=list(ids))
+        vectors = getattr(res, "vectors", None)
+        if vectors is None:
+            vectors = res.get("vectors", {})
+        out: Dict[str, Dict[str, Any]] = {}
+        for vid, vec in vectors.items():
+            values = getattr(vec, "values", None)
+            metadata = getattr(vec, "metadata", None)
+            if isinstance(vec, dict):
+                values = vec.get("values")
+                metadata = vec.get("metadata")
+            out[vid] = {"id": vid, "values": values or [], "metadata": metadata or {}}
+        return out
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from typing import Any, Awaitable, Dict, List, Tuple
 
 import numpy as np
 
+from rag_support import metrics
 from rag_support.config import settings
 from rag_support.logging import logger
-from rag_support.utils import rrf_merge, normalize_list, cosine_similarity
-from .pinecone_store import PineconeStore
-from .vertex import VertexClient
-from .ingestion import _GLOBAL_BM25_INDEX
+from . import fusion
+from .vector_store import VectorStore, build_vector_store
+from .vertex import AsyncVertexClient, VertexClient
+from .chunk_store import ChunkStore
+from .embedding_cache import _GLOBAL_EMBED_CACHE, CachedEmbedder
+from .ingestion import _GLOBAL_BM25_INDEX, _GLOBAL_CHUNK_STORE
 
 
 @dataclass
@@ -25,88 +29,268 @@ class RetrievedDoc:
     keyword_score: float
 
 
+@dataclass
+class SearchRequest:
+    query: str
+    alpha: float
+    top_k: int
+    metadata_filters: Dict[str, Any]
+
+
 class RetrievalService:
-    def __init__(self, cfg=settings):
+    def __init__(
+        self,
+        cfg=settings,
+        chunk_store: ChunkStore | None = None,
+        vertex: AsyncVertexClient | None = None,
+        store: VectorStore | None = None,
+    ):
         self.cfg = cfg
-        self.vertex = VertexClient()
-        self.store = PineconeStore()
+        self.vertex = vertex or AsyncVertexClient(VertexClient(), cfg)
+        self.store = store if store is not None else build_vector_store(cfg)
         self.bm25 = _GLOBAL_BM25_INDEX
+        self.chunks = chunk_store if chunk_store is not None else _GLOBAL_CHUNK_STORE
+        self.embedder = CachedEmbedder(self.vertex, _GLOBAL_EMBED_CACHE, cfg.vertex_embed_model_id)
+        self.fusion = fusion.ScoreFusion.from_settings(cfg)
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        return (await self.embedder.embed([query]))[0]
+
+    async def embed_queries(self, queries: List[str]) -> np.ndarray:
+        # batched under the same Vertex per-call limits as ingestion
+        size = max(1, self.cfg.ingest_embed_batch_size)
+        with metrics.span("embed_query"):
+            parts = await asyncio.gather(
+                *(self.embedder.embed(queries[i : i + size]) for i in range(0, len(queries), size))
+            )
+        return np.vstack(parts) if parts else np.zeros((0, 0))
 
     async def hybrid_search(
-        self, query: str, alpha: float, top_k: int, metadata_filters: Dict[str, Any]
+        self,
+        query: str,
+        alpha: float,
+        top_k: int,
+        metadata_filters: Dict[str, Any],
+        query_vec: np.ndarray | None = None,
+    ) -> List[RetrievedDoc]:
+        # Both branches start at once: BM25 scoring runs in a worker thread while the query
+        # is embedded and Pinecone is queried. A branch that fails or times out degrades
+        # to no hits instead of failing the request.
+        sem, kw_pairs = await asyncio.gather(
+            self._branch(
+                "semantic",
+                self._semantic_search(query, metadata_filters, query_vec),
+                self.cfg.semantic_timeout_s,
+            ),
+            self._branch(
+                "keyword",
+                metrics.timed(
+                    "bm25_search",
+                    asyncio.to_thread(self.bm25.search, query, top_k=self.cfg.bm25_top_k),
+                ),
+                self.cfg.bm25_timeout_s,
+            ),
+        )
+        return await self._fuse(alpha, top_k, sem, kw_pairs)
+
+    async def hybrid_search_many(
+        self, requests: List[SearchRequest], query_vecs: np.ndarray
+    ) -> List[List[RetrievedDoc]]:
+        """
+        hybrid_search for many queries at once: vectors come pre-embedded, at most
+        QUERY_BATCH_SEARCH_CONCURRENCY semantic queries run at a time and BM25 scores
+        every query in one search_many pass.
+        """
+        if not requests:
+            return []
+        gate = asyncio.Semaphore(max(1, self.cfg.query_batch_search_concurrency))
+
+        async def semantic(r: SearchRequest, qv: np.ndarray) -> List[Dict[str, Any]]:
+            async with gate:
+                # the timeout starts once the query runs, not while it waits for a slot
+                return await self._branch(
+                    "semantic",
+                    metrics.timed(
+                        "vector_search",
+                        asyncio.to_thread(
+                            self.store.query,
+                            qv,
+                            top_k=self.cfg.semantic_top_k,
+                            metadata_filter=r.metadata_filters,
+                        ),
+                    ),
+                    self.cfg.semantic_timeout_s,
+                )
+
+        sem_all, kw_all = await asyncio.gather(
+            asyncio.gather(*(semantic(r, qv) for r, qv in zip(requests, query_vecs))),
+            self._branch(
+                "keyword",
+                metrics.timed(
+                    "bm25_search",
+                    asyncio.to_thread(
+                        self.bm25.search_many,
+                        [r.query for r in requests],
+                        top_k=self.cfg.bm25_top_k,
+                    ),
+                ),
+                self.cfg.bm25_batch_timeout_s,
+            ),
+        )
+        kw_all = kw_all or [[] for _ in requests]
+        return await self._fuse_many(
+            [(r.alpha, r.top_k) for r in requests], list(sem_all), list(kw_all)
+        )
+
+    async def _fuse(
+        self,
+        alpha: float,
+        top_k: int,
+        sem: List[Dict[str, Any]],
+        kw_pairs: List[Tuple[str, float]],
     ) -> List[RetrievedDoc]:
-        qv = self.vertex.embed([query])[0]
-
-        # semantic (pinecone)
-        sem = self.store.query(qv, top_k=self.cfg.semantic_top_k, metadata_filter=metadata_filters)
-        sem_ids = [m["id"] for m in sem]
-
-        # keyword (bm25)
-        kw_pairs = self.bm25.search(query, top_k=self.cfg.bm25_top_k)
-        kw_ids = [doc_id for doc_id, _ in kw_pairs]
-        kw_dict = {doc_id: score for doc_id, score in kw_pairs}
-
-        fused = rrf_merge(sem_ids, kw_ids)
-        ranked_ids = [doc_id for doc_id, _ in fused][: top_k * 2]  # widen before later pruning
-
-        # Build results with text from Pinecone metadata; if not available, reconstruct basic.
-        # Here we rely on Pinecone metadata to include text; if not, consider adding it on upsert.
-        results: List[RetrievedDoc] = []
-        for doc_id in ranked_ids:
-            sem1 = self.store.query(qv, top_k=1, metadata_filter={"chunk_id": {"$eq": doc_id}})
-            if sem1:
-                md = sem1[0]["metadata"]
-                text = md.get("text", "")
-                results.append(
+        return (await self._fuse_many([(alpha, top_k)], [sem], [kw_pairs]))[0]
+
+    async def _fuse_many(
+        self,
+        params: List[Tuple[float, int]],
+        sems: List[List[Dict[str, Any]]],
+        kws: List[List[Tuple[str, float]]],
+    ) -> List[List[RetrievedDoc]]:
+        """
+        RRF picks each query's candidates, one hydration pass covers every query, and the
+        fusion engine scores all candidate sets as one padded matrix.
+        """
+        plans = []
+        for (_, top_k), sem, kw_pairs in zip(params, sems, kws):
+            fused = fusion.rrf_merge(
+                [m["id"] for m in sem], [doc_id for doc_id, _ in kw_pairs], k=self.fusion.rrf_k
+            )
+            ranked_ids = [doc_id for doc_id, _ in fused][: top_k * 2]  # widen before later pruning
+            plans.append((ranked_ids, {m["id"]: m for m in sem}, dict(kw_pairs)))
+
+        # Hydrate: semantic hits reuse the metadata Pinecone already returned, the rest come
+        # from the local chunk store, and anything still missing is fetched in one bulk call.
+        all_ids = list(dict.fromkeys(doc_id for ids, _, _ in plans for doc_id in ids))
+        sem_by_id = {doc_id: m for _, hits, _ in plans for doc_id, m in hits.items()}
+        with metrics.span("hydrate"):
+            metas = await asyncio.to_thread(self._hydrate, all_ids, sem_by_id)
+
+        rows: List[List[RetrievedDoc]] = []
+        for ranked_ids, hits, kw_dict in plans:
+            row = []
+            for doc_id in ranked_ids:
+                md = metas.get(doc_id)
+                if md is None:
+                    continue
+                hit = hits.get(doc_id)
+                row.append(
                     RetrievedDoc(
                         id=doc_id,
-                        text=text,
+                        text=md.get("text", ""),
                         title=md.get("title", ""),
                         url=md.get("url", ""),
                         source_id=md.get("source_id", ""),
                         chunk_id=md.get("chunk_id", doc_id),
-                        semantic_score=next((m["score"] for m in sem if m["id"] == doc_id), 0.0),
+                        semantic_score=hit["score"] if hit else 0.0,
                         keyword_score=kw_dict.get(doc_id, 0.0),
                     )
                 )
+            rows.append(row)
 
-        # score fusion (alpha between semantic and keyword)
-        if not results:
+        # score fusion (alpha between semantic and keyword); NaN marks "no hit in that list"
+        width = max((len(row) for row in rows), default=0)
+        sem_scores = np.full((len(rows), width), np.nan)
+        kw_scores = np.full((len(rows), width), np.nan)
+        valid = np.zeros((len(rows), width), dtype=bool)
+        for i, ((_, hits, kw_dict), row) in enumerate(zip(plans, rows)):
+            valid[i, : len(row)] = True
+            for j, d in enumerate(row):
+                if d.id in hits:
+                    sem_scores[i, j] = d.semantic_score
+                if d.id in kw_dict:
+                    kw_scores[i, j] = d.keyword_score
+        alphas = np.array([alpha for alpha, _ in params], dtype=np.float64)
+        order = np.argsort(
+            -self.fusion.fuse_many(sem_scores, kw_scores, alphas, valid), axis=1, kind="stable"
+        )
+
+        out = []
+        for (_, top_k), row, idx in zip(params, rows, order):
+            top = [row[j] for j in idx[: min(top_k, len(row))]]
+            logger.info("hybrid_search", extra={"top_k": len(top)})
+            out.append(top)
+        return out
+
+    async def _semantic_search(
+        self, query: str, metadata_filters: Dict[str, Any], query_vec: np.ndarray | None
+    ) -> List[Dict[str, Any]]:
+        if query_vec is None:
+            with metrics.span("embed_query"):
+                query_vec = await self.embed_query(query)
+        with metrics.span("vector_search"):
+            return await asyncio.to_thread(
+                self.store.query,
+                query_vec,
+                top_k=self.cfg.semantic_top_k,
+                metadata_filter=metadata_filters,
+            )
+
+    @staticmethod
+    async def _branch(name: str, aw: Awaitable[List[Any]], timeout_s: float) -> List[Any]:
+        try:
+            return await asyncio.wait_for(aw, timeout=timeout_s)
+        except Exception as e:
+            logger.warning("retrieval_branch_degraded", extra={"branch": name, "error": repr(e)})
             return []
-        sem_scores = [r.semantic_score for r in results]
-        kw_scores = [r.keyword_score for r in results]
-        sem_norm = normalize_list(sem_scores)
-        kw_norm = normalize_list(kw_scores)
 
-        fused_scores = [(alpha * s + (1 - alpha) * k) for s, k in zip(sem_norm, kw_norm)]
-        pairs = list(zip(results, fused_scores))
-        pairs.sort(key=lambda x: x[1], reverse=True)
+    def _hydrate(
+        self, ids: List[str], sem_by_id: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        metas: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = []
+        for doc_id in ids:
+            md = sem_by_id[doc_id]["metadata"] if doc_id in sem_by_id else None
+            if md and "text" in md:
+                metas[doc_id] = md
+            else:
+                pending.append(doc_id)
 
-        top = [p[0] for p in pairs][:top_k]
-        logger.info("hybrid_search", extra={"top_k": len(top)})
-        return top
+        version = self.chunks.current_version()
+        local, missing = self.chunks.get_many(pending)
+        metas.update(local)
+        if missing:
+            fetched = self.store.fetch(missing)
+            fetched_metas = {vid: v["metadata"] for vid, v in fetched.items()}
+            # dropped if an ingest landed while fetching
+            self.chunks.put_many(fetched_metas.items(), version=version)
+            self.chunks.put_vectors(
+                ((vid, v["values"]) for vid, v in fetched.items() if v["values"]), version=version
+            )
+            metas.update(fetched_metas)
+        return metas
 
-    def validator(
-        self, query_vec: np.ndarray, docs: List[RetrievedDoc], w1=0.6, w2=0.25, w3=0.15
+    async def validator(
+        self, query_vec: np.ndarray, docs: List[RetrievedDoc]
     ) -> List[Dict[str, Any]]:
         """
-        Compute confidence per chunk: normalized cosine + normalized reciprocal rank + source prior.
+        Compute confidence per chunk: normalized cosine + normalized reciprocal rank + source
+        prior, weighted by VALIDATOR_WEIGHTS.
         """
         if not docs:
             return []
-        cosines = []
-        for d in docs:
-            dv = self._embed_text(d.text) if d.text else np.zeros_like(query_vec)
-            cos = float(cosine_similarity(query_vec, dv)) if dv.any() else 0.0
-            cosines.append(cos)
-
-        ranks = list(range(1, len(docs) + 1))
-        rank_norm = [1.0 / r for r in ranks]  # larger for top
-        rank_norm = [x / max(rank_norm) for x in rank_norm]  # normalize to [0,1]
-        cos_norm = normalize_list(cosines)
-        priors = [0.8 if d.url.startswith("http") else 0.5 for d in docs]
+        with metrics.span("validate"):
+            mat = await self._doc_vectors(docs, dim=query_vec.shape[0])
+            return self._validate(query_vec, docs, mat)
 
-        conf = [w1 * c + w2 * r + w3 * p for c, r, p in zip(cos_norm, rank_norm, priors)]
+    def _validate(
+        self, query_vec: np.ndarray, docs: List[RetrievedDoc], mat: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        priors = [0.8 if d.url.startswith("http") else 0.5 for d in docs]
+        scored = self.fusion.confidence(self._cosines(query_vec, mat), np.asarray(priors))
+        cos_norm = scored["cosine"].tolist()
+        rank_norm = scored["rank_norm"].tolist()
+        conf = scored["confidence"].tolist()
 
         out = []
         for d, c, cn, rn, sp in zip(docs, conf, cos_norm, rank_norm, priors):
@@ -123,5 +307,37 @@ class RetrievalService:
             )
         return out
 
-    def _embed_text(self, text: str) -> np.ndarray:
-        return self.vertex.embed([text])[0]
+    async def _doc_vectors(self, docs: List[RetrievedDoc], dim: int) -> np.ndarray:
+        """
+        Stack candidate embeddings into an (n, dim) matrix: local vector cache first, then one
+        Pinecone fetch, then one batched embed through the embedding cache (and so the Vertex
+        limits and timeouts) for anything still unknown. Rows for docs without text (or
+        without a resolvable vector) stay zero.
+        """
+        mat = np.zeros((len(docs), dim), dtype=np.float32)
+        want = [d.id for d in docs if d.text]
+        version = self.chunks.current_version()
+        found, missing = self.chunks.get_vectors(want)
+        if missing:
+            fetched = await asyncio.to_thread(self.store.fetch, missing)
+            fresh = {vid: v["values"] for vid, v in fetched.items() if v["values"]}
+            self.chunks.put_vectors(fresh.items(), version=version)
+            found.update({vid: np.asarray(v, dtype=np.float32) for vid, v in fresh.items()})
+            missing = [m for m in missing if m not in fresh]
+        if missing:
+            texts = {d.id: d.text for d in docs}
+            vecs = await self.embedder.embed([texts[m] for m in missing])
+            self.chunks.put_vectors(zip(missing, vecs), version=version)
+            found.update({m: np.asarray(v, dtype=np.float32) for m, v in zip(missing, vecs)})
+        for i, d in enumerate(docs):
+            vec = found.get(d.id) if d.text else None
+            if vec is not None and vec.shape[0] == dim:
+                mat[i] = vec
+        return mat
+
+    @staticmethod
+    def _cosines(query_vec: np.ndarray, mat: np.ndarray) -> np.ndarray:
+        qn = float(np.linalg.norm(query_vec))
+        norms = np.linalg.norm(mat, axis=1) * qn
+        dots = mat @ np.asarray(query_vec, dtype=np.float32)
+        return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Dict
+
+from rag_support.utils import stable_id
+
+
+class SourceManifest:
+    """
+    Per-source record of what is indexed: chunk_id -> content hash of the chunk as it
+    was last embedded and upserted. Re-ingestion diffs against it to skip unchanged
+    chunks and to find stale ids.
+
+    With a `directory`, each source is one small JSON file (written atomically), so
+    workers and restarts share it; otherwise it lives in memory.
+    """
+
+    def __init__(self, directory: str | None = None) -> None:
+        self._dir = directory
+        self._mem: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, source_id: str) -> str:
+        return os.path.join(self._dir or "", f"{source_id}.json")
+
+    def get(self, source_id: str) -> Dict[str, str]:
+        if self._dir is None:
+            with self._lock:
+                return dict(self._mem.get(source_id, {}))
+        try:
+            with open(self._path(source_id), encoding="utf-8") as f:
+                return dict(json.load(f)["chunks"])
+        except FileNotFoundError:
+            return {}
+
+    def put(self, source_id: str, chunks: Dict[str, str]) -> None:
+        if self._dir is None:
+            with self._lock:
+                self._mem[source_id] = dict(chunks)
+            return
+        path = self._path(source_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"chunks": chunks}, f)
+        os.replace(tmp, path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+
+    @staticmethod
+    def chunk_hash(metadata: Dict[str, object]) -> str:
+        # covers text and every stored field, so metadata-only edits are re-upserted too;
+        # not the positional chunk_id, so content that only moved keeps its hash
+        content = {k: v for k, v in metadata.items() if k != "chunk_id"}
+        return stable_id(json.dumps(content, sort_keys=True, default=str))
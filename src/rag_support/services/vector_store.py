@@ -0,0 +1,507 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from rag_support.config import Settings, settings
+from rag_support.logging import logger
+from . import pinecone_store as pinecone_mod
+
+Vector = Tuple[str, Sequence[float], Dict[str, Any]]
+
+
+class VectorStore(Protocol):
+    """
+    The contract retrieval and ingestion rely on; PineconeStore is the reference.
+    """
+
+    def upsert(self, vectors: List[Vector]) -> None: ...
+
+    def query(
+        self, vector: np.ndarray, top_k: int, metadata_filter: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]: ...
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]: ...
+
+    def delete(self, ids: List[str]) -> None: ...
+
+    def warmup(self) -> None: ...
+
+
+def _as_list(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def matches_filter(metadata: Dict[str, Any], flt: Dict[str, Any] | None) -> bool:
+    """
+    Pinecone metadata filter subset: implicit equality, $eq $ne $in $nin $gt $gte $lt
+    $lte $exists, and $and / $or. List-valued fields match if any element does.
+    """
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, c) for c in cond):
+                return False
+            continue
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        present = key in metadata
+        values = _as_list(metadata.get(key))
+        for op, arg in cond.items():
+            if op == "$exists":
+                ok = present == bool(arg)
+            elif not present:
+                ok = op in ("$ne", "$nin")
+            elif op == "$eq":
+                ok = arg in values
+            elif op == "$ne":
+                ok = arg not in values
+            elif op == "$in":
+                ok = any(v in arg for v in values)
+            elif op == "$nin":
+                ok = not any(v in arg for v in values)
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                ok = all(isinstance(v, (int, float)) for v in values) and any(
+                    {"$gt": v > arg, "$gte": v >= arg, "$lt": v < arg, "$lte": v <= arg}[op]
+                    for v in values
+                )
+            else:
+                raise ValueError(f"unsupported metadata filter operator: {op}")
+            if not ok:
+                return False
+    return True
+
+
+class _IVF:
+    """
+    Inverted-file index over the store's rows: k-means centroids plus one row list per
+    centroid. Rows written after the build are tracked by the store and scanned exactly.
+    """
+
+    def __init__(self, matrix: np.ndarray, rows: np.ndarray, n_lists: int, seed: int = 7) -> None:
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(rows, size=min(rows.shape[0], 64 * n_lists), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+        for _ in range(10):  # spherical k-means on the sample
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assign == c]
+                if members.shape[0]:
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+        self.centroids = centroids
+        assign = np.empty(rows.shape[0], dtype=np.int64)
+        for lo in range(0, rows.shape[0], 65536):
+            block = rows[lo : lo + 65536]
+            assign[lo : lo + 65536] = np.argmax(matrix[block] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        self.lists = [rows[order[bounds[c] : bounds[c + 1]]] for c in range(n_lists)]
+
+    def candidates(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        probe = np.argsort(-(self.centroids @ q))[:nprobe]
+        return np.concatenate([self.lists[c] for c in probe])
+
+
+class LocalVectorStore:
+    """
+    In-process vector store with the PineconeStore contract (cosine metric).
+
+    Vectors are unit-normalised float32 rows of one matrix, memory-mapped from
+    `directory/vectors.f32` when a directory is given, with an id -> row map and the
+    metadata replayed from an append-only `records.jsonl`; deleted rows are reused.
+    Search is exact (one matrix product) until `ivf_min_rows` live rows, after which an
+    IVF index probing `nprobe` lists is used; rows changed since its build are scanned
+    exactly. The index is (re)built, and the log compacted, by `maintain`, which writes
+    start on a background thread: queries never pay for a build.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        index: str = "exact",
+        ivf_min_rows: int = 10_000,
+        nprobe: int = 8,
+    ) -> None:
+        self._dir = directory
+        self._use_ivf = index == "ivf"
+        self._ivf_min_rows = ivf_min_rows
+        self._nprobe = nprobe
+        self._lock = threading.RLock()
+        self._dim = 0
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._n_rows = 0
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str | None] = []
+        self._meta: List[Dict[str, Any] | None] = []
+        self._free: List[int] = []
+        self._ivf: _IVF | None = None
+        # rows written or deleted since the IVF build (IVF mode only)
+        self._dirty: set[int] = set()
+        # while maintain runs: rows written since its snapshot, log lines since its snapshot
+        self._since: set[int] | None = None
+        self._tail: List[str] | None = None
+        self._log = None
+        self._log_records = 0
+        self._maintain_lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._open()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def warmup(self) -> None:
+        # build the IVF index before serving rather than behind the first writes
+        self.maintain()
+
+    # -- persistence ---------------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._dir or "", name)
+
+    def _open(self) -> None:
+        header = self._path("header.json")
+        if os.path.exists(header):
+            with open(header, encoding="utf-8") as f:
+                self._dim = int(json.load(f)["dim"])
+            capacity = os.path.getsize(self._path("vectors.f32")) // (4 * self._dim)
+            self._matrix = np.memmap(
+                self._path("vectors.f32"), dtype=np.float32, mode="r+", shape=(capacity, self._dim)
+            )
+        records = self._path("records.jsonl")
+        if os.path.exists(records):
+            with open(records, encoding="utf-8") as f:
+                for line in f:
+                    self._log_records += 1
+                    rec = json.loads(line)
+                    if rec["op"] == "put":
+                        self._set_row(rec["id"], rec["row"], rec["metadata"])
+                    else:
+                        self._drop_row(rec["id"])
+        self._free = [r for r in range(self._n_rows) if self._ids[r] is None]
+        self._log = open(records, "a", encoding="utf-8")
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        if not self._dim:
+            self._dim = dim
+            if self._dir:
+                with open(self._path("header.json"), "w", encoding="utf-8") as f:
+                    json.dump({"dim": dim}, f)
+        elif dim != self._dim:
+            raise ValueError(f"vector dimension {dim} does not match store dimension {self._dim}")
+        capacity = self._matrix.shape[0] if self._matrix.size else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, 2 * capacity, 1024)
+        if self._dir:
+            path = self._path("vectors.f32")
+            if isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+            with open(path, "ab") as f:
+                f.truncate(new_capacity * self._dim * 4)
+            self._matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(new_capacity, self._dim))
+        else:
+            grown = np.zeros((new_capacity, self._dim), dtype=np.float32)
+            if capacity:
+                grown[:capacity] = self._matrix[:capacity]
+            self._matrix = grown
+
+    def _set_row(self, vid: str, row: int, metadata: Dict[str, Any]) -> None:
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._meta.append(None)
+        self._rows[vid] = row
+        self._ids[row] = vid
+        self._meta[row] = metadata
+        self._n_rows = max(self._n_rows, row + 1)
+
+    def _drop_row(self, vid: str) -> None:
+        row = self._rows.pop(vid, None)
+        if row is not None:
+            self._ids[row] = None
+            self._meta[row] = None
+            self._free.append(row)
+            self._mark_dirty(row)
+
+    # -- PineconeStore contract ------------------------------------------------------
+
+    def upsert(self, vectors: List[Vector]) -> None:
+        if not vectors:
+            return
+        mat = np.asarray([v[1] for v in vectors], dtype=np.float32)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        mat /= np.where(norms == 0, 1.0, norms)
+        with self._lock:
+            new = sum(1 for v in vectors if v[0] not in self._rows)
+            self._ensure_capacity(self._n_rows + new, mat.shape[1])
+            lines = []
+            for (vid, _, metadata), vec in zip(vectors, mat):
+                row = self._rows.get(vid)
+                if row is None:
+                    row = self._free.pop() if self._free else self._n_rows
+                self._matrix[row] = vec
+                self._set_row(vid, row, dict(metadata))
+                self._mark_dirty(row)
+                lines.append(json.dumps({"op": "put", "id": vid, "row": row, "metadata": metadata}))
+            self._append(lines)
+            self._schedule()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            lines = []
+            for vid in ids:
+                if vid in self._rows:
+                    self._drop_row(vid)
+                    lines.append(json.dumps({"op": "del", "id": vid}))
+            self._append(lines)
+            self._schedule()
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for vid in ids:
+                row = self._rows.get(vid)
+                if row is not None:
+                    out[vid] = {
+                        "id": vid,
+                        "values": self._matrix[row].tolist(),
+                        "metadata": dict(self._meta[row] or {}),
+                    }
+        return out
+
+    def query(
+        self, vector: np.ndarray, top_k: int, metadata_filter: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        with self._lock:
+            if not self._rows or top_k <= 0:
+                return []
+            rows = self._candidates(q)
+            if metadata_filter:
+                rows = self._filtered(rows, metadata_filter)
+                if rows.shape[0] < top_k and self._ivf is not None:
+                    rows = self._filtered(self._live_rows(), metadata_filter)
+            if not rows.shape[0]:
+                return []
+            scores = self._matrix[rows] @ q
+            k = min(top_k, rows.shape[0])
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                {
+                    "id": self._ids[int(rows[i])],
+                    "score": float(scores[i]),
+                    "metadata": dict(self._meta[int(rows[i])] or {}),
+                }
+                for i in top
+            ]
+
+    # -- search internals ------------------------------------------------------------
+
+    def _live_rows(self) -> np.ndarray:
+        return np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+
+    def _filtered(self, rows: np.ndarray, flt: Dict[str, Any]) -> np.ndarray:
+        keep = [r for r in rows.tolist() if matches_filter(self._meta[r] or {}, flt)]
+        return np.asarray(keep, dtype=np.int64)
+
+    def _candidates(self, q: np.ndarray) -> np.ndarray:
+        if self._ivf is None or len(self._rows) < self._ivf_min_rows:
+            return self._live_rows()
+        rows = np.concatenate(
+            [self._ivf.candidates(q, self._nprobe), np.fromiter(self._dirty, dtype=np.int64)]
+        )
+        rows = np.unique(rows)
+        # rows deleted since the build stay in the lists; skip them
+        return rows[[self._ids[r] is not None for r in rows.tolist()]] if rows.size else rows
+
+    def _mark_dirty(self, row: int) -> None:
+        if self._use_ivf:
+            self._dirty.add(row)
+            if self._since is not None:
+                self._since.add(row)
+
+    def _append(self, lines: List[str]) -> None:
+        if self._log is None or not lines:
+            return
+        self._log.write("\n".join(lines) + "\n")
+        self._log.flush()
+        self._log_records += len(lines)
+        if self._tail is not None:
+            self._tail.extend(lines)
+
+    # -- maintenance -----------------------------------------------------------------
+
+    def _ivf_due(self) -> bool:
+        n = len(self._rows)
+        return (
+            self._use_ivf
+            and n >= self._ivf_min_rows
+            and (self._ivf is None or len(self._dirty) > n // 5)
+        )
+
+    def _compact_due(self) -> bool:
+        # every put and delete is appended; rewrite once most lines are superseded
+        return self._log is not None and self._log_records > 2 * len(self._rows) + 1024
+
+    def _schedule(self) -> None:
+        # call with the lock held
+        if not (self._ivf_due() or self._compact_due()):
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._maintain_loop, name="local-vector-maintain", daemon=True
+            )
+            self._worker.start()
+
+    def _maintain_loop(self) -> None:
+        try:
+            while self.maintain():
+                pass
+        except Exception:
+            logger.exception("local_vector_maintain_failed")
+
+    def maintain(self) -> bool:
+        """
+        Rebuild the IVF index and compact `records.jsonl` if due; returns whether anything
+        was done. Both are built from a snapshot outside the lock and swapped in under it,
+        with the rows and log lines written meanwhile carried over.
+        """
+        with self._maintain_lock:
+            with self._lock:
+                rebuild = self._ivf_due()
+                compact = self._log is not None and (rebuild or self._compact_due())
+                if not (rebuild or compact):
+                    return False
+                n = len(self._rows)
+                live = self._live_rows()
+                matrix = self._matrix
+                snapshot = [(r, self._ids[r], self._meta[r]) for r in live.tolist() if compact]
+                self._since = set() if rebuild else None
+                self._tail = [] if compact else None
+            tmp = self._path("records.jsonl.tmp") if compact else None
+            try:
+                ivf = _IVF(matrix, live, n_lists=int(np.sqrt(n))) if rebuild else None
+                if tmp is not None:
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        for row, vid, metadata in snapshot:
+                            rec = {"op": "put", "id": vid, "row": row, "metadata": metadata}
+                            f.write(json.dumps(rec) + "\n")
+                with self._lock:
+                    if ivf is not None:
+                        self._ivf, self._dirty = ivf, self._since or set()
+                        logger.info("local_ivf_built", extra={"rows": n, "lists": len(ivf.lists)})
+                    if tmp is not None and self._log is not None:
+                        with open(tmp, "a", encoding="utf-8") as f:
+                            f.writelines(line + "\n" for line in self._tail or [])
+                        self._log.close()
+                        os.replace(tmp, self._path("records.jsonl"))
+                        self._log = open(self._path("records.jsonl"), "a", encoding="utf-8")
+                        self._log_records = len(snapshot) + len(self._tail or [])
+                        logger.info(
+                            "local_vector_log_compacted", extra={"records": self._log_records}
+                        )
+            finally:
+                with self._lock:
+                    self._since = self._tail = None
+                if tmp is not None and os.path.exists(tmp):
+                    os.remove(tmp)
+        return True
+
+    def close(self) -> None:
+        worker = self._worker
+        if worker is not None:
+            worker.join()
+        with self._lock:
+            if isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+class CachedVectorStore:
+    """
+    Read-through cache tier: `fetch` serves hot ids from a bounded in-process
+    LocalVectorStore and only asks the primary (Pinecone) for the rest; writes and
+    deletes go to both, and `query` stays on the primary.
+    """
+
+    def __init__(self, primary: VectorStore, max_entries: int = 100_000) -> None:
+        self.primary = primary
+        self.cache = LocalVectorStore()
+        self._max_entries = max_entries
+        self._order: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warmup(self) -> None:
+        self.primary.warmup()
+
+    def _remember(self, vectors: List[Vector]) -> None:
+        with self._lock:
+            self.cache.upsert(vectors)
+            for vid, _, _ in vectors:
+                self._order[vid] = None
+                self._order.move_to_end(vid)
+            evict = []
+            while len(self._order) > self._max_entries:
+                evict.append(self._order.popitem(last=False)[0])
+            self.cache.delete(evict)
+
+    def upsert(self, vectors: List[Vector]) -> None:
+        self.primary.upsert(vectors)
+        self._remember(vectors)
+
+    def delete(self, ids: List[str]) -> None:
+        self.primary.delete(ids)
+        with self._lock:
+            self.cache.delete(ids)
+            for vid in ids:
+                self._order.pop(vid, None)
+
+    def query(
+        self, vector: np.ndarray, top_k: int, metadata_filter: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        return self.primary.query(vector, top_k, metadata_filter)
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = self.cache.fetch(ids)
+        missing = [i for i in ids if i not in found]
+        if missing:
+            fetched = self.primary.fetch(missing)
+            if fetched:
+                self._remember([(v["id"], v["values"], v["metadata"]) for v in fetched.values()])
+            found.update(fetched)
+        return found
+
+
+def build_vector_store(cfg: Settings = settings) -> VectorStore:
+    """
+    VECTOR_BACKEND: "pinecone" (default), "local" (LocalVectorStore only) or
+    "pinecone_cached" (Pinecone behind a local read-through cache).
+    """
+    if cfg.vector_backend == "local":
+        return LocalVectorStore(
+            cfg.local_vector_dir or None,
+            index=cfg.local_vector_index,
+            ivf_min_rows=cfg.local_vector_ivf_min_rows,
+            nprobe=cfg.local_vector_nprobe,
+        )
+    # resolved through the module so tests can swap the client class
+    store = pinecone_mod.PineconeStore()
+    if cfg.vector_backend == "pinecone_cached":
+        return CachedVectorStore(store, max_entries=cfg.local_vector_cache_size)
+    return store
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, Iterator, List
 
 import numpy as np
-from google.cloud import aiplatform
-from google.cloud.aiplatform import initializer
+from rag_support import metrics
 from rag_support.config import settings
 
 
@@ -19,6 +21,7 @@ class VertexTextResult:
 class VertexClient:
     """
     Simple wrapper around Vertex AI gen and embed APIs.
+    Model handles are loaded once and reused; create one client per process.
     """
 
     def __init__(
@@ -26,23 +29,47 @@ class VertexClient:
         project: str | None = None,
         location: str | None = None,
     ) -> None:
-        initializer.global_config.project = project or settings.google_project_id
-        initializer.global_config.location = location or settings.google_location
+        # the SDK takes seconds to import; keep it off the module import path
+        from google.cloud import aiplatform
+
         aiplatform.init(
-            project=initializer.global_config.project,
-            location=initializer.global_config.location,
+            project=project or settings.google_project_id,
+            location=location or settings.google_location,
         )
 
         self._model_id = settings.vertex_model_id
         self._embed_model_id = settings.vertex_embed_model_id
+        self._embed_model: Any = None
+        self._gen_model: Any = None
+
+    def _embedding_model(self) -> Any:
+        if self._embed_model is None:
+            from vertexai.language_models import TextEmbeddingModel
+
+            self._embed_model = TextEmbeddingModel.from_pretrained(self._embed_model_id)
+        return self._embed_model
+
+    def _generative_model(self) -> Any:
+        if self._gen_model is None:
+            from vertexai.generative_models import GenerativeModel
+
+            self._gen_model = GenerativeModel(self._model_id)
+        return self._gen_model
+
+    def warmup(self) -> None:
+        """
+        Load model handles up front so the first request does not pay for it.
+        """
+        self._embedding_model()
+        self._generative_model()
 
     def embed(self, texts: List[str]) -> np.ndarray:
-        from vertexai.language_models import TextEmbeddingModel
+        res = self._embedding_model().get_embeddings(texts)
+        return self._to_matrix(res)
 
-        model = TextEmbeddingModel.from_pretrained(self._embed_model_id)
-        res = model.get_embeddings(texts)
-        vecs = [np.array(r.values, dtype=float) for r in res]
-        return np.vstack(vecs)
+    async def embed_async(self, texts: List[str]) -> np.ndarray:
+        res = await self._embedding_model().get_embeddings_async(texts)
+        return self._to_matrix(res)
 
     def generate(
         self,
@@ -50,29 +77,48 @@ class VertexClient:
         temperature: float,
         max_tokens: int,
     ) -> VertexTextResult:
-        from vertexai.generative_models import GenerativeModel
-
-        model = GenerativeModel(self._model_id)
         # A simple text-only prompt
-        resp = model.generate_content(
-            [prompt],
-            generation_config={
-                "temperature": temperature,
-                "max_output_tokens": max_tokens,
-            },
+        resp = self._generative_model().generate_content(
+            [prompt], generation_config=self._gen_config(temperature, max_tokens)
         )
-        text = resp.text or ""
-        # usage extraction may vary by SDK version; safeguard with defaults
-        usage = {
-            "prompt_tokens": getattr(resp, "prompt_token_count", 0) or 0,
-            "candidates_tokens": getattr(
-                resp,
-                "candidates_token_count",
-                0,
-            )
-            or 0,
-        }
-        return VertexTextResult(text=text, usage=usage)
+        return self._to_text_result(resp)
+
+    async def generate_async(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> VertexTextResult:
+        resp = await self._generative_model().generate_content_async(
+            [prompt], generation_config=self._gen_config(temperature, max_tokens)
+        )
+        return self._to_text_result(resp)
+
+    def generate_stream(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> Iterator[VertexTextResult]:
+        """
+        Yields text deltas; usage is filled on the chunks that report it (the last one).
+        """
+        for resp in self._generative_model().generate_content(
+            [prompt], generation_config=self._gen_config(temperature, max_tokens), stream=True
+        ):
+            yield self._to_stream_chunk(resp)
+
+    async def generate_stream_async(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> AsyncIterator[VertexTextResult]:
+        stream = await self._generative_model().generate_content_async(
+            [prompt], generation_config=self._gen_config(temperature, max_tokens), stream=True
+        )
+        async for resp in stream:
+            yield self._to_stream_chunk(resp)
 
     def judge(
         self,
@@ -83,23 +129,60 @@ class VertexClient:
         """
         LLM-as-judge: returns structured JSON per schema.
         """
-        from vertexai.generative_models import GenerativeModel
-
-        model = GenerativeModel(self._model_id)
-
-        prompt = (
-            system_prompt
-            + "\n\nJSON:\n"
-            + json.dumps(message_json, ensure_ascii=False)
+        resp = self._generative_model().generate_content(
+            [self._judge_prompt(system_prompt, message_json)],
+            generation_config=self._gen_config(temperature, 512),
         )
+        return self._parse_judge(resp)
 
-        resp = model.generate_content(
-            [prompt],
-            generation_config={
-                "temperature": temperature,
-                "max_output_tokens": 512,
-            },
+    async def judge_async(
+        self,
+        system_prompt: str,
+        message_json: Dict[str, Any],
+        temperature: float = 0.0,
+    ) -> Dict[str, Any]:
+        resp = await self._generative_model().generate_content_async(
+            [self._judge_prompt(system_prompt, message_json)],
+            generation_config=self._gen_config(temperature, 512),
         )
+        return self._parse_judge(resp)
+
+    @staticmethod
+    def _to_matrix(res: Any) -> np.ndarray:
+        return np.vstack([np.array(r.values, dtype=float) for r in res])
+
+    @staticmethod
+    def _gen_config(temperature: float, max_tokens: int) -> Dict[str, Any]:
+        return {"temperature": temperature, "max_output_tokens": max_tokens}
+
+    @staticmethod
+    def _usage(resp: Any) -> Dict[str, int]:
+        # usage extraction may vary by SDK version; safeguard with defaults
+        meta = getattr(resp, "usage_metadata", None) or resp
+        return {
+            "prompt_tokens": getattr(meta, "prompt_token_count", 0) or 0,
+            "candidates_tokens": getattr(meta, "candidates_token_count", 0) or 0,
+        }
+
+    @classmethod
+    def _to_text_result(cls, resp: Any) -> VertexTextResult:
+        return VertexTextResult(text=resp.text or "", usage=cls._usage(resp))
+
+    @classmethod
+    def _to_stream_chunk(cls, resp: Any) -> VertexTextResult:
+        try:
+            text = resp.text or ""
+        except ValueError:
+            text = ""  # chunks without candidates (e.g. the trailing usage-only chunk)
+        usage = cls._usage(resp)
+        return VertexTextResult(text=text, usage=usage if any(usage.values()) else {})
+
+    @staticmethod
+    def _judge_prompt(system_prompt: str, message_json: Dict[str, Any]) -> str:
+        return system_prompt + "\n\nJSON:\n" + json.dumps(message_json, ensure_ascii=False)
+
+    @staticmethod
+    def _parse_judge(resp: Any) -> Dict[str, Any]:
         text = (resp.text or "").strip()
 
         # ensure valid JSON
@@ -113,3 +196,105 @@ class VertexClient:
             }
 
         return obj
+
+
+class AsyncVertexClient:
+    """
+    Awaitable facade over VertexClient for the async request path.
+
+    Uses the SDK's native async methods when the wrapped client has them and a dedicated,
+    bounded thread pool otherwise. Each operation has its own concurrency limit and
+    timeout, so one slow Gemini call never stalls the event loop.
+    """
+
+    def __init__(self, client: Any = None, cfg=settings) -> None:
+        self.client = client if client is not None else VertexClient()
+        self._pool = ThreadPoolExecutor(
+            max_workers=cfg.vertex_max_threads, thread_name_prefix="vertex"
+        )
+        self._limits = {
+            "embed": asyncio.Semaphore(cfg.vertex_embed_concurrency),
+            "generate": asyncio.Semaphore(cfg.vertex_generate_concurrency),
+            "judge": asyncio.Semaphore(cfg.vertex_judge_concurrency),
+        }
+        self._timeouts = {
+            "embed": cfg.vertex_embed_timeout_s,
+            "generate": cfg.vertex_generate_timeout_s,
+            "judge": cfg.vertex_judge_timeout_s,
+        }
+
+    async def _call(self, op: str, *args: Any, **kwargs: Any) -> Any:
+        metrics.count_call("vertex", op)
+        native = getattr(self.client, f"{op}_async", None)
+        async with self._limits[op]:
+            if native is not None:
+                aw = native(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                fn = functools.partial(getattr(self.client, op), *args, **kwargs)
+                aw = loop.run_in_executor(self._pool, fn)
+            return await asyncio.wait_for(aw, timeout=self._timeouts[op])
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return await self._call("embed", texts)
+
+    async def generate(self, prompt: str, temperature: float, max_tokens: int) -> VertexTextResult:
+        result = await self._call("generate", prompt, temperature=temperature, max_tokens=max_tokens)
+        metrics.record_tokens(result.usage or {})
+        return result
+
+    async def judge(
+        self, system_prompt: str, message_json: Dict[str, Any], temperature: float = 0.0
+    ) -> Dict[str, Any]:
+        return await self._call("judge", system_prompt, message_json, temperature=temperature)
+
+    async def generate_stream(
+        self, prompt: str, temperature: float, max_tokens: int
+    ) -> AsyncIterator[VertexTextResult]:
+        """
+        Streams text deltas. Falls back to the blocking streaming iterator drained in the
+        thread pool, and to a single chunk when the client cannot stream at all.
+        The generate concurrency limit is held for the whole stream; the timeout bounds
+        the wait for each chunk.
+        """
+        metrics.count_call("vertex", "generate_stream")
+        async for chunk in self._stream(prompt, temperature, max_tokens):
+            metrics.record_tokens(chunk.usage or {})
+            yield chunk
+
+    async def _stream(
+        self, prompt: str, temperature: float, max_tokens: int
+    ) -> AsyncIterator[VertexTextResult]:
+        kwargs = {"temperature": temperature, "max_tokens": max_tokens}
+        timeout = self._timeouts["generate"]
+        async with self._limits["generate"]:
+            native = getattr(self.client, "generate_stream_async", None)
+            blocking = getattr(self.client, "generate_stream", None)
+            if native is not None:
+                it = native(prompt, **kwargs).__aiter__()
+                while True:
+                    try:
+                        yield await asyncio.wait_for(it.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        return
+            elif blocking is not None:
+                loop = asyncio.get_running_loop()
+                sync_it = iter(blocking(prompt, **kwargs))
+                done = object()
+                while True:
+                    item = await asyncio.wait_for(
+                        loop.run_in_executor(self._pool, next, sync_it, done), timeout=timeout
+                    )
+                    if item is done:
+                        return
+                    yield item
+            else:
+                loop = asyncio.get_running_loop()
+                fn = functools.partial(self.client.generate, prompt, **kwargs)
+                yield await asyncio.wait_for(loop.run_in_executor(self._pool, fn), timeout=timeout)
+
+    def warmup(self) -> None:
+        self.client.warmup()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -27,8 +27,12 @@ def no_vertex_calls(monkeypatch):
             return {"verdict": "pass", "scores": {"groundedness": 5, "relevance": 5, "completeness": 4, "clarity": 5},
                     "flags": {"leakage_risk": False, "toxicity": False, "policy_violation": False}, "reasons": [], "suggested_fixes": []}
 
+    from rag_support import rag_graph as graph_mod
+    from rag_support.services import ingestion as ing_mod
+    from rag_support.services import retrieval as ret_mod
     from rag_support.services import vertex as vertex_mod
-    monkeypatch.setattr(vertex_mod, "VertexClient", MockVertex)
+    for mod in (vertex_mod, ret_mod, ing_mod, graph_mod):
+        monkeypatch.setattr(mod, "VertexClient", MockVertex)
 
     # Mock Pinecone store
     class MockPinecone:
@@ -46,13 +50,31 @@ def no_vertex_calls(monkeypatch):
                 out.append({"id": vid, "score": score, "metadata": meta})
             out.sort(key=lambda x: x["score"], reverse=True)
             return out[:top_k]
+        def delete(self, ids):
+            for vid in ids:
+                self.vectors.pop(vid, None)
+        def fetch(self, ids):
+            self.fetch_calls = getattr(self, "fetch_calls", 0) + 1
+            return {
+                vid: {"id": vid, "values": self.vectors[vid][0], "metadata": self.vectors[vid][1]}
+                for vid in ids
+                if vid in self.vectors
+            }
 
     from rag_support.services import pinecone_store as pc_mod
     monkeypatch.setattr(pc_mod, "PineconeStore", MockPinecone)
 
-    from rag_support.services import ingestion as ing_mod
-    ing_mod._GLOBAL_BM25_INDEX._tokenized.clear()
-    ing_mod._GLOBAL_BM25_INDEX._doc_ids.clear()
-    ing_mod._GLOBAL_BM25_INDEX._bm25 = None
+    ing_mod._GLOBAL_BM25_INDEX.clear()
+    ing_mod._GLOBAL_CHUNK_STORE.clear()
+    ing_mod._GLOBAL_SOURCE_MANIFEST.clear()
+
+    from rag_support.services import embedding_cache as ec_mod
+    ec_mod._GLOBAL_EMBED_CACHE.clear()
+
+    from rag_support.services import answer_cache as ac_mod
+    ac_mod._GLOBAL_ANSWER_CACHE.clear()
+
+    from rag_support.services import container as container_mod
+    monkeypatch.setattr(container_mod, "_CONTAINER", None)
 
     yield
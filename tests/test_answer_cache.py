@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from rag_support.services.answer_cache import AnswerCache, IndexVersion
+
+def test_similar_queries_hit_within_partition():
+    version = IndexVersion()
+    cache = AnswerCache(version, threshold=0.95)
+    rng = np.random.default_rng(0)
+    q = rng.standard_normal(64)
+    part = AnswerCache.partition({"lang": "en"}, 0.7, 8)
+    cache.put(part, q, "cached", version.value)
+
+    near = q + rng.standard_normal(64) * 0.05
+    value, sim = cache.get(part, near)
+    assert value == "cached" and sim >= 0.95
+    assert cache.get(part, rng.standard_normal(64)) is None
+    assert cache.get(AnswerCache.partition({}, 0.7, 8), q) is None
+
+    version.bump()  # ingest happened
+    assert cache.get(part, q) is None
+    cache.put(part, q, "stale", version.value - 1)  # computed before the ingest
+    assert cache.get(part, q) is None
+
+def test_every_near_duplicate_above_the_threshold_hits():
+    version = IndexVersion()
+    cache = AnswerCache(version, threshold=0.95, max_entries=1000)
+    rng = np.random.default_rng(1)
+    part = AnswerCache.partition({}, 0.7, 8)
+    cached = rng.standard_normal((500, 768))
+    for i, q in enumerate(cached):
+        cache.put(part, q, i, version.value)
+    for i, q in enumerate(cached):
+        q = q / np.linalg.norm(q)
+        noise = rng.standard_normal(768)
+        noise -= (noise @ q) * q
+        near = 0.96 * q + np.sqrt(1 - 0.96**2) * noise / np.linalg.norm(noise)  # cosine 0.96
+        assert cache.get(part, near)[0] == i
+
+def test_lru_and_ttl():
+    version = IndexVersion()
+    cache = AnswerCache(version, max_entries=2)
+    part = AnswerCache.partition({}, 0.7, 8)
+    vecs = np.eye(3)
+    for i, v in enumerate(vecs):
+        cache.put(part, v, i, version.value)
+    assert len(cache) == 2 and cache.get(part, vecs[0]) is None
+
+    expiring = AnswerCache(version, ttl_s=-1)
+    expiring.put(part, vecs[0], "x", version.value)
+    assert expiring.get(part, vecs[0]) is None
+
+@pytest.mark.asyncio
+async def test_run_query_served_from_cache():
+    from rag_support.rag_graph import RagGraph
+
+    graph = RagGraph()
+    first = await graph.run_query("reset password", top_k=4, alpha=0.7, metadata_filters={})
+    def no_llm(*args, **kwargs):
+        raise AssertionError("cache hit must not call Gemini")
+    graph.vertex.client.generate = graph.vertex.client.judge = no_llm
+    answer, citations, debug, usage = await graph.run_query(
+        "reset password", top_k=4, alpha=0.7, metadata_filters={}
+    )
+    assert answer == first[0] and citations == first[1]
+    assert debug.judge_report == first[2].judge_report
+    assert debug.scores["answer_cache_similarity"] == pytest.approx(1.0)
+
+def test_shared_version_invalidates_other_processes(tmp_path):
+    path = str(tmp_path / "index_version")
+    api = AnswerCache(IndexVersion(path))
+    part = AnswerCache.partition({}, 0.7, 8)
+    q = np.ones(8)
+    api.put(part, q, "cached", api.version.value)
+    assert api.get(part, q) is not None
+
+    assert IndexVersion(path).bump() == 1  # e.g. the standalone ingest worker
+    assert api.version.value == 1
+    assert api.get(part, q) is None
+
+def test_cache_refused_without_shared_version_for_out_of_process_ingest():
+    from rag_support.config import Settings
+    from rag_support.rag_graph import RagGraph
+
+    cfg = Settings(ingest_jobs_in_process=False)
+    assert RagGraph(cfg).answer_cache is None
@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+
+import pytest
+from httpx import AsyncClient
+from rag_support.main import app
+
+@pytest.mark.asyncio
+async def test_batch_query_ndjson_in_order():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        payload = {"items": [{"source": "doc1.md", "text": "LangGraph builds stateful graphs.", "title": "Doc1"}]}
+        assert (await ac.post("/v1/rag/ingest?wait=true", json=payload)).status_code == 200
+
+        queries = [{"query": f"What does LangGraph build {i}?", "top_k": 2} for i in range(5)]
+        r = await ac.post("/v1/rag/query:batch", json={"queries": queries})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in r.text.splitlines()]
+        assert [row["index"] for row in rows] == list(range(5))
+        assert all(row["answer"] and row["debug"]["judge_report"]["verdict"] == "pass" for row in rows)
+
+@pytest.mark.asyncio
+async def test_batch_shares_embedding_and_isolates_failures():
+    from rag_support.rag_graph import RagGraph
+    from rag_support.services.retrieval import SearchRequest
+
+    graph = RagGraph()
+    graph.answer_cache = None
+    embed_calls = []
+    embed = graph.vertex.client.embed
+    graph.vertex.client.embed = lambda texts: embed_calls.append(len(texts)) or embed(texts)
+    generate = graph.vertex.client.generate
+
+    def flaky_generate(prompt, temperature, max_tokens):
+        if "boom" in prompt:
+            raise RuntimeError("quota")
+        return generate(prompt, temperature, max_tokens)
+
+    graph.vertex.client.generate = flaky_generate
+    graph.retrieval.store.upsert([("c1", [1.0] * 8, {"chunk_id": "c1", "source_id": "s1", "text": "alpha"})])
+    graph.retrieval.bm25.add_docs(["c1"], ["alpha"])
+    graph.cfg = graph.cfg.model_copy(update={"similarity_threshold": 0.0})
+
+    reqs = [SearchRequest(q, 0.5, 2, {}) for q in ["alpha one", "boom", "alpha two"]]
+    results = [r async for r in graph.run_batch(reqs)]
+    assert embed_calls == [3]
+    assert [i for i, _ in results] == [0, 1, 2]
+    assert isinstance(results[1][1], Exception)
+    assert results[0][1][0] and results[2][1][0]
+
+
+@pytest.mark.asyncio
+async def test_batch_semantic_fanout_is_bounded_and_timed_per_query():
+    import threading
+    import time
+
+    from rag_support.services.retrieval import RetrievalService, SearchRequest
+
+    svc = RetrievalService()
+    svc.cfg = svc.cfg.model_copy(
+        update={"query_batch_search_concurrency": 2, "semantic_timeout_s": 0.2}
+    )
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def slow_query(vector, top_k, metadata_filter=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return [{"id": "c1", "score": 0.9, "metadata": {"chunk_id": "c1", "text": "alpha"}}]
+
+    svc.store.query = slow_query
+    reqs = [SearchRequest(f"q{i}", 0.5, 2, {}) for i in range(12)]
+    # 12 queries x 50ms through 2 slots take ~300ms: longer than the per-query timeout
+    results = await svc.hybrid_search_many(reqs, np.ones((12, 8)))
+    assert peak[0] == 2
+    assert all(docs and docs[0].id == "c1" for docs in results)
+
+
+@pytest.mark.asyncio
+async def test_batch_setup_failure_is_reported_per_query():
+    from rag_support.rag_graph import RagGraph
+    from rag_support.services.retrieval import SearchRequest
+
+    graph = RagGraph()
+    graph.answer_cache = None
+
+    async def failing_embed(texts):
+        raise RuntimeError("embed quota")
+
+    graph.retrieval.embed_queries = failing_embed
+    reqs = [SearchRequest(q, 0.5, 2, {}) for q in ["alpha", "beta"]]
+    results = [r async for r in graph.run_batch(reqs)]
+    assert [i for i, _ in results] == [0, 1]
+    assert all(isinstance(r, RuntimeError) and "embed quota" in str(r) for _, r in results)
@@ -0,0 +1,41 @@
+from rag_support.services.bm25_index import BM25Index
+
+def test_bm25_incremental_matches_bulk():
+    docs = {
+        "a": "reset your password from the account page",
+        "b": "billing questions and refund policy",
+        "c": "password policy requires twelve characters",
+        "d": "contact support for billing",
+    }
+    bulk = BM25Index()
+    bulk.add_docs(list(docs), list(docs.values()))
+    inc = BM25Index()
+    for doc_id, text in docs.items():
+        inc.add_docs([doc_id], [text])
+
+    res = inc.search("password policy", top_k=3)
+    assert res == bulk.search("password policy", top_k=3)
+    assert res[0][0] == "c"
+    assert {d for d, _ in res} == {"a", "b", "c"}
+    assert inc.search("unknownterm", top_k=3) == []
+    assert len(inc.search("billing", top_k=1)) == 1
+
+def test_bm25_readd_replaces_and_delete_hides():
+    idx = BM25Index()
+    idx.add_docs(["a", "b"], ["password reset", "billing refund"])
+    idx.add_docs(["a"], ["password reset via email"])
+    assert len(idx) == 2
+    assert [d for d, _ in idx.search("password", top_k=5)] == ["a"]
+    assert idx.delete(["a", "missing"]) == 1
+    assert idx.search("password", top_k=5) == [] and len(idx) == 1
+
+def test_bm25_search_many_matches_single_queries():
+    idx = BM25Index()
+    idx.add_docs(
+        ["a", "b", "c", "d"],
+        ["reset password", "billing refund policy", "password policy", "support billing"],
+    )
+    idx.delete(["d"])
+    queries = ["password policy", "billing", "nothing here", "refund password"]
+    assert idx.search_many(queries, top_k=2) == [idx.search(q, top_k=2) for q in queries]
+    assert idx.search_many(queries, top_k=2)[2] == []
@@ -0,0 +1,54 @@
+from rag_support.services.bm25_index import BM25Index
+
+DOCS = {
+    "a": "reset your password from the account page",
+    "b": "billing questions and refund policy",
+    "c": "password policy requires twelve characters",
+    "d": "contact support for billing",
+}
+
+def test_segments_persist_and_match_memory(tmp_path):
+    mem = BM25Index()
+    mem.add_docs(list(DOCS), list(DOCS.values()))
+
+    disk = BM25Index(directory=str(tmp_path))
+    for doc_id, text in DOCS.items():
+        disk.add_docs([doc_id], [text])
+        disk.flush()
+
+    reopened = BM25Index(directory=str(tmp_path))  # new worker / restart
+    assert len(reopened) == 4
+    expected = mem.search("password policy billing", top_k=4)
+    assert reopened.search("password policy billing", top_k=4) == expected
+
+    assert reopened.merge(max_segments=2)
+    merged = BM25Index(directory=str(tmp_path))
+    assert len(merged._segments) == 1
+    assert merged.search("password policy billing", top_k=4) == expected
+    assert len(list(tmp_path.glob("*.bm25"))) == 1
+
+def test_other_workers_pick_up_new_segments(tmp_path):
+    writer = BM25Index(directory=str(tmp_path))
+    reader = BM25Index(directory=str(tmp_path), refresh_s=0)
+    writer.add_docs(["a"], [DOCS["a"]])
+    writer.flush()
+    assert reader.search("password", top_k=1)[0][0] == "a"
+
+def test_deletes_and_replacements_persist_through_merge(tmp_path):
+    idx = BM25Index(directory=str(tmp_path))
+    idx.add_docs(list(DOCS), list(DOCS.values()))
+    idx.flush()
+    idx.add_docs(["a"], ["reset your password from the login page"])  # replace
+    assert idx.delete(["b"]) == 1
+    assert len(idx) == 3
+    idx.flush()
+
+    reopened = BM25Index(directory=str(tmp_path))
+    assert len(reopened) == 3
+    hits = dict(reopened.search("password billing login", top_k=4))
+    assert "b" not in hits and "a" in hits and "d" in hits
+
+    assert reopened.merge(max_segments=1)
+    merged = BM25Index(directory=str(tmp_path))
+    assert len(merged._segments) == 1 and merged._segments[0].n_docs == 3
+    assert merged.search("login", top_k=4)[0][0] == "a"
@@ -0,0 +1,36 @@
+from rag_support.services.chunker import Chunker, approx_tokens
+
+DOC = """# Install
+
+Run the installer. Accept the license. Reboot when asked.
+
+## Configure
+
+Edit config.yaml:
+- set region
+- set project
+
+# Deploy
+
+""" + " ".join(f"Sentence number {i} explains step {i}." for i in range(60))
+
+
+def test_chunks_respect_budget_and_boundaries():
+    chunks = list(Chunker(max_tokens=60, overlap_tokens=15).split(DOC))
+    assert all(approx_tokens(c) <= 60 for c in chunks)
+    # short sections close at the next heading instead of running into it
+    assert chunks[0].startswith("# Install") and chunks[0].endswith("Reboot when asked.")
+    assert chunks[1].startswith("## Configure") and chunks[1].endswith("- set project")
+    assert chunks[2].startswith("# Deploy")
+    # every cut is at a sentence end, and the next chunk repeats the last sentence
+    for prev, nxt in zip(chunks[2:], chunks[3:]):
+        assert prev.endswith(".")
+        last = prev[prev.rindex("Sentence") :]
+        assert nxt.startswith(last)
+
+
+def test_oversized_runs_are_split_and_empty_text_yields_nothing():
+    chunks = list(Chunker(max_tokens=10, overlap_tokens=2).split("hello " + "x" * 200 + " world"))
+    assert all(approx_tokens(c) <= 10 for c in chunks)
+    assert "".join(chunks).replace("hello", "").replace("world", "") == "x" * 200
+    assert list(Chunker().split("  \n\n ")) == []
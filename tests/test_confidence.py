@@ -1,14 +1,40 @@
 import numpy as np
 from rag_support.services.retrieval import RetrievalService, RetrievedDoc
 
-def test_confidence_scoring():
+async def test_confidence_scoring():
     svc = RetrievalService()
     qv = np.ones(8)
     docs = [
         RetrievedDoc(id="1", text="alpha", title="", url="", source_id="s1", chunk_id="c1", semantic_score=0.9, keyword_score=0.1),
         RetrievedDoc(id="2", text="", title="", url="", source_id="s2", chunk_id="c2", semantic_score=0.2, keyword_score=0.8),
     ]
-    vals = svc.validator(qv, docs)
+    vals = await svc.validator(qv, docs)
     assert len(vals) == 2
     confs = [v["confidence"] for v in vals]
     assert 0 <= min(confs) <= max(confs) <= 1.0
+
+async def test_validator_reuses_cached_vectors():
+    svc = RetrievalService()
+    svc.chunks.put_vectors([("1", np.ones(8)), ("2", -np.ones(8))])
+    svc.vertex.client.embed = lambda texts: (_ for _ in ()).throw(AssertionError("re-embedded"))
+    docs = [
+        RetrievedDoc(id="1", text="alpha", title="", url="", source_id="s1", chunk_id="1", semantic_score=0.9, keyword_score=0.1),
+        RetrievedDoc(id="2", text="beta", title="", url="", source_id="s2", chunk_id="2", semantic_score=0.2, keyword_score=0.8),
+    ]
+    vals = await svc.validator(np.ones(8), docs)
+    assert vals[0]["breakdown"]["cosine"] == 1.0
+    assert vals[1]["breakdown"]["cosine"] == 0.0
+
+async def test_validator_embeds_unknown_chunks_through_the_async_client():
+    from rag_support import metrics
+
+    svc = RetrievalService()
+    svc.store.fetch = lambda ids: {}
+    before = metrics.EXTERNAL_CALLS.value(service="vertex", op="embed")
+    docs = [
+        RetrievedDoc(id="n1", text="fresh chunk", title="", url="", source_id="s1", chunk_id="n1", semantic_score=0.5, keyword_score=0.5),
+    ]
+    await svc.validator(np.ones(8), docs)
+    assert metrics.EXTERNAL_CALLS.value(service="vertex", op="embed") == before + 1
+    assert svc.embedder.cache.stats()["misses"] == 1
+    assert "n1" in svc.chunks.get_vectors(["n1"])[0]
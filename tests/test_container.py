@@ -0,0 +1,8 @@
+from rag_support.services.container import get_container
+
+def test_container_shares_clients():
+    c = get_container()
+    assert get_container() is c
+    assert c.graph.retrieval is c.retrieval
+    assert c.retrieval.vertex is c.vertex is c.ingestion.vertex
+    assert c.retrieval.store is c.store is c.ingestion.pinecone
@@ -0,0 +1,43 @@
+from rag_support.services.chunker import Chunker
+from rag_support.services.context_packer import ContextPacker, overlap_chars
+
+
+def _chunk(source, i, text, confidence):
+    return {"source_id": source, "chunk_id": f"{source}-{i:04d}", "text": text, "confidence": confidence}
+
+
+def test_overlap_respects_word_boundaries():
+    assert overlap_chars("One. Two three.", "Two three. Four.") == len("Two three.")
+    assert overlap_chars("ends with a", "apple pie") == 0  # shared letter, not a shared word
+    assert overlap_chars("no shared", "text here") == 0
+
+
+def test_adjacent_chunks_merge_without_repeating_overlap():
+    text = " ".join(f"Sentence number {i} talks about topic {i % 5}." for i in range(60))
+    parts = list(Chunker(max_tokens=120, overlap_tokens=30).split(text))
+    assert len(parts) >= 3
+    validated = [_chunk("src", i, t, 0.9 - i * 0.01) for i, t in enumerate(parts[:3])]
+    validated.append(_chunk("other", 0, "Unrelated note.", 0.5))
+
+    packed = ContextPacker(max_tokens=10_000).pack(validated)
+    assert [e["source_id"] for e in packed.entries] == ["src", "other"]
+    merged = packed.entries[0]
+    assert merged["chunk_ids"] == [v["chunk_id"] for v in validated[:3]]
+    # the merged text reads as the original span, with each sentence once
+    assert merged["text"] in text
+    assert merged["text"].count("Sentence number 5 ") == 1
+    assert packed.tokens_saved > 0 and packed.dropped == 0
+
+
+def test_budget_keeps_highest_confidence():
+    validated = [
+        _chunk("a", 0, "alpha " * 50, 0.4),
+        _chunk("b", 0, "beta " * 50, 0.9),
+        _chunk("c", 0, "gamma " * 50, 0.7),
+    ]
+    packed = ContextPacker(max_tokens=220).pack(validated)
+    assert [e["source_id"] for e in packed.entries] == ["b", "c"]
+    assert packed.dropped == 1 and packed.tokens <= 220
+
+    # the best chunk survives even when it alone exceeds the budget
+    assert [e["source_id"] for e in ContextPacker(max_tokens=10).pack(validated).entries] == ["b"]
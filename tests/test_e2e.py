@@ -14,7 +14,7 @@ async def test_e2e():
                 {"source": "doc2.md", "text": "Vertex AI provides generative models and embeddings.", "title": "Doc2"},
             ]
         }
-        r = await ac.post("/v1/rag/ingest", json=payload)
+        r = await ac.post("/v1/rag/ingest?wait=true", json=payload)
         assert r.status_code == 200
 
         q = {"query":"How do I build a graph with LangGraph and serve via FastAPI?", "top_k": 4, "alpha": 0.7}
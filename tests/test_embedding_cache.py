@@ -0,0 +1,90 @@
+import threading
+import time
+
+import numpy as np
+from rag_support.services.embedding_cache import EmbeddingCache
+
+def test_cache_hits_and_ttl():
+    calls = []
+    def compute(texts):
+        calls.append(list(texts))
+        return [np.ones(4) * len(t) for t in texts]
+
+    cache = EmbeddingCache(max_entries=2, ttl_s=60)
+    v = cache.get_or_compute("m", ["ab", "abc", "ab"], compute)
+    assert v.shape == (3, 4) and v[0][0] == 2 and v[2][0] == 2
+    assert calls == [["ab", "abc"]]
+    cache.get_or_compute("m", ["ab"], compute)
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    cache.get_or_compute("other-model", ["ab"], compute)  # model id is part of the key
+    assert len(calls) == 2 and len(cache) == 2
+
+    expired = EmbeddingCache(ttl_s=-1)
+    expired.get_or_compute("m", ["x"], compute)
+    expired.get_or_compute("m", ["x"], compute)
+    assert expired.stats()["misses"] == 2
+
+def test_inflight_requests_are_coalesced():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    def slow(texts):
+        calls.append(texts)
+        started.set()
+        release.wait(5)
+        return [np.ones(4) for _ in texts]
+
+    cache = EmbeddingCache()
+    out = []
+    t = threading.Thread(target=lambda: out.append(cache.get_or_compute("m", ["q"], slow)))
+    t.start()
+    started.wait(5)
+    t2 = threading.Thread(target=lambda: out.append(cache.get_or_compute("m", ["q"], slow)))
+    t2.start()
+    while cache.coalesced == 0 and t2.is_alive():
+        time.sleep(0.001)
+    release.set()
+    t.join(); t2.join()
+    assert len(calls) == 1 and len(out) == 2
+    assert cache.stats()["coalesced"] == 1
+
+async def test_cancelled_owner_does_not_fail_waiters():
+    import asyncio
+
+    release = asyncio.Event()
+    async def slow(texts):
+        await release.wait()
+        return [np.ones(4) for _ in texts]
+
+    cache = EmbeddingCache()
+    owner = asyncio.create_task(asyncio.wait_for(cache.aget_or_compute("m", ["q"], slow), 0.01))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.aget_or_compute("m", ["q"], slow))
+    try:
+        await owner
+    except asyncio.TimeoutError:
+        pass
+    release.set()
+    assert (await waiter).shape == (1, 4)
+    assert cache.stats()["coalesced"] == 1 and len(cache) == 1
+
+async def test_short_embed_result_fails_every_waiter():
+    import asyncio
+
+    import pytest
+
+    async def short(texts):
+        await asyncio.sleep(0)
+        return [np.ones(4)]
+
+    cache = EmbeddingCache()
+    results = await asyncio.gather(
+        cache.aget_or_compute("m", ["a", "b"], short),
+        cache.aget_or_compute("m", ["b"], short),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+    with pytest.raises(ValueError):
+        cache.get_or_compute("m", ["x", "y"], lambda texts: [np.ones(4)])
+    assert not cache._inflight
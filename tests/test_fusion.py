@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from rag_support.config import Settings
+from rag_support.services import fusion
+
+
+def _rrf_reference(a, b, k=60):
+    ranks = {}
+    for lst in (a, b):
+        for rank, doc_id in enumerate(lst):
+            ranks[doc_id] = ranks.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(ranks.items(), key=lambda x: x[1], reverse=True)
+
+
+def test_rrf_merge_matches_reference():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        a = [f"d{i}" for i in rng.permutation(40)[:12]]
+        b = [f"d{i}" for i in rng.permutation(40)[:12]]
+        got = fusion.rrf_merge(a, b)
+        want = _rrf_reference(a, b)
+        assert [d for d, _ in got] == [d for d, _ in want]
+        assert np.allclose([s for _, s in got], [s for _, s in want])
+    assert fusion.rrf_merge([], []) == []
+
+
+def test_normalizations():
+    assert fusion.minmax(np.array([2.0, 4.0, 3.0])).tolist() == [0.0, 1.0, 0.5]
+    assert fusion.minmax(np.array([7.0, 7.0])).tolist() == [0.5, 0.5]
+    z = fusion.zscore(np.array([1.0, 2.0, 3.0]))
+    assert abs(z.mean()) < 1e-12 and abs(z.std() - 1.0) < 1e-12
+    # padding is ignored by the statistics
+    valid = np.array([[True, True, False]])
+    assert fusion.minmax(np.array([[1.0, 3.0, 100.0]]), valid).tolist() == [[0.0, 1.0, 0.0]]
+    with pytest.raises(ValueError):
+        fusion.normalize(np.ones(2), "softmax")
+
+
+@pytest.mark.parametrize("strategy", ["weighted", "rrf"])
+@pytest.mark.parametrize("normalization", ["minmax", "zscore"])
+def test_fuse_many_matches_per_query(strategy, normalization):
+    f = fusion.ScoreFusion(strategy=strategy, normalization=normalization)
+    rng = np.random.default_rng(5)
+    widths = [5, 3, 0, 8]
+    sem = np.full((4, 8), np.nan)
+    kw = np.full((4, 8), np.nan)
+    valid = np.zeros((4, 8), dtype=bool)
+    for i, w in enumerate(widths):
+        sem[i, :w] = np.where(rng.random(w) < 0.7, rng.random(w), np.nan)
+        kw[i, :w] = np.where(rng.random(w) < 0.7, rng.random(w) * 10, np.nan)
+        valid[i, :w] = True
+    alphas = np.array([0.2, 0.5, 0.7, 1.0])
+    batch = f.fuse_many(sem, kw, alphas, valid)
+    for i, w in enumerate(widths):
+        assert np.allclose(batch[i, :w], f.fuse(sem[i, :w], kw[i, :w], alphas[i]))
+        assert np.all(np.isneginf(batch[i, w:]))
+
+
+def test_rrf_strategy_rewards_agreement():
+    f = fusion.ScoreFusion(strategy="rrf")
+    sem = np.array([0.9, 0.8, np.nan])
+    kw = np.array([np.nan, 5.0, 9.0])
+    fused = f.fuse(sem, kw, alpha=0.5)
+    assert int(np.argmax(fused)) == 1  # the only candidate in both lists
+
+
+def test_from_settings():
+    cfg = Settings()
+    cfg.fusion_strategy, cfg.fusion_normalization, cfg.validator_weights = "rrf", "zscore", "1,0,0"
+    f = fusion.ScoreFusion.from_settings(cfg)
+    assert (f.strategy, f.normalization, f.validator_weights) == ("rrf", "zscore", (1.0, 0.0, 0.0))
+    cfg.fusion_strategy = "borda"
+    with pytest.raises(ValueError):
+        fusion.ScoreFusion.from_settings(cfg)
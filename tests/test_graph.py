@@ -0,0 +1,90 @@
+import pytest
+from rag_support.rag_graph import RagGraph
+
+@pytest.mark.asyncio
+async def test_graph_compiled_once_and_reused():
+    graph = RagGraph()
+    compiled = graph.app
+    for _ in range(2):
+        answer, citations, debug, usage = await graph.run_query(
+            query="anything", top_k=4, alpha=0.7, metadata_filters={}
+        )
+        assert answer
+        assert debug.judge_report.verdict == "pass"
+    assert graph.app is compiled
+
+@pytest.mark.asyncio
+async def test_repair_reuses_state_and_feeds_back_fixes():
+    graph = RagGraph()
+    prompts, verdicts = [], iter(["pass"])
+
+    def generate(prompt, temperature, max_tokens):
+        prompts.append(prompt)
+        return type("R", (), {"text": "Fixed [#1].", "usage": {"prompt_tokens": 3, "candidates_tokens": 4}})
+
+    def judge(system_prompt, payload, temperature=0.0):
+        return {"verdict": next(verdicts), "scores": {}, "flags": {}, "reasons": [], "suggested_fixes": []}
+
+    graph.vertex.client.generate, graph.vertex.client.judge = generate, judge
+    validated = [
+        {"chunk_id": "c1", "source_id": "kb/doc1.md", "text": "good", "confidence": 0.9},
+        {"chunk_id": "c2", "source_id": "kb/doc2.md", "text": "flagged", "confidence": 0.8},
+        {"chunk_id": "c3", "source_id": "kb/doc3.md", "text": "weak", "confidence": 0.3},
+    ]
+    failed = {
+        "verdict": "fail",
+        "reasons": ["c2 contradicts the answer"],
+        "suggested_fixes": ["Do not mention pricing"],
+    }
+    state = {
+        "cfg": graph.cfg,
+        "query": "q",
+        "validated": validated,
+        "judge_report": failed,
+        "usage": {"prompt_tokens": 5, "candidates_tokens": 10},
+    }
+    result, attempts = await graph._repair(state)
+
+    assert attempts == 1 and result["judge_report"]["verdict"] == "pass"
+    assert [v["chunk_id"] for v in result["validated"]] == ["c1"]
+    assert "Do not mention pricing" in prompts[0] and "flagged" not in prompts[0]
+    assert result["usage"] == {"prompt_tokens": 8, "candidates_tokens": 14}
+
+    # nothing left to change -> no regeneration
+    stuck = {**state, "validated": [validated[0]], "judge_report": {**failed, "suggested_fixes": []}}
+    _, attempts = await graph._repair(stuck)
+    assert attempts == 0 and len(prompts) == 1
+
+@pytest.mark.asyncio
+async def test_failed_query_embed_cancels_retrieval():
+    import asyncio
+
+    graph = RagGraph()
+    started, cancelled = asyncio.Event(), []
+
+    async def slow_search(**kwargs):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def failing_embed(query):
+        await started.wait()
+        raise RuntimeError("vertex down")
+
+    graph.retrieval.hybrid_search = slow_search
+    graph.retrieval.embed_query = failing_embed
+    with pytest.raises(RuntimeError, match="vertex down"):
+        await graph.run_query(query="q", top_k=4, alpha=0.7, metadata_filters={})
+    assert cancelled == [True]
+
+def test_tighten_matches_whole_ids_only():
+    validated = [
+        {"chunk_id": cid, "source_id": sid, "confidence": 0.9}
+        for cid, sid in [("kb/a-0001", "kb/a"), ("kb/a-000", "kb/a"), ("c1", "s1"), ("c10", "s1"), ("x", "a")]
+    ]
+    report = {"reasons": ["Chunk [#kb/a-0001] is outdated."], "suggested_fixes": ["Drop c1; a table would help"]}
+    kept = RagGraph._tighten(validated, report, cutoff=0.5)
+    assert [v["chunk_id"] for v in kept] == ["kb/a-000", "c10", "x"]
@@ -0,0 +1,53 @@
+import pytest
+from rag_support.services.retrieval import RetrievalService
+
+@pytest.mark.asyncio
+async def test_keyword_only_hits_hydrated_in_one_fetch():
+    svc = RetrievalService()
+    svc.store.upsert([
+        ("k1", [1.0] * 8, {"chunk_id": "k1", "source_id": "s1", "text": "refund policy details"}),
+        ("k2", [1.0] * 8, {"chunk_id": "k2", "source_id": "s2", "text": "refund window"}),
+    ])
+    svc.bm25.add_docs(["k1", "k2"], ["refund policy details", "refund window"])
+    svc.store.query = lambda vector, top_k, metadata_filter=None: []  # no semantic hits
+
+    docs = await svc.hybrid_search("refund", alpha=0.5, top_k=2, metadata_filters={})
+    assert {d.id for d in docs} == {"k1", "k2"}
+    assert svc.store.fetch_calls == 1
+
+    # second lookup is served from the local chunk store
+    await svc.hybrid_search("refund", alpha=0.5, top_k=2, metadata_filters={})
+    assert svc.store.fetch_calls == 1
+
+def test_chunk_store_is_bounded_and_follows_the_corpus_version(tmp_path):
+    from rag_support.services.answer_cache import IndexVersion
+    from rag_support.services.chunk_store import ChunkStore
+
+    path = str(tmp_path / "index_version")
+    store = ChunkStore(max_vectors=2, version=IndexVersion(path))
+    store.put_many([("a", {"text": "old a"}), ("b", {"text": "b"}), ("c", {"text": "c"})])
+    assert store.get_many(["a", "b", "c"])[1] == ["a"]  # LRU evicted the oldest
+
+    read_at = store.current_version()
+    IndexVersion(path).bump()  # re-ingest in another process
+    assert store.get_many(["b"])[1] == ["b"]
+    store.put_many([("a", {"text": "old a"})], version=read_at)  # fetched before the ingest
+    assert "a" not in store
+
+
+def test_chunk_store_keeps_what_ingest_wrote_across_its_version_bump(tmp_path):
+    from rag_support.services.answer_cache import IndexVersion
+    from rag_support.services.chunk_store import ChunkStore
+
+    version = IndexVersion(str(tmp_path / "index_version"))
+    store = ChunkStore(version=version)
+    store.put_many([("cached", {"text": "cached"})], version=store.current_version())
+    read_at = store.current_version()
+    store.put_many([("a", {"text": "new a"})], written=True)
+    store.put_vectors([("a", [1.0, 0.0])], written=True)
+    store.put_many([("a", {"text": "old a"})], version=read_at)  # a read that raced the ingest
+    version.bump()
+
+    found, missing = store.get_many(["a", "cached"])
+    assert found == {"a": {"text": "new a"}} and missing == ["cached"]
+    assert list(store.get_vectors(["a"])[0]) == ["a"]
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from rag_support.api.v1.models import IngestItem
+from rag_support.config import Settings
+from rag_support.services.ingest_jobs import IngestJobManager
+from rag_support.services.ingestion import IngestProgress
+
+
+class _GatedIngestion:
+    """
+    Reports one progress tick per item, blocking on `gate` after the first.
+    """
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.running = 0
+        self.max_running = 0
+
+    async def ingest_items(self, items, progress=None):
+        stats = IngestProgress(items=len(items))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            for i, _ in enumerate(items):
+                if i:
+                    await self.gate.wait()
+                stats.chunks_embedded += 1
+                stats.chunks_upserted += 1
+                if progress is not None:
+                    progress(stats)
+                await asyncio.sleep(0)
+            return stats
+        finally:
+            self.running -= 1
+
+
+def _cfg(**overrides):
+    cfg = Settings()
+    cfg.ingest_max_concurrent_jobs = 1
+    cfg.ingest_job_poll_s = 0.01
+    for k, v in overrides.items():
+        setattr(cfg, k, v)
+    return cfg
+
+
+def _items(n):
+    return [IngestItem(source=f"kb/{i}.md", text=f"doc {i}") for i in range(n)]
+
+
+async def _until(predicate):
+    for _ in range(500):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_and_succeeds():
+    ing = _GatedIngestion()
+    jobs = IngestJobManager(ing, _cfg())
+    job = jobs.submit(_items(3))
+    assert job.status == "queued"
+
+    await _until(lambda: jobs.get(job.job_id).progress.chunks_upserted == 1)
+    assert jobs.get(job.job_id).status == "running"
+
+    ing.gate.set()
+    done = await jobs.wait(job.job_id)
+    assert done.status == "succeeded" and done.progress.chunks_upserted == 3
+    await jobs.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_cancellation():
+    ing = _GatedIngestion()
+    jobs = IngestJobManager(ing, _cfg(ingest_max_concurrent_jobs=2))
+    running = [jobs.submit(_items(2)) for _ in range(2)]
+    queued = jobs.submit(_items(2))
+    await _until(lambda: all(jobs.get(j.job_id).status == "running" for j in running))
+    assert jobs.get(queued.job_id).status == "queued"
+
+    assert jobs.cancel(queued.job_id).status == "cancelled"  # never started
+    jobs.cancel(running[0].job_id)
+    assert (await jobs.wait(running[0].job_id)).status == "cancelled"
+
+    ing.gate.set()
+    assert (await jobs.wait(running[1].job_id)).status == "succeeded"
+    assert ing.max_running == 2
+    await jobs.stop()
+
+
+@pytest.mark.asyncio
+async def test_spooled_jobs_run_on_a_separate_worker(tmp_path):
+    ing = _GatedIngestion()
+    api = IngestJobManager(ing, _cfg(), directory=str(tmp_path), run_workers=False)
+    job = api.submit(_items(2))
+    await asyncio.sleep(0.05)
+    assert api.get(job.job_id).status == "queued"  # nothing serves the spool yet
+
+    worker = IngestJobManager(ing, _cfg(), directory=str(tmp_path))
+    serving = asyncio.create_task(worker.run_forever())
+    await _until(lambda: api.get(job.job_id).status == "running")
+    api.cancel(job.job_id)
+    assert api.get(job.job_id).cancel_requested
+    ing.gate.set()  # the worker sees the cancel marker on its next progress tick
+    assert (await api.wait(job.job_id)).status == "cancelled"
+
+    second = api.submit(_items(2))
+    assert (await api.wait(second.job_id)).status == "succeeded"
+    serving.cancel()
+    await asyncio.gather(serving, return_exceptions=True)
@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+
+from rag_support.api.v1.models import IngestItem
+from rag_support.config import Settings
+from rag_support.services.bm25_index import BM25Index
+from rag_support.services.chunk_store import ChunkStore
+from rag_support.services.chunker import Chunker
+from rag_support.services.ingestion import IngestionService
+from rag_support.services.source_manifest import SourceManifest
+
+
+class _FlakyEmbedder:
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.batches = []
+
+    async def embed(self, texts):
+        self.batches.append(len(texts))
+        if self.fail_first:
+            self.fail_first -= 1
+            raise RuntimeError("429 quota")
+        return np.ones((len(texts), 8))
+
+
+class _RecordingStore:
+    def __init__(self, fail_upserts=()):
+        self.batches = []
+        self.deleted = []
+        self.vectors = {}
+        self.fail_upserts = set(fail_upserts)  # 0-based upsert calls that raise
+
+    def upsert(self, vectors):
+        call = len(self.batches)
+        self.batches.append(len(vectors))
+        if call in self.fail_upserts:
+            raise RuntimeError("503 unavailable")
+        self.vectors.update((vid, (values, metadata)) for vid, values, metadata in vectors)
+
+    def fetch(self, ids):
+        return {
+            vid: {"id": vid, "values": self.vectors[vid][0], "metadata": self.vectors[vid][1]}
+            for vid in ids
+            if vid in self.vectors
+        }
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+        for vid in ids:
+            self.vectors.pop(vid, None)
+
+
+def _service(embedder, store, **overrides):
+    cfg = Settings()
+    cfg.ingest_embed_batch_size = 5
+    cfg.ingest_upsert_batch_size = 7
+    cfg.ingest_queue_size = 1
+    cfg.ingest_retry_backoff_s = 0.0
+    for k, v in overrides.items():
+        setattr(cfg, k, v)
+    return IngestionService(
+        cfg,
+        bm25_index=BM25Index(),
+        chunk_store=ChunkStore(),
+        vertex=embedder,
+        pinecone=store,
+        manifest=SourceManifest(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_batches_are_bounded_and_retried():
+    embedder, store = _FlakyEmbedder(fail_first=1), _RecordingStore()
+    svc = _service(embedder, store)
+    items = [IngestItem(source=f"kb/{i}.md", text=f"doc {i} body") for i in range(23)]
+    seen = []
+    stats = await svc.ingest_items(items, progress=lambda p: seen.append(p.chunks_upserted))
+
+    assert stats.items == 23 and stats.chunks_upserted == 23 and stats.retries == 1
+    assert max(embedder.batches) <= 5
+    assert store.batches == [7, 7, 7, 2]
+    assert seen == [7, 14, 21, 23]
+    assert len(svc.bm25) == 23
+
+
+@pytest.mark.asyncio
+async def test_char_budget_splits_embed_batches():
+    embedder = _FlakyEmbedder()
+    svc = _service(embedder, _RecordingStore(), ingest_embed_batch_chars=2500)
+    items = [IngestItem(source=f"kb/{i}.md", text="x" * 1000) for i in range(4)]
+    await svc.ingest_items(items)
+    assert embedder.batches == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_aborts_after_retries():
+    svc = _service(_FlakyEmbedder(fail_first=10), _RecordingStore(), ingest_max_retries=2)
+    with pytest.raises(RuntimeError, match="429"):
+        await svc.ingest_items([IngestItem(source="kb/a.md", text="alpha")])
+
+
+@pytest.mark.asyncio
+async def test_reingest_skips_unchanged_and_deletes_stale(tmp_path):
+    embedder, store = _FlakyEmbedder(), _RecordingStore()
+    svc = _service(embedder, store)
+    svc.manifest = SourceManifest(str(tmp_path))
+    long_text = " ".join(f"Step {i} uses word{i}." for i in range(600))
+    first = await svc.ingest_items([IngestItem(source="kb/a.md", text=long_text)])
+    n = first.chunks_upserted
+    assert n > 2 and len(svc.bm25) == n
+
+    again = await svc.ingest_items([IngestItem(source="kb/a.md", text=long_text)])
+    assert again.chunks_embedded == 0 and again.chunks_unchanged == n and again.chunks_deleted == 0
+
+    svc.manifest = SourceManifest(str(tmp_path))  # e.g. the next nightly run
+    shorter = await svc.ingest_items([IngestItem(source="kb/a.md", text="just one paragraph")])
+    assert shorter.chunks_upserted == 1 and shorter.chunks_deleted == n - 1
+    assert len(store.deleted) == n - 1 and len(svc.bm25) == 1
+    assert svc.bm25.search("word5", top_k=3) == []
+
+
+@pytest.mark.asyncio
+async def test_reingest_reuses_vectors_of_moved_chunks(tmp_path):
+    embedder, store = _FlakyEmbedder(), _RecordingStore()
+    svc = _service(embedder, store)
+    svc.manifest = SourceManifest(str(tmp_path))
+    sections = [
+        f"# Section {i}\n\n" + " ".join(f"Part {i} step {k} uses tool{k}." for k in range(60))
+        for i in range(6)
+    ]
+    first = await svc.ingest_items([IngestItem(source="kb/a.md", text="\n\n".join(sections))])
+    n = first.chunks_upserted
+    assert n >= 6
+
+    # a new first section shifts every chunk id by one; only the new text is embedded
+    svc.chunks.clear()  # vectors come back from the store, not the process-local cache
+    intro = "# Intro\n\n" + " ".join(f"Intro step {k} covers setup." for k in range(60))
+    text = "\n\n".join([intro, *sections])
+    again = await svc.ingest_items([IngestItem(source="kb/a.md", text=text)])
+    assert again.chunks_reused == n and again.chunks_embedded == 1
+    assert again.chunks_upserted == n + 1 and again.chunks_deleted == 0
+    assert len(store.vectors) == n + 1 and len(svc.bm25) == n + 1
+
+
+class _TextEmbedder:
+    async def embed(self, texts):
+        return np.asarray([[float(len(t)), float(sum(map(ord, t)))] for t in texts])
+
+
+@pytest.mark.asyncio
+async def test_moved_chunk_reuse_checks_the_stored_content(tmp_path):
+    store = _RecordingStore()
+    svc = _service(_TextEmbedder(), store, ingest_upsert_batch_size=1, ingest_max_retries=0)
+    svc.manifest = SourceManifest(str(tmp_path))
+    paras = ["Alpha a.", "Bravo bb bb.", "Charlie ccc ccc ccc."]
+    svc.chunker = Chunker(max_tokens=6, overlap_tokens=0)  # one chunk per paragraph
+    await svc.ingest_items([IngestItem(source="kb/a.md", text="\n\n".join(paras))])
+
+    # [X, A, B, C]: the second upsert fails, so the manifest still describes [A, B, C]
+    # while the store already holds the new content under some of the old ids
+    text = "\n\n".join(["X-ray x.", *paras])
+    store.fail_upserts = {len(store.batches) + 1}
+    with pytest.raises(RuntimeError, match="503"):
+        await svc.ingest_items([IngestItem(source="kb/a.md", text=text)])
+    svc.chunks.clear()
+    store.fail_upserts = set()
+    await svc.ingest_items([IngestItem(source="kb/a.md", text=text)])
+
+    expected = await _TextEmbedder().embed(["X-ray x.", *paras])
+    ids = sorted(store.vectors)
+    assert len(ids) == 4
+    for vid, vec in zip(ids, expected):
+        assert store.vectors[vid][0] == vec.tolist(), vid
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+from rag_support import metrics
+from rag_support.config import Settings
+from rag_support.services.judge_queue import JsonlResultSink, JudgeQueue
+
+
+class _SlowJudge:
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = 0
+
+    async def judge(self, system_prompt, payload, temperature=0.0):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return {"verdict": "pass", "scores": {}, "flags": {}, "reasons": [], "suggested_fixes": []}
+
+
+def _cfg(**overrides):
+    cfg = Settings()
+    for k, v in overrides.items():
+        setattr(cfg, k, v)
+    return cfg
+
+
+@pytest.mark.asyncio
+async def test_queue_drops_when_full_and_writes_sink(tmp_path):
+    gate = asyncio.Event()
+    judge = _SlowJudge(gate)
+    out = tmp_path / "verdicts.jsonl"
+    queue = JudgeQueue(
+        judge, "sys", _cfg(eval_workers=1, eval_queue_size=1), sink=JsonlResultSink(str(out))
+    )
+    dropped = metrics.JUDGE_JOBS.value(outcome="dropped")
+    passed = metrics.JUDGE_VERDICTS.value(verdict="pass")
+    assert queue.submit({"query": "a"})
+    await asyncio.sleep(0)  # worker picks up "a" and blocks on the gate
+    assert queue.submit({"query": "b"})
+    assert not queue.submit({"query": "c"})
+    gate.set()
+    await queue.join()
+    await queue.stop()
+
+    assert queue.counters["dropped"] == 1 and queue.counters["verdict_pass"] == 2
+    assert metrics.JUDGE_JOBS.value(outcome="dropped") == dropped + 1
+    assert metrics.JUDGE_VERDICTS.value(verdict="pass") == passed + 2
+    assert 'rag_judge_verdicts_total{verdict="pass"}' in metrics.REGISTRY.render()
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["query"] for r in lines] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_async_mode_responds_before_judging():
+    from rag_support.rag_graph import RagGraph
+
+    cfg = _cfg(eval_mode="async", eval_sample_rate=1.0, answer_cache_enabled=False)
+    judge = _SlowJudge(asyncio.Event())
+    graph = RagGraph(cfg)
+    graph.judge_queue.vertex = judge
+
+    answer, _, debug, _ = await graph.run_query("reset password", top_k=4, alpha=0.7, metadata_filters={})
+    assert answer and debug.judge_report.verdict == "pending"
+    assert graph.judge_queue.counters["submitted"] == 1
+
+    graph.cfg.eval_sample_rate = 0.0
+    _, _, debug, _ = await graph.run_query("reset password", top_k=4, alpha=0.7, metadata_filters={})
+    assert debug.judge_report.verdict == "skipped"
+    assert graph.judge_queue.counters["submitted"] == 1
+
+    judge.gate.set()
+    await graph.judge_queue.join()
+    await graph.judge_queue.stop(drain_timeout_s=1.0)
+    assert judge.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_async_mode_caches_only_after_a_passing_verdict():
+    from rag_support.rag_graph import RagGraph
+
+    cfg = _cfg(eval_mode="async", eval_sample_rate=1.0)
+    judge = _SlowJudge(asyncio.Event())
+    graph = RagGraph(cfg)
+    graph.judge_queue.vertex = judge
+    cache = graph.answer_cache
+
+    _, _, debug, _ = await graph.run_query("reset password", top_k=4, alpha=0.7, metadata_filters={})
+    assert debug.judge_report.verdict == "pending" and len(cache) == 0
+
+    judge.gate.set()
+    await graph.judge_queue.join()
+    await graph.judge_queue.stop(drain_timeout_s=1.0)
+    assert len(cache) == 1
+    _, _, debug, _ = await graph.run_query("reset password", top_k=4, alpha=0.7, metadata_filters={})
+    assert debug.judge_report.verdict == "pass"
+    assert debug.scores["answer_cache_similarity"] > 0.99
@@ -0,0 +1,51 @@
+import json
+import logging
+
+import pytest
+from httpx import AsyncClient
+
+from rag_support import logging as rag_logging
+from rag_support.main import app
+
+
+def _record(msg, level=logging.INFO, **extra):
+    record = logging.LogRecord("rag_support", level, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_emits_extra_fields_redacted():
+    fmt = rag_logging.JsonFormatter({"api_key", "token"})
+    record = _record("ingest_progress", items=3, api_key="sk-1", nested={"token": "t", "n": 1})
+    record.request_id = "req-1"
+    out = json.loads(fmt.format(record))
+    assert out["event"] == "ingest_progress" and out["level"] == "INFO"
+    assert out["request_id"] == "req-1"
+    assert out["items"] == 3
+    assert out["api_key"] == rag_logging.REDACTED
+    assert out["nested"] == {"token": rag_logging.REDACTED, "n": 1}
+
+
+def test_sampling_keeps_warnings_and_unlisted_events():
+    f = rag_logging._ContextFilter({"hybrid_search": 0.0})
+    assert not f.filter(_record("hybrid_search"))
+    assert f.filter(_record("hybrid_search", level=logging.WARNING))
+    assert f.filter(_record("query_failed"))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    import queue
+
+    handler = rag_logging._NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    before = rag_logging.LOG_DROPPED.value()
+    handler.handle(_record("a"))
+    handler.handle(_record("b"))
+    assert rag_logging.LOG_DROPPED.value() == before + 1
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_propagated():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/v1/healthz", headers={"X-Request-ID": "abc123"})
+        assert r.headers["x-request-id"] == "abc123"
+        assert (await ac.get("/v1/healthz")).headers["x-request-id"]
@@ -0,0 +1,50 @@
+import pytest
+from httpx import AsyncClient
+
+from rag_support import metrics
+from rag_support.main import app
+from rag_support.services.container import get_container
+
+
+def test_histogram_renders_cumulative_buckets():
+    reg = metrics.Registry()
+    h = reg.histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    c = reg.counter("t_total", "test", ("op",))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v, stage='a"b')
+    c.inc(op="x")
+    text = reg.render()
+    assert 't_seconds_bucket{stage="a\\"b",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="a\\"b",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="a\\"b",le="+Inf"} 3' in text
+    assert 't_seconds_count{stage="a\\"b"} 3' in text
+    assert 't_total{op="x"} 1' in text
+    with pytest.raises(ValueError):
+        c.inc(other="y")
+
+
+@pytest.mark.asyncio
+async def test_query_timings_and_metrics_endpoint():
+    graph = get_container().graph
+    graph.cfg.debug_timings = True
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            payload = {"items": [{"source": "doc1.md", "text": "LangGraph builds stateful graphs."}]}
+            assert (await ac.post("/v1/rag/ingest?wait=true", json=payload)).status_code == 200
+            r = await ac.post("/v1/rag/query", json={"query": "What does LangGraph build?"})
+            assert r.status_code == 200
+            scores = r.json()["debug"]["scores"]
+            for stage in ("embed_query", "vector_search", "bm25_search", "hydrate", "validate",
+                          "node_validator", "node_generator", "node_evaluator"):
+                assert f"time_{stage}_ms" in scores
+            assert scores["calls_vertex"] >= 3  # embed, generate, judge
+
+            r = await ac.get("/metrics")
+            assert r.status_code == 200
+            assert r.headers["content-type"].startswith("text/plain")
+            assert 'rag_stage_duration_seconds_count{stage="node_generator"}' in r.text
+            assert 'rag_external_calls_total{service="vertex",op="generate"}' in r.text
+            assert 'rag_llm_tokens_total{kind="prompt"}' in r.text
+            assert 'route="/v1/rag/query",status="200"' in r.text
+    finally:
+        graph.cfg.debug_timings = False
@@ -0,0 +1,30 @@
+import time
+
+import pytest
+from rag_support.services.retrieval import RetrievalService
+
+def _seed(svc):
+    svc.store.upsert([("k1", [1.0] * 8, {"chunk_id": "k1", "source_id": "s1", "text": "refund policy"})])
+    svc.bm25.add_docs(["k1"], ["refund policy"])
+
+@pytest.mark.asyncio
+async def test_branches_run_concurrently():
+    svc = RetrievalService()
+    _seed(svc)
+    search, query = svc.bm25.search, svc.store.query
+    svc.bm25.search = lambda q, top_k: (time.sleep(0.2), search(q, top_k))[1]
+    svc.store.query = lambda *a, **kw: (time.sleep(0.2), query(*a, **kw))[1]
+    t0 = time.perf_counter()
+    docs = await svc.hybrid_search("refund", alpha=0.5, top_k=2, metadata_filters={})
+    assert time.perf_counter() - t0 < 0.35
+    assert docs[0].semantic_score > 0 and docs[0].keyword_score > 0
+
+@pytest.mark.asyncio
+async def test_slow_branch_degrades():
+    svc = RetrievalService()
+    svc.cfg = svc.cfg.model_copy(update={"semantic_timeout_s": 0.05})
+    _seed(svc)
+    svc.store.query = lambda *a, **kw: time.sleep(0.5) or []
+    docs = await svc.hybrid_search("refund", alpha=0.5, top_k=2, metadata_filters={})
+    assert [d.id for d in docs] == ["k1"]
+    assert docs[0].semantic_score == 0.0
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+from httpx import AsyncClient
+
+from rag_support.config import settings
+from rag_support.main import app
+from rag_support.services import vertex as vertex_mod
+from rag_support.services.bm25_index import BM25Index
+
+HEAVY = ("google.cloud.aiplatform", "vertexai", "pinecone", "langgraph", "rank_bm25", "sklearn")
+
+
+def test_importing_the_app_skips_heavy_sdks():
+    code = "import sys, rag_support.main; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+async def test_readyz_waits_for_warmup(monkeypatch):
+    monkeypatch.setattr(settings, "vector_backend", "local")
+    monkeypatch.setattr(settings, "warmup_query", "warm up")
+    warmed = []
+    monkeypatch.setattr(vertex_mod.VertexClient, "warmup", lambda self: warmed.append(1), raising=False)
+    monkeypatch.delattr(app.state, "services", raising=False)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.get("/v1/readyz")).status_code == 503
+        async with app.router.lifespan_context(app):
+            r = await ac.get("/v1/readyz")
+            assert r.status_code == 200 and r.json() == {"status": "ok"}
+            assert warmed == [1]
+
+
+def test_bm25_warmup_opens_segments(tmp_path):
+    writer = BM25Index(directory=str(tmp_path))
+    writer.add_docs(["a", "b"], ["gke deploy guide", "billing faq"])
+    writer.flush()
+
+    reader = BM25Index(directory=str(tmp_path), refresh_s=3600)
+    writer.add_docs(["c"], ["gke autoscaling"])
+    writer.flush()
+    reader.warmup()  # picks up the new segment despite the long refresh interval
+    assert {d for d, _ in reader.search("gke", top_k=5)} == {"a", "c"}
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+from rag_support.main import app
+
+def _parse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+@pytest.mark.asyncio
+async def test_stream_query_events():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        payload = {"items": [{"source": "doc1.md", "text": "LangGraph builds stateful graphs.", "title": "Doc1"}]}
+        assert (await ac.post("/v1/rag/ingest?wait=true", json=payload)).status_code == 200
+
+        r = await ac.post("/v1/rag/query:stream", json={"query": "What does LangGraph build?", "top_k": 2})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = _parse(r.text)
+        kinds = [e for e, _ in events]
+        assert kinds[0] == "token"
+        assert kinds[-2:] == ["judge", "done"]
+        assert events[-2][1]["verdict"] == "pass"
+        assert "".join(d["text"] for e, d in events if e == "token")
+
+@pytest.mark.asyncio
+async def test_stream_emits_citations_as_markers_resolve():
+    from rag_support.rag_graph import RagGraph
+    from rag_support.services.vertex import VertexTextResult
+
+    graph = RagGraph()
+    async def fake_stream(prompt, temperature, max_tokens):
+        for piece in ["See ", "[#", "1] and more."]:
+            yield VertexTextResult(text=piece, usage={})
+    graph.vertex.generate_stream = fake_stream
+    graph.retrieval.store.upsert([("c1", [1.0] * 8, {"chunk_id": "c1", "source_id": "s1", "text": "alpha"})])
+    graph.retrieval.bm25.add_docs(["c1"], ["alpha"])
+    graph.cfg = graph.cfg.model_copy(update={"similarity_threshold": 0.0})
+
+    events = [e async for e in graph.stream_query("alpha", top_k=2, alpha=0.5, metadata_filters={})]
+    kinds = [e for e, _ in events]
+    assert kinds == ["token", "token", "token", "citation", "judge", "done"]
+    assert events[3][1]["marker"] == "[#1]" and events[3][1]["chunk_id"] == "c1"
+
+
+@pytest.mark.asyncio
+async def test_stream_shares_the_query_embedding_and_is_tracked():
+    from rag_support import metrics
+    from rag_support.rag_graph import RagGraph
+
+    graph = RagGraph()
+    embed_calls = []
+    embed = graph.vertex.client.embed
+    graph.vertex.client.embed = lambda texts: embed_calls.append(list(texts)) or embed(texts)
+    graph.retrieval.store.upsert([("c1", [1.0] * 8, {"chunk_id": "c1", "source_id": "s1", "text": "alpha"})])
+    graph.retrieval.bm25.add_docs(["c1"], ["alpha"])
+
+    before = metrics.QUERY_CALLS.count(service="vertex")
+    events = [e async for e in graph.stream_query("alpha beta", top_k=2, alpha=0.5, metadata_filters={})]
+    assert events[-1][0] == "done"
+    assert [t for t in embed_calls if t == ["alpha beta"]] == [["alpha beta"]]
+    assert metrics.QUERY_CALLS.count(service="vertex") == before + 1
@@ -0,0 +1,89 @@
+import numpy as np
+
+from rag_support.services import vector_store as vs_mod
+from rag_support.services.vector_store import CachedVectorStore, LocalVectorStore, matches_filter
+
+
+def _corpus(n=2000, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, dim)).astype(np.float32)
+    return [
+        (f"doc-{i}", vecs[i].tolist(), {"lang": "en" if i % 2 else "de", "tags": [f"t{i % 5}"], "rank": i})
+        for i in range(n)
+    ]
+
+
+def test_metadata_filter_subset():
+    meta = {"lang": "en", "tags": ["billing", "faq"], "rank": 3}
+    assert matches_filter(meta, {"lang": "en"})
+    assert matches_filter(meta, {"tags": {"$in": ["faq"]}, "rank": {"$gte": 3}})
+    assert not matches_filter(meta, {"$or": [{"lang": "de"}, {"rank": {"$lt": 2}}]})
+    assert matches_filter(meta, {"missing": {"$exists": False}, "lang": {"$ne": "de"}})
+
+
+def test_exact_search_persists_and_filters(tmp_path):
+    data = _corpus(n=300)
+    store = LocalVectorStore(str(tmp_path))
+    store.upsert(data)
+    store.delete(["doc-7"])
+    store.close()
+
+    reopened = LocalVectorStore(str(tmp_path))
+    assert len(reopened) == 299
+    q = np.asarray(data[42][1])
+    hits = reopened.query(q, top_k=3)
+    assert hits[0]["id"] == "doc-42" and abs(hits[0]["score"] - 1.0) < 1e-5
+    filtered = reopened.query(q, top_k=5, metadata_filter={"lang": "en", "tags": {"$in": ["t2"]}})
+    assert filtered and all(h["metadata"]["lang"] == "en" for h in filtered)
+    assert "doc-7" not in reopened.fetch(["doc-7", "doc-8"]) and "doc-8" in reopened.fetch(["doc-8"])
+
+
+def test_ivf_recall_close_to_exact():
+    data = _corpus()
+    exact = LocalVectorStore()
+    ivf = LocalVectorStore(index="ivf", ivf_min_rows=500, nprobe=12)
+    exact.upsert(data)
+    ivf.upsert(data)
+    rng = np.random.default_rng(1)
+    recall = []
+    for _ in range(20):
+        q = rng.standard_normal(16)
+        truth = {h["id"] for h in exact.query(q, top_k=10)}
+        recall.append(len(truth & {h["id"] for h in ivf.query(q, top_k=10)}) / 10)
+    assert np.mean(recall) >= 0.8
+
+
+def test_ivf_build_and_log_compaction_stay_off_the_query_path(tmp_path, monkeypatch):
+    data = _corpus(n=600)
+    store = LocalVectorStore(str(tmp_path), index="ivf", ivf_min_rows=500)
+    for _ in range(4):  # every rewrite is appended to records.jsonl
+        store.upsert(data)
+    store.delete(["doc-7"])
+    store.maintain()  # waits for the background run the writes started
+    assert store._ivf is not None
+
+    def no_build(*args, **kwargs):
+        raise AssertionError("IVF built on the query path")
+
+    monkeypatch.setattr(vs_mod, "_IVF", no_build)
+    store.upsert(data[10:20])  # below the rebuild threshold: scanned exactly
+    assert store.query(np.asarray(data[13][1]), top_k=1)[0]["id"] == "doc-13"
+    store.close()
+
+    with open(tmp_path / "records.jsonl", encoding="utf-8") as f:
+        assert sum(1 for _ in f) < 4 * 600  # compacted: 2411 lines were appended
+    reopened = LocalVectorStore(str(tmp_path))
+    assert len(reopened) == 599 and "doc-7" not in reopened.fetch(["doc-7"])
+    assert reopened.query(np.asarray(data[42][1]), top_k=1)[0]["id"] == "doc-42"
+
+
+def test_read_through_cache_only_fetches_misses():
+    primary = LocalVectorStore()
+    primary.upsert(_corpus(n=10))
+    calls = []
+    fetch = primary.fetch
+    primary.fetch = lambda ids: calls.append(list(ids)) or fetch(ids)
+    cached = CachedVectorStore(primary, max_entries=4)
+    assert set(cached.fetch(["doc-1", "doc-2"])) == {"doc-1", "doc-2"}
+    assert set(cached.fetch(["doc-1", "doc-3"])) == {"doc-1", "doc-3"}
+    assert calls == [["doc-1", "doc-2"], ["doc-3"]]
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from rag_support.config import Settings
+from rag_support.services.vertex import AsyncVertexClient
+
+class SyncOnly:
+    def embed(self, texts):
+        time.sleep(0.05)
+        return np.ones((len(texts), 4))
+    def generate(self, prompt, temperature, max_tokens):
+        time.sleep(1)
+
+class Native(SyncOnly):
+    async def embed_async(self, texts):
+        return np.zeros((len(texts), 4))
+
+@pytest.mark.asyncio
+async def test_blocking_calls_overlap_in_pool():
+    client = AsyncVertexClient(SyncOnly(), Settings())
+    t0 = time.perf_counter()
+    out = await asyncio.gather(*(client.embed(["q"]) for _ in range(8)))
+    assert time.perf_counter() - t0 < 0.3  # 8 x 50ms overlapped, not serialized
+    assert all(o.shape == (1, 4) for o in out)
+
+@pytest.mark.asyncio
+async def test_native_async_and_timeouts():
+    assert (await AsyncVertexClient(Native(), Settings()).embed(["q"])).sum() == 0
+    client = AsyncVertexClient(SyncOnly(), Settings(vertex_generate_timeout_s=0.05))
+    with pytest.raises(asyncio.TimeoutError):
+        await client.generate("p", temperature=0.0, max_tokens=8)
@@ -5,7 +5,8 @@ import time
 from typing import Iterable, List, Tuple
 
 import numpy as np
-from sklearn.preprocessing import minmax_scale
+
+from rag_support.services import fusion
 
 
 def now_ms() -> int:
@@ -24,9 +25,7 @@ def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
 def normalize_list(xs: List[float]) -> List[float]:
     if not xs:
         return []
-    if max(xs) == min(xs):
-        return [0.5 for _ in xs]
-    return list(minmax_scale(xs))
+    return fusion.minmax(np.asarray(xs, dtype=np.float64)).tolist()
 
 
 def stable_id(text: str) -> str:
@@ -42,9 +41,4 @@ def rrf_merge(
     Reciprocal Rank Fusion. Given two ranked lists of IDs (best to worst),
     return fused ranking with scores.
     """
-    ranks: dict[str, float] = {}
-    for rank, doc_id in enumerate(semantic_ids):
-        ranks[doc_id] = ranks.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
-    for rank, doc_id in enumerate(keyword_ids):
-        ranks[doc_id] = ranks.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
-    return sorted(ranks.items(), key=lambda x: x[1], reverse=True)
+    return fusion.rrf_merge(semantic_ids, keyword_ids, k=k)